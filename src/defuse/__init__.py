@@ -10,16 +10,51 @@ __version__ = "0.1.0"
 __author__ = "Defuse Contributors"
 __description__ = "Secure document download and sanitization tool using Dangerzone"
 
+import importlib
+from typing import TYPE_CHECKING
+
 from .config import Config, get_default_config
-from .downloader import SecureDocumentDownloader, DocumentDownloadError
-from .sanitizer import DocumentSanitizer, DocumentSanitizeError
-from .sandbox import (
-    SandboxedDownloader,
-    get_sandbox_capabilities,
-    IsolationLevel,
-    SandboxBackend,
-)
-from .formats import FileTypeDetector, SupportedFormat
+
+if TYPE_CHECKING:
+    from .downloader import SecureDocumentDownloader, DocumentDownloadError
+    from .sanitizer import DocumentSanitizer, DocumentSanitizeError
+    from .sandbox import (
+        SandboxedDownloader,
+        get_sandbox_capabilities,
+        IsolationLevel,
+        SandboxBackend,
+    )
+    from .formats import FileTypeDetector, SupportedFormat
+
+# Heavier submodules (requests, tqdm, subprocess plumbing) are imported on first
+# attribute access instead of at package import
+_LAZY_EXPORTS = {
+    "SecureDocumentDownloader": ".downloader",
+    "DocumentDownloadError": ".downloader",
+    "DocumentSanitizer": ".sanitizer",
+    "DocumentSanitizeError": ".sanitizer",
+    "SandboxedDownloader": ".sandbox",
+    "get_sandbox_capabilities": ".sandbox",
+    "IsolationLevel": ".sandbox",
+    "SandboxBackend": ".sandbox",
+    "FileTypeDetector": ".formats",
+    "SupportedFormat": ".formats",
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_EXPORTS))
+
 
 __all__ = [
     "Config",
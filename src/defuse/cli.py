@@ -2,67 +2,117 @@
 Command-line interface for Defuse.
 """
 
+import functools
+import itertools
+import json
+import operator
 import os
 import sys
 import shutil
 import platform
+import posixpath
 import subprocess
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from urllib.parse import urlparse
 
 import click
-import yaml
-from tqdm import tqdm
 
+# yaml, tqdm, concurrent.futures and the downloader/sanitizer/sandbox stack are
+# imported inside the commands that need them so that `defuse --version`,
+# `--help`, `check-deps` and `config` stay fast
+from . import __version__
 from .config import get_default_config, Config
-from .sanitizer import DocumentSanitizer, DocumentSanitizeError
-from .sandbox import SandboxedDownloader, get_sandbox_capabilities
-from .downloader import DocumentDownloadError
+
+# The host OS can't change under a running process, so look it up once
+_SYSTEM = platform.system()
+
+# Parsed user settings keyed by file, tagged with the (mtime_ns, size) they were read at
+_CONFIG_CACHE: Dict[Path, Tuple[int, int, dict]] = {}
 
 
 def get_config_dir() -> Path:
     """Get the user configuration directory."""
-    if platform.system() == "Darwin":
+    if _SYSTEM == "Darwin":
         return Path.home() / "Library" / "Application Support" / "defuse"
-    elif platform.system() == "Windows":
+    elif _SYSTEM == "Windows":
         return Path(os.environ.get("APPDATA", Path.home())) / "defuse"
     else:
         return Path.home() / ".config" / "defuse"
 
 
+def _read_user_settings(config_file: Path) -> dict:
+    """Parse a user config file, either JSON or the legacy YAML format."""
+    with open(config_file, "r") as f:
+        if config_file.suffix == ".json":
+            return json.load(f)
+
+        import yaml
+
+        # Prefer the libyaml-backed loader when PyYAML was built with it
+        loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+        return yaml.load(f, Loader=loader)
+
+
+def _apply_user_settings(user_config: dict) -> Config:
+    """Build a fresh config with the user's settings applied.
+
+    Commands mutate the config they are given, so every load returns a new
+    instance built from the cached settings rather than a shared one.
+    """
+    config = get_default_config()
+
+    # Update config with user settings
+    if "dangerzone_path" in user_config:
+        config.dangerzone_path = Path(user_config["dangerzone_path"])
+    if "output_dir" in user_config:
+        config.sanitizer.output_dir = Path(user_config["output_dir"])
+    if user_config.get("allowed_domains") is not None:
+        # Copied so that adding a domain can't reach back into the cache
+        config.sandbox.allowed_domains = list(user_config["allowed_domains"])
+
+    return config
+
+
 def load_user_config() -> Config:
-    """Load user configuration from config file."""
+    """Load user configuration from config file.
+
+    Settings are read from config.json, falling back to the config.yaml
+    written by older versions. The parsed file is cached per process and
+    re-read only when its modification time or size changes.
+    """
     config_dir = get_config_dir()
-    config_file = config_dir / "config.yaml"
 
-    if config_file.exists():
+    for name in ("config.json", "config.yaml"):
+        config_file = config_dir / name
         try:
-            with open(config_file, "r") as f:
-                user_config = yaml.safe_load(f)
-
-            config = get_default_config()
+            stat = config_file.stat()
+            break
+        except OSError:
+            continue
+    else:
+        return get_default_config()
 
-            # Update config with user settings
-            if "dangerzone_path" in user_config:
-                config.dangerzone_path = Path(user_config["dangerzone_path"])
-            if "output_dir" in user_config:
-                config.sanitizer.output_dir = Path(user_config["output_dir"])
-            if "allowed_domains" in user_config:
-                config.sandbox.allowed_domains = user_config["allowed_domains"]
+    cached = _CONFIG_CACHE.get(config_file)
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return _apply_user_settings(cached[2])
 
-            return config
-        except Exception as e:
-            click.echo(f"Warning: Error loading config file: {e}", err=True)
+    try:
+        user_config = _read_user_settings(config_file)
+        config = _apply_user_settings(user_config)
+    except Exception as e:
+        click.echo(f"Warning: Error loading config file: {e}", err=True)
+        return get_default_config()
 
-    return get_default_config()
+    _CONFIG_CACHE[config_file] = (stat.st_mtime_ns, stat.st_size, user_config)
+    return config
 
 
 def save_user_config(config: Config):
     """Save user configuration to config file."""
     config_dir = get_config_dir()
     config_dir.mkdir(parents=True, exist_ok=True)
-    config_file = config_dir / "config.yaml"
+    config_file = config_dir / "config.json"
 
     user_config = {
         "dangerzone_path": str(config.dangerzone_path)
@@ -74,77 +124,84 @@ def save_user_config(config: Config):
 
     try:
         with open(config_file, "w") as f:
-            yaml.dump(user_config, f, default_flow_style=False)
+            json.dump(user_config, f, indent=2)
     except Exception as e:
         click.echo(f"Warning: Could not save config: {e}", err=True)
 
 
-def find_dangerzone_cli() -> Optional[Path]:
-    """Find Dangerzone CLI executable."""
-
-    # Check if already in PATH first
-    cli_path = shutil.which("dangerzone-cli")
-    if cli_path:
-        return Path(cli_path)
-
-    # Check environment variable
-    env_path = os.environ.get("DANGERZONE_CLI_PATH")
-    if env_path:
-        path = Path(env_path)
-        if path.exists():
-            return path
-
-    # Platform-specific search in common installation locations
-    system = platform.system()
+def _dangerzone_cli_candidates(system: str) -> List[Path]:
+    """Common Dangerzone CLI installation locations for a platform."""
+    home = Path.home()
 
     if system == "Darwin":
         # macOS: Check inside app bundle (GUI app installation)
-        macos_paths = [
+        return [
             Path("/Applications/Dangerzone.app/Contents/MacOS/dangerzone-cli"),
-            Path(
-                "~/Applications/Dangerzone.app/Contents/MacOS/dangerzone-cli"
-            ).expanduser(),
+            home / "Applications/Dangerzone.app/Contents/MacOS/dangerzone-cli",
             # Homebrew installation
             Path("/opt/homebrew/bin/dangerzone-cli"),
             Path("/usr/local/bin/dangerzone-cli"),
         ]
-        for path in macos_paths:
-            if path.exists():
-                return path
 
     elif system == "Linux":
         # Linux: Check common package manager installation locations
-        linux_paths = [
+        return [
             # Standard locations for package manager installations
             Path("/usr/bin/dangerzone-cli"),
             Path("/usr/local/bin/dangerzone-cli"),
             Path("/bin/dangerzone-cli"),
             # Flatpak installation
             Path("/var/lib/flatpak/exports/bin/dangerzone-cli"),
-            Path("~/.local/share/flatpak/exports/bin/dangerzone-cli").expanduser(),
+            home / ".local/share/flatpak/exports/bin/dangerzone-cli",
             # Snap installation
             Path("/snap/bin/dangerzone-cli"),
             # AppImage or manual installation in user directories
-            Path("~/.local/bin/dangerzone-cli").expanduser(),
-            Path("~/bin/dangerzone-cli").expanduser(),
+            home / ".local/bin/dangerzone-cli",
+            home / "bin/dangerzone-cli",
         ]
-        for path in linux_paths:
-            if path.exists():
-                return path
 
     elif system == "Windows":
         # Windows: Check common installation locations
-        windows_paths = [
+        return [
             # Program Files installations
             Path("C:/Program Files/Dangerzone/dangerzone-cli.exe"),
             Path("C:/Program Files (x86)/Dangerzone/dangerzone-cli.exe"),
             # User-specific installations
-            Path.home() / "AppData/Local/Dangerzone/dangerzone-cli.exe",
-            Path.home() / "AppData/Roaming/Dangerzone/dangerzone-cli.exe",
+            home / "AppData/Local/Dangerzone/dangerzone-cli.exe",
+            home / "AppData/Roaming/Dangerzone/dangerzone-cli.exe",
         ]
-        for path in windows_paths:
-            if path.exists():
-                return path
+
+    return []
+
+
+# Installation locations for this platform, in search order
+_DANGERZONE_CLI_CANDIDATES = _dangerzone_cli_candidates(_SYSTEM)
+
+
+@functools.lru_cache(maxsize=1)
+def find_dangerzone_cli() -> Optional[Path]:
+    """Find Dangerzone CLI executable."""
+
+    # Check if already in PATH first
+    cli_path = shutil.which("dangerzone-cli")
+    if cli_path:
+        return Path(cli_path)
+
+    # Check environment variable
+    env_path = os.environ.get("DANGERZONE_CLI_PATH")
+    if env_path:
+        try:
+            os.stat(env_path)
+        except (OSError, ValueError):
+            pass
+        else:
+            return Path(env_path)
+
+    # Platform-specific search in common installation locations. A single
+    # lstat per candidate is cheaper than listing directories like /usr/bin.
+    for path in _DANGERZONE_CLI_CANDIDATES:
+        if os.path.lexists(path):
+            return path
 
     return None
 
@@ -155,8 +212,6 @@ def find_dangerzone_cli() -> Optional[Path]:
 def main(ctx, version):
     """Defuse - Secure document download and sanitization tool."""
     if version:
-        from . import __version__
-
         click.echo(f"defuse {__version__}")
         return
 
@@ -197,6 +252,9 @@ def download(
     verbose,
 ):
     """Download and sanitize a document from a URL."""
+    from .downloader import DocumentDownloadError
+    from .sandbox import SandboxedDownloader
+    from .sanitizer import DocumentSanitizer, DocumentSanitizeError
 
     config = load_user_config()
 
@@ -219,7 +277,7 @@ def download(
     if not dangerzone_path:
         click.echo("❌ Dangerzone CLI not found!", err=True)
         click.echo("\nTo install Dangerzone:", err=True)
-        if platform.system() == "Darwin":
+        if _SYSTEM == "Darwin":
             click.echo("  • Download from: https://dangerzone.rocks", err=True)
             click.echo("  • Or use Homebrew: brew install --cask dangerzone", err=True)
         else:
@@ -232,7 +290,7 @@ def download(
     assert dangerzone_path is not None
 
     # Check container runtime availability upfront
-    runtime_name, runtime_path, version = check_container_runtime()
+    runtime_name, runtime_path = find_container_runtime()
     if not runtime_name:
         click.echo("❌ Container runtime not available!", err=True)
         click.echo(
@@ -245,13 +303,13 @@ def download(
 
     try:
         # Initialize components
-        downloader = SandboxedDownloader(config)
         sanitizer = DocumentSanitizer(config.sanitizer, dangerzone_path)
 
         click.echo(f"📥 Downloading document from: {url}")
 
-        # Download document
-        downloaded_file = downloader.sandboxed_download(url)
+        # Download document, removing the downloader's sandbox script after
+        with SandboxedDownloader(config) as downloader:
+            downloaded_file = downloader.sandboxed_download(url)
 
         if downloaded_file is None:
             raise DocumentDownloadError("Download failed - all sandbox methods failed")
@@ -307,6 +365,7 @@ def download(
 @click.option("--verbose", "-v", is_flag=True, help="Verbose output")
 def sanitize(file_path, output_dir, output_filename, verbose):
     """Sanitize a local document file."""
+    from .sanitizer import DocumentSanitizer, DocumentSanitizeError
 
     config = load_user_config()
 
@@ -349,6 +408,57 @@ def sanitize(file_path, output_dir, output_filename, verbose):
         sys.exit(1)
 
 
+_is_comment = operator.methodcaller("startswith", "#")
+
+
+def _iter_urls(lines: Iterable[str]) -> Iterator[str]:
+    """Yield the non-blank, non-comment lines of a URLs file, stripped.
+
+    Built from map/filter so the per-line work stays in C while the file is
+    still read lazily.
+    """
+    return itertools.filterfalse(_is_comment, filter(None, map(str.strip, lines)))
+
+
+def _batch_output_filename(url: str, used_names: Optional[Set[str]] = None) -> str:
+    """Derive the sanitized output filename from the last segment of a URL.
+
+    If used_names is given, a name already in it gets a counter suffix so
+    that URLs sharing a basename don't overwrite each other's output, and
+    the chosen name is added to it.
+    """
+    # URL paths are always '/'-separated, so plain string ops replace Path()
+    original_filename = posixpath.basename(urlparse(url).path.rstrip("/"))
+    base_name = posixpath.splitext(original_filename)[0] or "document"
+    output_filename = f"{base_name}_defused.pdf"
+
+    if used_names is not None:
+        counter = 1
+        while output_filename in used_names:
+            counter += 1
+            output_filename = f"{base_name}_{counter}_defused.pdf"
+        used_names.add(output_filename)
+
+    return output_filename
+
+
+def _process_batch_url(
+    url: str, output_filename: str, downloader, sanitizer, keep_originals: bool
+):
+    """Download and sanitize a single URL from a batch, raising on failure."""
+    from .downloader import DocumentDownloadError
+
+    downloaded_file = downloader.sandboxed_download(url)
+
+    if downloaded_file is None:
+        raise DocumentDownloadError("Download failed - all sandbox methods failed")
+
+    sanitizer.sanitize(downloaded_file, output_filename)
+
+    if not keep_originals:
+        downloaded_file.unlink(missing_ok=True)
+
+
 @main.command()
 @click.argument("urls_file", type=click.File("r"))
 @click.option(
@@ -358,15 +468,35 @@ def sanitize(file_path, output_dir, output_filename, verbose):
     help="Output directory for sanitized documents",
 )
 @click.option("--keep-originals", is_flag=True, help="Keep original downloaded files")
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    help="Number of documents to process concurrently",
+)
+@click.option(
+    "--reuse-container",
+    is_flag=True,
+    help="Download every URL in one long-lived container (faster, less isolated)",
+)
 @click.option("--verbose", "-v", is_flag=True, help="Verbose output")
-def batch(urls_file, output_dir, keep_originals, verbose):
+def batch(urls_file, output_dir, keep_originals, jobs, reuse_container, verbose):
     """Process multiple URLs from a file."""
+    from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+    from tqdm import tqdm
+
+    from .sandbox import SandboxedDownloader
+    from .sanitizer import DocumentSanitizer
 
     config = load_user_config()
 
     if output_dir:
         config.sanitizer.output_dir = Path(output_dir)
 
+    if reuse_container:
+        config.sandbox.reuse_container = True
+
     if verbose:
         config.verbose = verbose
 
@@ -380,7 +510,7 @@ def batch(urls_file, output_dir, keep_originals, verbose):
     assert dangerzone_path is not None
 
     # Check container runtime availability upfront
-    runtime_name, runtime_path, version = check_container_runtime()
+    runtime_name, runtime_path = find_container_runtime()
     if not runtime_name:
         click.echo("❌ Container runtime not available!", err=True)
         click.echo(
@@ -391,91 +521,148 @@ def batch(urls_file, output_dir, keep_originals, verbose):
         )
         sys.exit(1)
 
-    # Read URLs
-    urls = [
-        line.strip() for line in urls_file if line.strip() and not line.startswith("#")
-    ]
-
-    if not urls:
+    # Read URLs lazily, peeking at the first one to reject empty files early
+    urls = _iter_urls(urls_file)
+    first_url = next(urls, None)
+    if first_url is None:
         click.echo("No URLs found in file", err=True)
         sys.exit(1)
+    urls = itertools.chain([first_url], urls)
 
     # Initialize components
     downloader = SandboxedDownloader(config)
     sanitizer = DocumentSanitizer(config.sanitizer, dangerzone_path)
 
     success_count = 0
+    url_count = 0
+
+    # Downloads and Dangerzone runs are independent, so overlap them. Only a
+    # bounded window of URLs is in flight so the file is still read lazily.
+    # Each job may launch its own container, so run one at a time unless
+    # --jobs or the config asks for more
+    max_workers = jobs or config.sandbox.batch_concurrency or 1
+    pending: Dict[Future, str] = {}
+    # Output names handed out so far, kept unique within the batch
+    used_names: Set[str] = set()
+
+    def collect(done, pbar):
+        nonlocal success_count
+        for future in done:
+            url = pending.pop(future)
+            try:
+                future.result()
+            except Exception as e:
+                if verbose:
+                    click.echo(f"\n❌ Failed {url}: {e}", err=True)
+            else:
+                success_count += 1
+                pbar.set_postfix(success=success_count)
+            pbar.update(1)
+
+    with downloader, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        with tqdm(desc="Processing documents", unit="doc") as pbar:
+            for url in urls:
+                url_count += 1
+                future = executor.submit(
+                    _process_batch_url,
+                    url,
+                    _batch_output_filename(url, used_names),
+                    downloader,
+                    sanitizer,
+                    keep_originals,
+                )
+                pending[future] = url
+                if len(pending) >= max_workers * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done, pbar)
 
-    with tqdm(urls, desc="Processing documents") as pbar:
-        for url in pbar:
-            pbar.set_description(f"Processing: {url[:50]}...")
+            collect(wait(pending).done, pbar)
 
-            try:
-                downloaded_file = downloader.sandboxed_download(url)
+    click.echo(f"\n✅ Successfully processed {success_count}/{url_count} documents")
 
-                if downloaded_file is None:
-                    raise DocumentDownloadError(
-                        "Download failed - all sandbox methods failed"
-                    )
 
-                # Extract original filename from URL for batch processing
-                parsed_url = urlparse(url)
-                original_filename = (
-                    Path(parsed_url.path).name if parsed_url.path else "document"
-                )
-                base_name = (
-                    Path(original_filename).stem if original_filename else "document"
-                )
-                output_filename = f"{base_name}_defused.pdf"
+# Container runtimes in order of preference, as (display name, executable)
+_CONTAINER_RUNTIMES = (("Docker", "docker"), ("Podman", "podman"))
 
-                sanitizer.sanitize(downloaded_file, output_filename)
 
-                if not keep_originals:
-                    downloaded_file.unlink(missing_ok=True)
+def _runtime_sockets(executable: str) -> List[str]:
+    """Return the API socket paths a running daemon would listen on."""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    home = str(Path.home())
 
-                success_count += 1
-                pbar.set_postfix(success=success_count)
+    if executable == "docker":
+        docker_host = os.environ.get("DOCKER_HOST", "")
+        sockets = ["/var/run/docker.sock", f"{home}/.docker/run/docker.sock"]
+        if docker_host.startswith("unix://"):
+            sockets.insert(0, docker_host[len("unix://") :])
+        if runtime_dir:
+            sockets.append(f"{runtime_dir}/docker.sock")
+        return sockets
+
+    sockets = ["/run/podman/podman.sock"]
+    if runtime_dir:
+        sockets.append(f"{runtime_dir}/podman/podman.sock")
+    return sockets
 
-            except Exception as e:
-                if verbose:
-                    click.echo(f"\n❌ Failed {url}: {e}", err=True)
-                continue
 
-    click.echo(f"\n✅ Successfully processed {success_count}/{len(urls)} documents")
+@functools.lru_cache(maxsize=None)
+def container_runtime_version(runtime_path: str) -> Optional[str]:
+    """Ask a container runtime for its server version.
+
+    Returns None if the daemon can't be reached. Spawning the runtime's CLI
+    is slow, so callers that only need to know a runtime is usable should
+    use find_container_runtime instead.
+    """
+    try:
+        result = subprocess.run(
+            [runtime_path, "version", "--format", "{{.Server.Version}}"],
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+    except (subprocess.TimeoutExpired, FileNotFoundError):
+        return None
 
+    return result.stdout.strip() if result.returncode == 0 else None
 
+
+@functools.lru_cache(maxsize=1)
+def find_container_runtime() -> Tuple[Optional[str], Optional[str]]:
+    """Find a usable container runtime (Docker/Podman) without spawning it.
+
+    A runtime whose daemon socket exists is taken to be running; otherwise
+    (e.g. daemonless Podman, Windows named pipes) fall back to asking the
+    runtime for its version.
+    """
+    from .sandbox import find_executable
+
+    for name, executable in _CONTAINER_RUNTIMES:
+        runtime_path = find_executable(executable)
+        if not runtime_path:
+            continue
+        if any(os.path.exists(sock) for sock in _runtime_sockets(executable)):
+            return name, runtime_path
+        if container_runtime_version(runtime_path) is not None:
+            return name, runtime_path
+
+    return None, None
+
+
+@functools.lru_cache(maxsize=1)
 def check_container_runtime():
-    """Check for container runtime (Docker/Podman)."""
-    # Check Docker first
-    docker_path = shutil.which("docker")
-    if docker_path:
-        try:
-            # Test if Docker daemon is running
-            result = subprocess.run(
-                [docker_path, "version", "--format", "{{.Server.Version}}"],
-                capture_output=True,
-                text=True,
-                timeout=10,
-            )
-            if result.returncode == 0:
-                return "Docker", docker_path, result.stdout.strip()
-        except (subprocess.TimeoutExpired, FileNotFoundError):
-            pass
+    """Check for container runtime (Docker/Podman) and report its version.
 
-    # Check Podman
-    podman_path = shutil.which("podman")
-    if podman_path:
-        try:
-            result = subprocess.run(
-                [podman_path, "version", "--format", "{{.Server.Version}}"],
-                capture_output=True,
-                text=True,
-                timeout=10,
-            )
-            if result.returncode == 0:
-                return "Podman", podman_path, result.stdout.strip()
-        except (subprocess.TimeoutExpired, FileNotFoundError):
-            pass
+    The result is cached for the life of the process since each probe spawns
+    the runtime's CLI and talks to its daemon.
+    """
+    from .sandbox import find_executable
+
+    for name, executable in _CONTAINER_RUNTIMES:
+        runtime_path = find_executable(executable)
+        if runtime_path:
+            version = container_runtime_version(runtime_path)
+            if version is not None:
+                return name, runtime_path, version
 
     return None, None, None
 
@@ -501,7 +688,7 @@ def check_deps():
     else:
         click.echo("❌ Dangerzone CLI not found")
         click.echo("\nTo install Dangerzone:")
-        if platform.system() == "Darwin":
+        if _SYSTEM == "Darwin":
             click.echo("  • Download from: https://dangerzone.rocks")
             click.echo("  • Or use Homebrew: brew install --cask dangerzone")
         else:
@@ -519,12 +706,12 @@ def check_deps():
     else:
         click.echo("❌ No container runtime found (Docker/Podman)")
         click.echo("\nDangerzone requires a container runtime:")
-        if platform.system() == "Darwin":
+        if _SYSTEM == "Darwin":
             click.echo(
                 "  • Install Docker Desktop: https://docker.com/products/docker-desktop"
             )
             click.echo("  • Or use Homebrew: brew install --cask docker")
-        elif platform.system() == "Linux":
+        elif _SYSTEM == "Linux":
             click.echo("  • Docker: https://docs.docker.com/engine/install/")
             click.echo("  • Podman: Use your package manager (podman)")
         else:
@@ -540,6 +727,7 @@ def check_deps():
 @main.command("test-sandbox")
 def test_sandbox():
     """Test available sandboxing capabilities."""
+    from .sandbox import get_sandbox_capabilities
 
     click.echo("🛡️  Testing sandbox capabilities...\n")
 
@@ -580,7 +768,7 @@ def test_sandbox():
     # Resource limits test
     click.echo("\n🔒 Resource limits test:")
     try:
-        if platform.system() == "Windows":
+        if _SYSTEM == "Windows":
             click.echo(
                 "  ℹ️ Resource limits not available on Windows (using container limits)"
             )
@@ -612,13 +800,14 @@ def test_sandbox():
 @main.command("security-report")
 def security_report():
     """Generate a detailed security report."""
+    from .sandbox import SandboxedDownloader
 
     config = load_user_config()
 
     # Create a sandboxed downloader to get capabilities
     try:
-        sandboxed_downloader = SandboxedDownloader(config)
-        security_info = sandboxed_downloader.get_security_report()
+        with SandboxedDownloader(config) as sandboxed_downloader:
+            security_info = sandboxed_downloader.get_security_report()
 
         click.echo("🔒 Defuse Security Report\n")
 
@@ -10,6 +10,7 @@ class SandboxConfig:
     temp_dir: Path = Path("/tmp/pdf-sandbox")
     max_file_size: int = 100 * 1024 * 1024  # 100MB
     download_timeout: int = 30
+    download_chunk_size: int = 256 * 1024  # Bytes read/written per I/O call
     allowed_domains: Optional[List[str]] = None
     user_agent: str = "Mozilla/5.0 (compatible; PDF-Sanitizer/1.0)"
 
@@ -17,6 +18,8 @@ class SandboxConfig:
     max_memory_mb: int = 512  # Maximum memory for download process
     max_memory_buffer_mb: int = 10  # Size before spilling to disk
     max_cpu_seconds: int = 60  # CPU time limit
+    batch_concurrency: int = 1  # Documents a batch processes at once
+    reuse_container: bool = False  # One warm container for all downloads
 
     # Security options
     prefer_memory_download: bool = True  # Use memory-first downloads
@@ -49,9 +52,8 @@ class Config:
         self.sandbox = SandboxConfig()
         self.sanitizer = SanitizerConfig()
 
-        # Create necessary directories
-        self.sandbox.temp_dir.mkdir(parents=True, exist_ok=True)
-        self.sanitizer.output_dir.mkdir(parents=True, exist_ok=True)
+        # Directories are created by the downloader and sanitizer when they
+        # are first used, so building a config has no filesystem side effects
 
 
 def get_default_config() -> Config:
@@ -1,14 +1,32 @@
 import io
+import os
+import platform
+import re
+import shutil
 import tempfile
 import urllib.parse
-import resource
 from pathlib import Path
-from typing import Optional, Union, BinaryIO
+from typing import List, Optional, Tuple, Union, BinaryIO
 import requests
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
+from urllib3.util.retry import Retry
 
 from .config import SandboxConfig
-from .formats import FileTypeDetector
+from .formats import FileTypeDetector, normalize_mime_type
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Resource limits are not available on Windows
+_RESOURCE_LIMITS_SUPPORTED = resource is not None and platform.system() != "Windows"
+
+# Leftover downloads: *.tmp, *.pdf, *.doc*, *.xls*, *.ppt*, *.odt, *.ods, *.odp
+_TEMP_FILE_PATTERN = re.compile(
+    r".*\.(?:tmp|pdf|doc.*|xls.*|ppt.*|odt|ods|odp)", re.DOTALL
+)
 
 
 class DocumentDownloadError(Exception):
@@ -30,27 +48,45 @@ class SecureDocumentDownloader:
                 "Accept": "*/*",  # Accept all file types
             }
         )
+
+        # Keep connections alive across a batch and retry transient gateway
+        # errors instead of failing the document outright
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=64,
+            max_retries=Retry(
+                total=2,
+                backoff_factor=0.2,
+                status_forcelist=[502, 503, 504],
+            ),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.config.temp_dir.mkdir(parents=True, exist_ok=True)
         self._setup_resource_limits()
 
     def _setup_resource_limits(self):
         """Set up resource limits for the download process (Unix only)"""
-        try:
-            import platform
-
-            if platform.system() == "Windows":
-                # Resource limits not available on Windows
-                return
+        if not _RESOURCE_LIMITS_SUPPORTED:
+            return
 
-            # Limit virtual memory to prevent memory exhaustion attacks
+        try:
             max_memory = getattr(self.config, "max_memory_mb", 512) * 1024 * 1024
-            resource.setrlimit(resource.RLIMIT_AS, (max_memory, max_memory))
-
-            # Limit CPU time to prevent CPU exhaustion
             max_cpu_time = getattr(self.config, "max_cpu_seconds", 60)
-            resource.setrlimit(resource.RLIMIT_CPU, (max_cpu_time, max_cpu_time))
-
-            # Limit number of file descriptors
-            resource.setrlimit(resource.RLIMIT_NOFILE, (64, 128))
+            limits = [
+                # Limit virtual memory to prevent memory exhaustion attacks
+                (resource.RLIMIT_AS, (max_memory, max_memory)),
+                # Limit CPU time to prevent CPU exhaustion
+                (resource.RLIMIT_CPU, (max_cpu_time, max_cpu_time)),
+                # Limit number of file descriptors
+                (resource.RLIMIT_NOFILE, (64, 128)),
+            ]
+
+            getrlimit, setrlimit = resource.getrlimit, resource.setrlimit
+            for which, limit in limits:
+                # Skip limits already in place, e.g. from an earlier downloader
+                if getrlimit(which) != limit:
+                    setrlimit(which, limit)
 
         except (OSError, ValueError, AttributeError):
             # Resource limits may fail on some systems, continue without them
@@ -67,11 +103,16 @@ class SecureDocumentDownloader:
             if parsed.scheme not in ["http", "https"]:
                 return False
 
-            if self.config.allowed_domains:
-                domain = parsed.netloc.lower()
+            # Read on each call, so later changes to the config apply
+            allowed_domains = {
+                domain.lower().lstrip(".")
+                for domain in self.config.allowed_domains or ()
+            }
+            if allowed_domains:
+                # Match the host or any parent domain of it
+                labels = (parsed.hostname or "").split(".")
                 if not any(
-                    domain.endswith(allowed.lower())
-                    for allowed in self.config.allowed_domains
+                    ".".join(labels[i:]) in allowed_domains for i in range(len(labels))
                 ):
                     return False
 
@@ -81,17 +122,14 @@ class SecureDocumentDownloader:
 
     def check_content_type(self, response: requests.Response) -> bool:
         """Check if response content type indicates a supported document format"""
-        content_type = response.headers.get("content-type", "").lower()
+        content_type = response.headers.get("content-type", "")
         if not content_type:
             # No content type - we'll validate by magic bytes later
             return True
 
-        # Remove charset and other parameters
-        mime_type = content_type.split(";")[0].strip()
-
-        # Check if this MIME type is supported
-        supported_formats = self.file_detector.detect_from_mime_type(mime_type)
-        return len(supported_formats) > 0
+        # Check if this MIME type (without charset etc.) is supported
+        mime_type = normalize_mime_type(content_type)
+        return mime_type in self.file_detector.supported_mime_types
 
     def validate_document_format(
         self, file_path: Path, expected_mime: Optional[str] = None
@@ -144,77 +182,81 @@ class SecureDocumentDownloader:
             )
 
         try:
-            # Set up timeout alarm
-            # Set up timeout (cross-platform via requests timeout parameter)
-
-            # Get file info first
-            response = self.session.head(url, timeout=self.config.download_timeout)
-            response.raise_for_status()
-
-            # Check content length
-            content_length = int(response.headers.get("content-length", 0))
-            if content_length > self.config.max_file_size:
-                raise DocumentDownloadError(
-                    f"File too large: {content_length} bytes "
-                    f"(max: {self.config.max_file_size})"
-                )
-
-            # Choose memory strategy based on size
-            if content_length > 0 and content_length <= max_memory_size:
-                # Small file: use pure memory
-                memory_buffer: Union[io.BytesIO, tempfile.SpooledTemporaryFile] = (
-                    io.BytesIO()
-                )
-                use_buffer = memory_buffer
-            else:
-                # Large file or unknown size: use spooled temp file
-                memory_buffer = tempfile.SpooledTemporaryFile(
-                    max_size=max_memory_size, dir=str(self.config.temp_dir)
-                )
-                use_buffer = memory_buffer
-
-            # Download with streaming
+            # A single streaming GET: the headers arrive before the body, so
+            # size and type are checked without a separate HEAD round trip
             response = self.session.get(
                 url, timeout=self.config.download_timeout, stream=True
             )
-            response.raise_for_status()
+            with response:
+                response.raise_for_status()
+
+                # Check content length
+                content_length = int(response.headers.get("content-length", 0))
+                if content_length > self.config.max_file_size:
+                    raise DocumentDownloadError(
+                        f"File too large: {content_length} bytes "
+                        f"(max: {self.config.max_file_size})"
+                    )
+
+                # Verify content type
+                content_type = response.headers.get("content-type", "")
+                if not self.check_content_type(response):
+                    raise DocumentDownloadError(
+                        f"Response content type '{content_type}' is not supported"
+                    )
+
+                # Choose memory strategy based on size
+                chunks: List[bytes] = []
+                spool: Optional[tempfile.SpooledTemporaryFile] = None
+                if content_length > 0 and content_length <= max_memory_size:
+                    # Small file: collect the chunks and join them once at the
+                    # end, rather than letting a BytesIO grow by reallocation
+                    write = chunks.append
+                else:
+                    # Large file or unknown size: use spooled temp file
+                    spool = tempfile.SpooledTemporaryFile(
+                        max_size=max_memory_size, dir=str(self.config.temp_dir)
+                    )
+                    write = spool.write
+
+                downloaded = 0
+                max_size = self.config.max_file_size
+                header = b""
+                header_size = self.file_detector.magic_max_length
 
-            # Verify content type
-            content_type = response.headers.get("content-type", "")
-            if not self.check_content_type(response):
-                raise DocumentDownloadError(
-                    f"Response content type '{content_type}' is not supported"
-                )
+                with tqdm(
+                    total=content_length, unit="B", unit_scale=True, desc="Downloading"
+                ) as pbar:
+                    for chunk in response.iter_content(
+                        chunk_size=self.config.download_chunk_size
+                    ):
+                        if chunk:
+                            size = len(chunk)
+                            downloaded += size
+                            if downloaded > max_size:
+                                raise DocumentDownloadError(
+                                    "File size exceeded during download"
+                                )
 
-            total_size = int(response.headers.get("content-length", 0))
-            downloaded = 0
+                            # Check the format as soon as the header is in,
+                            # before fetching the rest of a file we'd reject
+                            if len(header) < header_size:
+                                header += chunk[: header_size - len(header)]
+                                if len(header) == header_size:
+                                    self._validate_header(header, content_type)
 
-            with tqdm(
-                total=total_size, unit="B", unit_scale=True, desc="Downloading"
-            ) as pbar:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        downloaded += len(chunk)
-                        if downloaded > self.config.max_file_size:
-                            # Timeout handled by requests
-                            raise DocumentDownloadError(
-                                "File size exceeded during download"
-                            )
+                            write(chunk)
+                            pbar.update(size)
+
+            # BytesIO shares the joined bytes instead of copying them
+            use_buffer: Union[io.BytesIO, tempfile.SpooledTemporaryFile] = (
+                io.BytesIO(b"".join(chunks)) if spool is None else spool
+            )
 
-                        use_buffer.write(chunk)
-                        pbar.update(len(chunk))
+            self._validate_document(use_buffer, content_type)
 
             # Reset position to start
             use_buffer.seek(0)
-
-            # Validate document format
-            if not self.validate_document_format_buffer(use_buffer, content_type):
-                # Timeout handled by requests
-                raise DocumentDownloadError(
-                    "Downloaded file is not a supported document format"
-                )
-
-            # Timeout handled by requests  # Cancel timeout
             return use_buffer
 
         except requests.RequestException as e:
@@ -224,26 +266,89 @@ class SecureDocumentDownloader:
             # Timeout handled by requests
             raise DocumentDownloadError(f"Unexpected error: {str(e)}")
 
+    def _validate_header(
+        self, header: bytes, content_type: str, filename: Optional[str] = None
+    ):
+        """Reject a download whose leading bytes are not a supported format"""
+        if not self.validate_document_format_buffer(
+            io.BytesIO(header), content_type, filename
+        ):
+            raise DocumentDownloadError(
+                "Downloaded file is not a supported document format"
+            )
+
+    def _validate_document(
+        self, buffer: BinaryIO, content_type: str, filename: Optional[str] = None
+    ):
+        """Reject a completed download that is not a supported format.
+
+        ZIP and OLE containers are told apart by their directories, which
+        need the whole file rather than the header checked while streaming.
+        """
+        if not self.validate_document_format_buffer(buffer, content_type, filename):
+            raise DocumentDownloadError(
+                "Downloaded file is not a supported document format"
+            )
+
+    def _copy_spooled_file(self, spool: BinaryIO, f: BinaryIO):
+        """Copy a spilled spool file to f, in the kernel where supported"""
+        spool.flush()
+        src_fd = spool.fileno()
+        size = os.fstat(src_fd).st_size
+        offset = 0
+        try:
+            while offset < size:
+                sent = os.sendfile(f.fileno(), src_fd, offset, size - offset)
+                if not sent:
+                    break
+                offset += sent
+        except (AttributeError, OSError):
+            # No sendfile, or it can't write to regular files here (macOS)
+            pass
+        spool.seek(offset)
+        shutil.copyfileobj(spool, f, self.config.download_chunk_size)
+
     def save_buffer_to_file(
         self,
         buffer: Union[io.BytesIO, tempfile.SpooledTemporaryFile],
         output_path: Path,
     ) -> Path:
         """Save memory buffer to file"""
+        return self._save_buffer(buffer, output_path)
+
+    def _save_buffer(
+        self,
+        buffer: Union[io.BytesIO, tempfile.SpooledTemporaryFile],
+        output_path: Path,
+        f: Optional[BinaryIO] = None,
+    ) -> Path:
+        """Save buffer to output_path, writing through f if already open"""
         try:
             buffer.seek(0)
-            with open(output_path, "wb") as f:
-                while True:
-                    chunk = buffer.read(8192)
-                    if not chunk:
-                        break
-                    f.write(chunk)
+            if f is None:
+                f = open(output_path, "wb")
+            with f:
+                if isinstance(buffer, io.BytesIO):
+                    # getvalue() hands back the bytes the buffer was built
+                    # from; getbuffer() would make BytesIO copy them first
+                    f.write(buffer.getvalue())
+                elif (
+                    isinstance(buffer, tempfile.SpooledTemporaryFile) and buffer._rolled
+                ):
+                    self._copy_spooled_file(buffer, f)
+                else:
+                    shutil.copyfileobj(buffer, f, self.config.download_chunk_size)
             return output_path
         except Exception as e:
             if output_path.exists():
                 output_path.unlink(missing_ok=True)
             raise DocumentDownloadError(f"Failed to save buffer to file: {str(e)}")
 
+    def _open_temp_file(self) -> Tuple[BinaryIO, Path]:
+        """Create a temp file for a download, returning it open for writing"""
+        fd, name = tempfile.mkstemp(suffix=".tmp", dir=self.config.temp_dir)
+        return os.fdopen(fd, "wb"), Path(name)
+
     def download(
         self, url: str, output_path: Optional[Path] = None, prefer_memory: bool = True
     ) -> Path:
@@ -265,15 +370,10 @@ class SecureDocumentDownloader:
             # Use memory-first download strategy
             memory_buffer = self.download_to_memory(url)
 
-            # Prepare output path
-            if output_path is None:
-                temp_file = tempfile.NamedTemporaryFile(
-                    dir=self.config.temp_dir, suffix=".tmp", delete=False
-                )
-                output_path = Path(temp_file.name)
-                temp_file.close()
-
             # Save memory buffer to file
+            if output_path is None:
+                f, output_path = self._open_temp_file()
+                return self._save_buffer(memory_buffer, output_path, f)
             return self.save_buffer_to_file(memory_buffer, output_path)
 
         else:
@@ -288,64 +388,72 @@ class SecureDocumentDownloader:
             raise DocumentDownloadError(f"Invalid or restricted URL: {url}")
 
         try:
-            # Get file info first
-            response = self.session.head(url, timeout=self.config.download_timeout)
-            response.raise_for_status()
-
-            # Check content length
-            content_length = int(response.headers.get("content-length", 0))
-            if content_length > self.config.max_file_size:
-                raise DocumentDownloadError(
-                    f"File too large: {content_length} bytes "
-                    f"(max: {self.config.max_file_size})"
-                )
-
-            # Prepare output path
-            if output_path is None:
-                temp_file = tempfile.NamedTemporaryFile(
-                    dir=self.config.temp_dir, suffix=".tmp", delete=False
-                )
-                output_path = Path(temp_file.name)
-                temp_file.close()
-
-            # Download with progress bar
+            # A single streaming GET: the headers arrive before the body, so
+            # size and type are checked without a separate HEAD round trip
             response = self.session.get(
                 url, timeout=self.config.download_timeout, stream=True
             )
-            response.raise_for_status()
-
-            # Verify content type
-            content_type = response.headers.get("content-type", "")
-            if not self.check_content_type(response):
-                raise DocumentDownloadError(
-                    f"Response content type '{content_type}' is not supported"
-                )
-
-            total_size = int(response.headers.get("content-length", 0))
-            downloaded = 0
-
-            with open(output_path, "wb") as f:
-                with tqdm(
-                    total=total_size, unit="B", unit_scale=True, desc="Downloading"
-                ) as pbar:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            downloaded += len(chunk)
-                            if downloaded > self.config.max_file_size:
-                                output_path.unlink(missing_ok=True)
-                                raise DocumentDownloadError(
-                                    "File size exceeded during download"
-                                )
-
-                            f.write(chunk)
-                            pbar.update(len(chunk))
-
-            # Validate document format
-            if not self.validate_document_format(output_path, content_type):
-                output_path.unlink(missing_ok=True)
-                raise DocumentDownloadError(
-                    "Downloaded file is not a supported document format"
-                )
+            with response:
+                response.raise_for_status()
+
+                # Check content length
+                content_length = int(response.headers.get("content-length", 0))
+                if content_length > self.config.max_file_size:
+                    raise DocumentDownloadError(
+                        f"File too large: {content_length} bytes "
+                        f"(max: {self.config.max_file_size})"
+                    )
+
+                # Verify content type
+                content_type = response.headers.get("content-type", "")
+                if not self.check_content_type(response):
+                    raise DocumentDownloadError(
+                        f"Response content type '{content_type}' is not supported"
+                    )
+
+                # Prepare output file
+                if output_path is None:
+                    f, output_path = self._open_temp_file()
+                else:
+                    f = open(output_path, "wb")
+
+                downloaded = 0
+                max_size = self.config.max_file_size
+                header = b""
+                header_size = self.file_detector.magic_max_length
+
+                with f:
+                    with tqdm(
+                        total=content_length,
+                        unit="B",
+                        unit_scale=True,
+                        desc="Downloading",
+                    ) as pbar:
+                        for chunk in response.iter_content(
+                            chunk_size=self.config.download_chunk_size
+                        ):
+                            if chunk:
+                                size = len(chunk)
+                                downloaded += size
+                                if downloaded > max_size:
+                                    output_path.unlink(missing_ok=True)
+                                    raise DocumentDownloadError(
+                                        "File size exceeded during download"
+                                    )
+
+                                # Check the format as soon as the header is in
+                                if len(header) < header_size:
+                                    header += chunk[: header_size - len(header)]
+                                    if len(header) == header_size:
+                                        self._validate_header(
+                                            header, content_type, str(output_path)
+                                        )
+
+                                f.write(chunk)
+                                pbar.update(size)
+
+            with open(output_path, "rb") as f:
+                self._validate_document(f, content_type, str(output_path))
 
             return output_path
 
@@ -361,18 +469,13 @@ class SecureDocumentDownloader:
     def cleanup_temp_files(self):
         """Clean up temporary files"""
         try:
-            # Clean up both .tmp files and any leftover document files
-            for pattern in [
-                "*.tmp",
-                "*.pdf",
-                "*.doc*",
-                "*.xls*",
-                "*.ppt*",
-                "*.odt",
-                "*.ods",
-                "*.odp",
-            ]:
-                for temp_file in self.config.temp_dir.glob(pattern):
-                    temp_file.unlink(missing_ok=True)
+            # Clean up both .tmp files and any leftover document files in a
+            # single pass over the directory
+            with os.scandir(self.config.temp_dir) as entries:
+                for entry in entries:
+                    if not _TEMP_FILE_PATTERN.fullmatch(entry.name):
+                        continue
+                    if not entry.is_dir(follow_symlinks=False):
+                        os.unlink(entry.path)
         except Exception:
             pass
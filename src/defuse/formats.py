@@ -2,12 +2,33 @@
 File format detection and validation for all Dangerzone-supported types.
 """
 
+import functools
+import os
+import re
+import struct
+import zipfile
+import zlib
 from enum import Enum
-from pathlib import Path
-from typing import Optional, BinaryIO, Tuple, Dict, List, Set
+from types import MappingProxyType
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+)
 from dataclasses import dataclass
 
 
+def normalize_mime_type(content_type: str) -> str:
+    """Reduce a Content-Type value to its lowercase MIME type without parameters"""
+    return content_type.partition(";")[0].strip().lower()
+
+
 class SupportedFormat(Enum):
     """All file formats supported by Dangerzone"""
 
@@ -49,212 +70,212 @@ class FormatInfo:
     description: str
 
 
+# Every Dangerzone-supported format with its detection info
+_FORMAT_REGISTRY: Mapping[SupportedFormat, FormatInfo] = MappingProxyType(
+    {
+        # Documents
+        SupportedFormat.PDF: FormatInfo(
+            format=SupportedFormat.PDF,
+            mime_types=["application/pdf"],
+            extensions=[".pdf"],
+            magic_bytes=[b"%PDF"],
+            description="Portable Document Format",
+        ),
+        SupportedFormat.DOCX: FormatInfo(
+            format=SupportedFormat.DOCX,
+            mime_types=[
+                "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+            ],
+            extensions=[".docx"],
+            magic_bytes=[b"PK\x03\x04"],  # ZIP signature (DOCX is ZIP-based)
+            description="Microsoft Word Document (Modern)",
+        ),
+        SupportedFormat.DOC: FormatInfo(
+            format=SupportedFormat.DOC,
+            mime_types=["application/msword"],
+            extensions=[".doc"],
+            magic_bytes=[b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"],  # OLE signature
+            description="Microsoft Word Document (Legacy)",
+        ),
+        SupportedFormat.XLSX: FormatInfo(
+            format=SupportedFormat.XLSX,
+            mime_types=[
+                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            ],
+            extensions=[".xlsx"],
+            magic_bytes=[b"PK\x03\x04"],  # ZIP signature
+            description="Microsoft Excel Spreadsheet (Modern)",
+        ),
+        SupportedFormat.XLS: FormatInfo(
+            format=SupportedFormat.XLS,
+            mime_types=["application/vnd.ms-excel"],
+            extensions=[".xls"],
+            magic_bytes=[b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"],  # OLE signature
+            description="Microsoft Excel Spreadsheet (Legacy)",
+        ),
+        SupportedFormat.PPTX: FormatInfo(
+            format=SupportedFormat.PPTX,
+            mime_types=[
+                "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+            ],
+            extensions=[".pptx"],
+            magic_bytes=[b"PK\x03\x04"],  # ZIP signature
+            description="Microsoft PowerPoint Presentation (Modern)",
+        ),
+        SupportedFormat.PPT: FormatInfo(
+            format=SupportedFormat.PPT,
+            mime_types=["application/vnd.ms-powerpoint"],
+            extensions=[".ppt"],
+            magic_bytes=[b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"],  # OLE signature
+            description="Microsoft PowerPoint Presentation (Legacy)",
+        ),
+        SupportedFormat.ODT: FormatInfo(
+            format=SupportedFormat.ODT,
+            mime_types=["application/vnd.oasis.opendocument.text"],
+            extensions=[".odt"],
+            magic_bytes=[b"PK\x03\x04"],  # ZIP signature (ODF is ZIP-based)
+            description="OpenDocument Text",
+        ),
+        SupportedFormat.ODS: FormatInfo(
+            format=SupportedFormat.ODS,
+            mime_types=["application/vnd.oasis.opendocument.spreadsheet"],
+            extensions=[".ods"],
+            magic_bytes=[b"PK\x03\x04"],  # ZIP signature
+            description="OpenDocument Spreadsheet",
+        ),
+        SupportedFormat.ODP: FormatInfo(
+            format=SupportedFormat.ODP,
+            mime_types=["application/vnd.oasis.opendocument.presentation"],
+            extensions=[".odp"],
+            magic_bytes=[b"PK\x03\x04"],  # ZIP signature
+            description="OpenDocument Presentation",
+        ),
+        SupportedFormat.ODG: FormatInfo(
+            format=SupportedFormat.ODG,
+            mime_types=["application/vnd.oasis.opendocument.graphics"],
+            extensions=[".odg"],
+            magic_bytes=[b"PK\x03\x04"],  # ZIP signature
+            description="OpenDocument Graphics",
+        ),
+        SupportedFormat.RTF: FormatInfo(
+            format=SupportedFormat.RTF,
+            mime_types=["application/rtf", "text/rtf"],
+            extensions=[".rtf"],
+            magic_bytes=[b"{\\rtf"],
+            description="Rich Text Format",
+        ),
+        SupportedFormat.EPUB: FormatInfo(
+            format=SupportedFormat.EPUB,
+            mime_types=["application/epub+zip"],
+            extensions=[".epub"],
+            magic_bytes=[b"PK\x03\x04"],  # ZIP signature
+            description="Electronic Publication",
+        ),
+        SupportedFormat.HWP: FormatInfo(
+            format=SupportedFormat.HWP,
+            mime_types=["application/x-hwp"],
+            extensions=[".hwp"],
+            magic_bytes=[b"HWP Document File"],
+            description="Hancom Office Document",
+        ),
+        SupportedFormat.HWPX: FormatInfo(
+            format=SupportedFormat.HWPX,
+            mime_types=["application/hwp+zip"],
+            extensions=[".hwpx"],
+            magic_bytes=[b"PK\x03\x04"],  # ZIP signature
+            description="Hancom Office Document (XML)",
+        ),
+        # Images
+        SupportedFormat.JPEG: FormatInfo(
+            format=SupportedFormat.JPEG,
+            mime_types=["image/jpeg", "image/jpg"],
+            extensions=[".jpg", ".jpeg"],
+            magic_bytes=[b"\xff\xd8\xff"],
+            description="JPEG Image",
+        ),
+        SupportedFormat.PNG: FormatInfo(
+            format=SupportedFormat.PNG,
+            mime_types=["image/png"],
+            extensions=[".png"],
+            magic_bytes=[b"\x89PNG\r\n\x1a\n"],
+            description="PNG Image",
+        ),
+        SupportedFormat.GIF: FormatInfo(
+            format=SupportedFormat.GIF,
+            mime_types=["image/gif"],
+            extensions=[".gif"],
+            magic_bytes=[b"GIF87a", b"GIF89a"],
+            description="GIF Image",
+        ),
+        SupportedFormat.TIFF: FormatInfo(
+            format=SupportedFormat.TIFF,
+            mime_types=["image/tiff"],
+            extensions=[".tif", ".tiff"],
+            magic_bytes=[b"II*\x00", b"MM\x00*"],  # Little-endian and big-endian
+            description="TIFF Image",
+        ),
+        SupportedFormat.BMP: FormatInfo(
+            format=SupportedFormat.BMP,
+            mime_types=["image/bmp"],
+            extensions=[".bmp"],
+            magic_bytes=[b"BM"],
+            description="Bitmap Image",
+        ),
+        SupportedFormat.SVG: FormatInfo(
+            format=SupportedFormat.SVG,
+            mime_types=["image/svg+xml"],
+            extensions=[".svg"],
+            magic_bytes=[b"<?xml", b"<svg"],
+            description="Scalable Vector Graphics",
+        ),
+        SupportedFormat.WEBP: FormatInfo(
+            format=SupportedFormat.WEBP,
+            mime_types=["image/webp"],
+            extensions=[".webp"],
+            magic_bytes=[b"RIFF"],  # Followed by WEBP later in header
+            description="WebP Image",
+        ),
+    }
+)
+
+
+def _index_formats(
+    field: str, normalize: Callable[[Any], Any] = lambda key: key
+) -> Mapping[Any, Tuple[SupportedFormat, ...]]:
+    """Index the registry by one FormatInfo field, in registry order"""
+    index: Dict[Any, List[SupportedFormat]] = {}
+    for format_info in _FORMAT_REGISTRY.values():
+        for key in getattr(format_info, field):
+            index.setdefault(normalize(key), []).append(format_info.format)
+    return MappingProxyType({key: tuple(formats) for key, formats in index.items()})
+
+
+_MAGIC_TO_FORMAT = _index_formats("magic_bytes")
+_MIME_TO_FORMAT = _index_formats("mime_types")
+_EXT_TO_FORMAT = _index_formats("extensions", str.lower)
+_SUPPORTED_MIME_TYPES = frozenset(_MIME_TO_FORMAT)
+
+# All magic byte signatures in one anchored alternation, longest first so a
+# signature never loses to one of its own prefixes
+_MAGIC_PATTERN = re.compile(
+    b"|".join(
+        re.escape(magic) for magic in sorted(_MAGIC_TO_FORMAT, key=len, reverse=True)
+    )
+)
+_MAGIC_MAX_LENGTH = max(map(len, _MAGIC_TO_FORMAT))
+
+
 class FileTypeDetector:
     """Detects file types based on magic bytes, MIME types, and extensions"""
 
-    def __init__(self):
-        self.format_registry = self._build_format_registry()
-        self.magic_to_format = self._build_magic_index()
-        self.mime_to_format = self._build_mime_index()
-        self.ext_to_format = self._build_extension_index()
-
-    def _build_format_registry(self) -> Dict[SupportedFormat, FormatInfo]:
-        """Build complete format registry with detection info"""
-        return {
-            # Documents
-            SupportedFormat.PDF: FormatInfo(
-                format=SupportedFormat.PDF,
-                mime_types=["application/pdf"],
-                extensions=[".pdf"],
-                magic_bytes=[b"%PDF"],
-                description="Portable Document Format",
-            ),
-            SupportedFormat.DOCX: FormatInfo(
-                format=SupportedFormat.DOCX,
-                mime_types=[
-                    "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                ],
-                extensions=[".docx"],
-                magic_bytes=[b"PK\x03\x04"],  # ZIP signature (DOCX is ZIP-based)
-                description="Microsoft Word Document (Modern)",
-            ),
-            SupportedFormat.DOC: FormatInfo(
-                format=SupportedFormat.DOC,
-                mime_types=["application/msword"],
-                extensions=[".doc"],
-                magic_bytes=[b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"],  # OLE signature
-                description="Microsoft Word Document (Legacy)",
-            ),
-            SupportedFormat.XLSX: FormatInfo(
-                format=SupportedFormat.XLSX,
-                mime_types=[
-                    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                ],
-                extensions=[".xlsx"],
-                magic_bytes=[b"PK\x03\x04"],  # ZIP signature
-                description="Microsoft Excel Spreadsheet (Modern)",
-            ),
-            SupportedFormat.XLS: FormatInfo(
-                format=SupportedFormat.XLS,
-                mime_types=["application/vnd.ms-excel"],
-                extensions=[".xls"],
-                magic_bytes=[b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"],  # OLE signature
-                description="Microsoft Excel Spreadsheet (Legacy)",
-            ),
-            SupportedFormat.PPTX: FormatInfo(
-                format=SupportedFormat.PPTX,
-                mime_types=[
-                    "application/vnd.openxmlformats-officedocument.presentationml.presentation"
-                ],
-                extensions=[".pptx"],
-                magic_bytes=[b"PK\x03\x04"],  # ZIP signature
-                description="Microsoft PowerPoint Presentation (Modern)",
-            ),
-            SupportedFormat.PPT: FormatInfo(
-                format=SupportedFormat.PPT,
-                mime_types=["application/vnd.ms-powerpoint"],
-                extensions=[".ppt"],
-                magic_bytes=[b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"],  # OLE signature
-                description="Microsoft PowerPoint Presentation (Legacy)",
-            ),
-            SupportedFormat.ODT: FormatInfo(
-                format=SupportedFormat.ODT,
-                mime_types=["application/vnd.oasis.opendocument.text"],
-                extensions=[".odt"],
-                magic_bytes=[b"PK\x03\x04"],  # ZIP signature (ODF is ZIP-based)
-                description="OpenDocument Text",
-            ),
-            SupportedFormat.ODS: FormatInfo(
-                format=SupportedFormat.ODS,
-                mime_types=["application/vnd.oasis.opendocument.spreadsheet"],
-                extensions=[".ods"],
-                magic_bytes=[b"PK\x03\x04"],  # ZIP signature
-                description="OpenDocument Spreadsheet",
-            ),
-            SupportedFormat.ODP: FormatInfo(
-                format=SupportedFormat.ODP,
-                mime_types=["application/vnd.oasis.opendocument.presentation"],
-                extensions=[".odp"],
-                magic_bytes=[b"PK\x03\x04"],  # ZIP signature
-                description="OpenDocument Presentation",
-            ),
-            SupportedFormat.ODG: FormatInfo(
-                format=SupportedFormat.ODG,
-                mime_types=["application/vnd.oasis.opendocument.graphics"],
-                extensions=[".odg"],
-                magic_bytes=[b"PK\x03\x04"],  # ZIP signature
-                description="OpenDocument Graphics",
-            ),
-            SupportedFormat.RTF: FormatInfo(
-                format=SupportedFormat.RTF,
-                mime_types=["application/rtf", "text/rtf"],
-                extensions=[".rtf"],
-                magic_bytes=[b"{\\rtf"],
-                description="Rich Text Format",
-            ),
-            SupportedFormat.EPUB: FormatInfo(
-                format=SupportedFormat.EPUB,
-                mime_types=["application/epub+zip"],
-                extensions=[".epub"],
-                magic_bytes=[b"PK\x03\x04"],  # ZIP signature
-                description="Electronic Publication",
-            ),
-            SupportedFormat.HWP: FormatInfo(
-                format=SupportedFormat.HWP,
-                mime_types=["application/x-hwp"],
-                extensions=[".hwp"],
-                magic_bytes=[b"HWP Document File"],
-                description="Hancom Office Document",
-            ),
-            SupportedFormat.HWPX: FormatInfo(
-                format=SupportedFormat.HWPX,
-                mime_types=["application/hwp+zip"],
-                extensions=[".hwpx"],
-                magic_bytes=[b"PK\x03\x04"],  # ZIP signature
-                description="Hancom Office Document (XML)",
-            ),
-            # Images
-            SupportedFormat.JPEG: FormatInfo(
-                format=SupportedFormat.JPEG,
-                mime_types=["image/jpeg", "image/jpg"],
-                extensions=[".jpg", ".jpeg"],
-                magic_bytes=[b"\xff\xd8\xff"],
-                description="JPEG Image",
-            ),
-            SupportedFormat.PNG: FormatInfo(
-                format=SupportedFormat.PNG,
-                mime_types=["image/png"],
-                extensions=[".png"],
-                magic_bytes=[b"\x89PNG\r\n\x1a\n"],
-                description="PNG Image",
-            ),
-            SupportedFormat.GIF: FormatInfo(
-                format=SupportedFormat.GIF,
-                mime_types=["image/gif"],
-                extensions=[".gif"],
-                magic_bytes=[b"GIF87a", b"GIF89a"],
-                description="GIF Image",
-            ),
-            SupportedFormat.TIFF: FormatInfo(
-                format=SupportedFormat.TIFF,
-                mime_types=["image/tiff"],
-                extensions=[".tif", ".tiff"],
-                magic_bytes=[b"II*\x00", b"MM\x00*"],  # Little-endian and big-endian
-                description="TIFF Image",
-            ),
-            SupportedFormat.BMP: FormatInfo(
-                format=SupportedFormat.BMP,
-                mime_types=["image/bmp"],
-                extensions=[".bmp"],
-                magic_bytes=[b"BM"],
-                description="Bitmap Image",
-            ),
-            SupportedFormat.SVG: FormatInfo(
-                format=SupportedFormat.SVG,
-                mime_types=["image/svg+xml"],
-                extensions=[".svg"],
-                magic_bytes=[b"<?xml", b"<svg"],
-                description="Scalable Vector Graphics",
-            ),
-            SupportedFormat.WEBP: FormatInfo(
-                format=SupportedFormat.WEBP,
-                mime_types=["image/webp"],
-                extensions=[".webp"],
-                magic_bytes=[b"RIFF"],  # Followed by WEBP later in header
-                description="WebP Image",
-            ),
-        }
-
-    def _build_magic_index(self) -> Dict[bytes, List[SupportedFormat]]:
-        """Build index of magic bytes to formats"""
-        index: Dict[bytes, List[SupportedFormat]] = {}
-        for format_info in self.format_registry.values():
-            for magic in format_info.magic_bytes:
-                if magic not in index:
-                    index[magic] = []
-                index[magic].append(format_info.format)
-        return index
-
-    def _build_mime_index(self) -> Dict[str, List[SupportedFormat]]:
-        """Build index of MIME types to formats"""
-        index: Dict[str, List[SupportedFormat]] = {}
-        for format_info in self.format_registry.values():
-            for mime in format_info.mime_types:
-                if mime not in index:
-                    index[mime] = []
-                index[mime].append(format_info.format)
-        return index
-
-    def _build_extension_index(self) -> Dict[str, List[SupportedFormat]]:
-        """Build index of extensions to formats"""
-        index: Dict[str, List[SupportedFormat]] = {}
-        for format_info in self.format_registry.values():
-            for ext in format_info.extensions:
-                ext_lower = ext.lower()
-                if ext_lower not in index:
-                    index[ext_lower] = []
-                index[ext_lower].append(format_info.format)
-        return index
+    # The read-only module tables, kept as attributes for existing callers
+    format_registry = _FORMAT_REGISTRY
+    magic_to_format = _MAGIC_TO_FORMAT
+    magic_pattern = _MAGIC_PATTERN
+    magic_max_length = _MAGIC_MAX_LENGTH
+    mime_to_format = _MIME_TO_FORMAT
+    ext_to_format = _EXT_TO_FORMAT
+    supported_mime_types = _SUPPORTED_MIME_TYPES
 
     def detect_from_header(
         self, buffer: BinaryIO, max_read: int = 1024
@@ -264,24 +285,27 @@ class FileTypeDetector:
         buffer.seek(0)
 
         try:
-            header = buffer.read(max_read)
+            # No signature is longer than magic_max_length, so don't copy more
+            header = buffer.read(min(max_read, _MAGIC_MAX_LENGTH))
             if not header:
                 return None
 
-            # Check each magic byte signature
-            for magic, formats in self.magic_to_format.items():
-                if header.startswith(magic):
-                    # For formats that share magic bytes (like ZIP-based formats),
-                    # we need additional checks
-                    if magic == b"PK\x03\x04":  # ZIP signature
-                        return self._detect_zip_based_format(buffer, header)
-                    elif magic == b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1":  # OLE signature
-                        return self._detect_ole_based_format(buffer, header)
-                    else:
-                        # Return first matching format for unique magic bytes
-                        return formats[0]
+            # Match every magic byte signature at once
+            match = _MAGIC_PATTERN.match(header)
+            if not match:
+                return None
+
+            magic = match.group(0)
 
-            return None
+            # For formats that share magic bytes (like ZIP-based formats),
+            # we need additional checks
+            if magic == b"PK\x03\x04":  # ZIP signature
+                return self._detect_zip_based_format(buffer, header)
+            elif magic == b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1":  # OLE signature
+                return self._detect_ole_based_format(buffer, header)
+            else:
+                # Return first matching format for unique magic bytes
+                return _MAGIC_TO_FORMAT[magic][0]
 
         finally:
             buffer.seek(current_pos)
@@ -290,28 +314,66 @@ class FileTypeDetector:
         self, buffer: BinaryIO, header: bytes
     ) -> Optional[SupportedFormat]:
         """Detect specific ZIP-based format (DOCX, XLSX, PPTX, ODT, etc.)"""
-        # This is simplified - in practice you'd look for specific files within the ZIP
-        # For now, return the most common format (DOCX) or None
-        # A full implementation would extract the ZIP and look for identifying files
-        return SupportedFormat.DOCX  # Default assumption
+        # Only the central directory and the tiny "mimetype" member are read;
+        # nothing else in the archive is decompressed
+        try:
+            buffer.seek(0)
+            with zipfile.ZipFile(buffer) as archive:
+                names = set(archive.namelist())
+
+                # ODF, EPUB and HWPX store their MIME type as the first member
+                if "mimetype" in names:
+                    with archive.open("mimetype") as member:
+                        mime_type = normalize_mime_type(
+                            member.read(256).decode("ascii", "replace")
+                        )
+                    formats = _MIME_TO_FORMAT.get(mime_type)
+                    if formats:
+                        return formats[0]
+
+                # OOXML keeps each application's main part under its own folder
+                for part, format in _OOXML_MAIN_PARTS:
+                    if part in names:
+                        return format
+        except (
+            zipfile.BadZipFile,
+            zlib.error,
+            OSError,
+            ValueError,
+            EOFError,
+            NotImplementedError,
+            RuntimeError,
+        ):
+            # Encrypted or corrupt members are as untrusted as the rest
+            pass
+
+        # Unrecognised or truncated archive: keep the historical assumption
+        return SupportedFormat.DOCX
 
     def _detect_ole_based_format(
         self, buffer: BinaryIO, header: bytes
     ) -> Optional[SupportedFormat]:
         """Detect specific OLE-based format (DOC, XLS, PPT)"""
-        # This is simplified - in practice you'd examine the OLE structure
-        # For now, return the most common format (DOC) or None
-        return SupportedFormat.DOC  # Default assumption
+        try:
+            names = _ole_stream_names(buffer)
+        except (OSError, ValueError, struct.error):
+            names = set()
+
+        for stream, format in _OLE_MAIN_STREAMS:
+            if stream in names:
+                return format
+
+        # Unrecognised or truncated container: keep the historical assumption
+        return SupportedFormat.DOC
 
     def detect_from_mime_type(self, mime_type: str) -> List[SupportedFormat]:
-        """Detect formats from MIME type"""
-        return self.mime_to_format.get(mime_type.lower(), [])
+        """Detect formats from a MIME type already passed through normalize_mime_type"""
+        return list(_MIME_TO_FORMAT.get(mime_type, ()))
 
     def detect_from_extension(self, filename: str) -> List[SupportedFormat]:
         """Detect formats from file extension"""
-        path = Path(filename)
-        ext = path.suffix.lower()
-        return self.ext_to_format.get(ext, [])
+        ext = os.path.splitext(filename)[1].lower()
+        return list(_EXT_TO_FORMAT.get(ext, ()))
 
     def detect_format(
         self,
@@ -325,32 +387,25 @@ class FileTypeDetector:
         Returns:
             Tuple of (format, confidence) where confidence is 0.0-1.0
         """
-        candidates = {}
-
         # Magic byte detection (highest confidence)
         if buffer:
             magic_format = self.detect_from_header(buffer)
             if magic_format:
-                candidates[magic_format] = 0.9
+                return magic_format, 0.9
 
         # MIME type detection (medium confidence)
         if mime_type:
-            mime_formats = self.detect_from_mime_type(mime_type)
-            for fmt in mime_formats:
-                candidates[fmt] = max(candidates.get(fmt, 0), 0.7)
+            mime_formats = self.detect_from_mime_type(normalize_mime_type(mime_type))
+            if mime_formats:
+                return mime_formats[0], 0.7
 
         # Extension detection (lowest confidence)
         if filename:
             ext_formats = self.detect_from_extension(filename)
-            for fmt in ext_formats:
-                candidates[fmt] = max(candidates.get(fmt, 0), 0.3)
+            if ext_formats:
+                return ext_formats[0], 0.3
 
-        if not candidates:
-            return None, 0.0
-
-        # Return format with highest confidence
-        best_format = max(candidates.items(), key=lambda x: x[1])
-        return best_format[0], best_format[1]
+        return None, 0.0
 
     def is_supported(
         self,
@@ -364,19 +419,19 @@ class FileTypeDetector:
 
     def get_format_info(self, format: SupportedFormat) -> FormatInfo:
         """Get information about a specific format"""
-        return self.format_registry[format]
+        return _FORMAT_REGISTRY[format]
 
     def get_supported_extensions(self) -> Set[str]:
         """Get all supported file extensions"""
         extensions = set()
-        for format_info in self.format_registry.values():
+        for format_info in _FORMAT_REGISTRY.values():
             extensions.update(format_info.extensions)
         return extensions
 
     def get_supported_mime_types(self) -> Set[str]:
         """Get all supported MIME types"""
         mime_types = set()
-        for format_info in self.format_registry.values():
+        for format_info in _FORMAT_REGISTRY.values():
             mime_types.update(format_info.mime_types)
         return mime_types
 
@@ -386,11 +441,93 @@ def create_file_detector() -> FileTypeDetector:
     return FileTypeDetector()
 
 
+# Main part of each OOXML application, in the order they are checked
+_OOXML_MAIN_PARTS = (
+    ("word/document.xml", SupportedFormat.DOCX),
+    ("xl/workbook.xml", SupportedFormat.XLSX),
+    ("ppt/presentation.xml", SupportedFormat.PPTX),
+)
+
+# Stream that identifies each OLE compound document type
+_OLE_MAIN_STREAMS = (
+    ("WordDocument", SupportedFormat.DOC),
+    ("Workbook", SupportedFormat.XLS),
+    ("Book", SupportedFormat.XLS),  # Excel 95 and earlier
+    ("PowerPoint Document", SupportedFormat.PPT),
+    ("FileHeader", SupportedFormat.HWP),  # HWP 5.x is an OLE container
+)
+
+# Bounds on how much of an untrusted OLE directory is walked
+_OLE_MAX_FAT_SECTORS = 109
+_OLE_MAX_DIRECTORY_SECTORS = 64
+# Sector shifts allowed by the format: 512-byte (v3) and 4096-byte (v4)
+_OLE_SECTOR_SHIFTS = (9, 12)
+
+# Sector shift, FAT sector count, first directory sector and the DIFAT array,
+# read from offset 30 of the 512-byte compound file header
+_OLE_HEADER = struct.Struct("<H12xII24x109I")
+# Name length field of a 128-byte directory entry, at offset 64
+_OLE_NAME_LENGTH = struct.Struct("<H")
+
+
+def _ole_stream_names(buffer: BinaryIO) -> Set[str]:
+    """Read the entry names from an OLE compound file's directory.
+
+    Only the header, the FAT sectors listed in it and the directory chain are
+    read, which is enough to tell Word, Excel and PowerPoint files apart.
+    """
+    buffer.seek(0)
+    header = buffer.read(512)
+    if len(header) < 512:
+        return set()
+
+    sector_shift, fat_sector_count, directory_start, *difat = _OLE_HEADER.unpack_from(
+        header, 30
+    )
+    if sector_shift not in _OLE_SECTOR_SHIFTS:
+        return set()
+    sector_size = 1 << sector_shift
+
+    def read_sector(sector: int) -> bytes:
+        buffer.seek((sector + 1) * sector_size)
+        return buffer.read(sector_size)
+
+    fat: List[int] = []
+    for sector in difat[: min(fat_sector_count, _OLE_MAX_FAT_SECTORS)]:
+        if sector >= 0xFFFFFFFA:  # Unused DIFAT slot
+            break
+        data = read_sector(sector)
+        fat.extend(struct.unpack(f"<{len(data) // 4}I", data[: len(data) // 4 * 4]))
+
+    names = set()
+    visited = set()
+    sector = directory_start
+    for _ in range(_OLE_MAX_DIRECTORY_SECTORS):
+        # Stop at the end of the chain, a special marker or a loop
+        if sector >= 0xFFFFFFFA or sector in visited:
+            break
+        visited.add(sector)
+        data = read_sector(sector)
+        for offset in range(0, len(data) - 127, 128):
+            (name_length,) = _OLE_NAME_LENGTH.unpack_from(data, offset + 64)
+            if 2 <= name_length <= 64:
+                raw_name = data[offset : offset + name_length - 2]
+                names.add(raw_name.decode("utf-16-le", "replace"))
+        sector = fat[sector] if sector < len(fat) else 0xFFFFFFFE
+
+    return names
+
+
+@functools.lru_cache(maxsize=1)
+def _default_detector() -> FileTypeDetector:
+    """Shared detector for the module-level convenience functions"""
+    return FileTypeDetector()
+
+
 def is_supported_format(
     buffer: Optional[BinaryIO] = None,
     mime_type: Optional[str] = None,
     filename: Optional[str] = None,
 ) -> bool:
     """Quick check if a file format is supported"""
-    detector = create_file_detector()
-    return detector.is_supported(buffer, mime_type, filename)
+    return _default_detector().is_supported(buffer, mime_type, filename)
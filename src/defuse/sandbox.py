@@ -2,13 +2,18 @@
 Platform-specific sandboxing and isolation strategies for secure document downloads.
 """
 
+import functools
 import os
 import shutil
 import subprocess
 import platform
+import re
 import tempfile
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 from enum import Enum
 
 from .config import Config
@@ -33,6 +38,164 @@ class SandboxBackend(Enum):
     DOCKER = "docker"  # Docker container isolation
 
 
+# Image the container backends run the download script in
+_CONTAINER_IMAGE = "python:3.11-slim"
+
+# Label on containers kept warm for reuse, so any left behind by a process
+# that was killed can be found with --filter label=defuse.warm-container
+_WARM_CONTAINER_LABEL = "defuse.warm-container"
+
+
+# Download script run by the Firejail and container backends. The source is
+# the same for every download: the size limit, timeout, User-Agent and then
+# each URL and output path are passed as arguments, so a URL can't break out
+# into the code.
+_INLINE_DOWNLOAD_SCRIPT = """
+import os
+import sys
+import urllib.parse
+import urllib.request
+
+max_size, timeout, user_agent = int(sys.argv[1]), float(sys.argv[2]), sys.argv[3]
+allowed_domains = {d for d in sys.argv[4].split(',') if d}
+downloads = sys.argv[5:]
+failed = False
+
+# Bubblewrap has no resource limit options, so it passes them to the script
+if 'DEFUSE_MAX_MEMORY_MB' in os.environ:
+    import resource
+
+    try:
+        max_memory = int(os.environ['DEFUSE_MAX_MEMORY_MB']) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (max_memory, max_memory))
+        max_cpu_time = int(os.environ['DEFUSE_MAX_CPU_SECONDS'])
+        resource.setrlimit(resource.RLIMIT_CPU, (max_cpu_time, max_cpu_time))
+        resource.setrlimit(resource.RLIMIT_NOFILE, (64, 128))
+    except (OSError, ValueError):
+        # Resource limits may fail, continue without them
+        pass
+
+def validate_url(url):
+    parsed = urllib.parse.urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.netloc:
+        return False
+    if allowed_domains:
+        # Match the host or any parent domain of it
+        labels = (parsed.hostname or '').split('.')
+        return any('.'.join(labels[i:]) in allowed_domains for i in range(len(labels)))
+    return True
+
+for url, output_path in zip(downloads[::2], downloads[1::2]):
+    try:
+        if not validate_url(url):
+            raise Exception(f'Invalid or restricted URL: {url}')
+
+        # Download with size limit and proper User-Agent
+        req = urllib.request.Request(url, headers={'User-Agent': user_agent})
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            if (hasattr(response, 'length') and response.length and
+                response.length > max_size):
+                raise Exception(f'File too large: {response.length} bytes')
+
+            data = response.read(max_size + 1)
+            if len(data) > max_size:
+                raise Exception(f'File too large: {len(data)} bytes')
+
+            # output_path is under the /output mount, which always exists
+            with open(output_path, 'wb') as f:
+                f.write(data)
+
+            print(f'SUCCESS: Downloaded {len(data)} bytes to {output_path}')
+
+    except Exception as e:
+        # Exactly one status line per download; the host pairs them up in order
+        print(f'ERROR: {str(e)}'.replace('\\n', ' '))
+        failed = True
+
+sys.exit(1 if failed else 0)
+"""
+
+
+# Download script errors that every backend would hit alike: the server
+# answered with an error status (urllib and requests wording), the file is
+# over the size limit, the server timed out or the URL isn't allowed
+_FATAL_DOWNLOAD_ERROR = re.compile(
+    r"^ERROR: (?:HTTP Error \d+|\d{3} (?:Client|Server) Error|File too large"
+    r"|File size exceeded|Invalid or restricted URL|.*\btimed out\b)",
+    re.MULTILINE,
+)
+
+
+def _download_outcomes(output: str, count: int) -> List[Optional[bool]]:
+    """Read each download's outcome from the download script's status lines.
+
+    True means the file was written and False that it failed the way it would
+    on any backend. None covers other failures and downloads the script never
+    reported on, which are worth retrying.
+    """
+    statuses = (
+        [
+            line
+            for line in output.splitlines()
+            if line.startswith(("SUCCESS: ", "ERROR: "))
+        ]
+        if isinstance(output, str)
+        else []
+    )
+
+    outcomes: List[Optional[bool]] = []
+    for status in statuses[:count]:
+        if status.startswith("SUCCESS: "):
+            outcomes.append(True)
+        elif _FATAL_DOWNLOAD_ERROR.match(status):
+            outcomes.append(False)
+        else:
+            outcomes.append(None)
+    return outcomes + [None] * (count - len(outcomes))
+
+
+def _kill_containers(
+    containers: Dict[Tuple[str, Path], str], lock: threading.Lock
+) -> None:
+    """Kill warm containers and forget them.
+
+    Takes the container table rather than the downloader so it can also run
+    from a weakref.finalize() at garbage collection or interpreter exit.
+    """
+    with lock:
+        killed = list(containers.items())
+        containers.clear()
+
+    for (runtime, _), container_id in killed:
+        try:
+            _run_launcher(
+                [runtime, "kill", container_id], capture_output=True, timeout=30
+            )
+        except (subprocess.TimeoutExpired, FileNotFoundError):
+            pass
+
+
+@functools.lru_cache(maxsize=None)
+def find_executable(name: str) -> Optional[str]:
+    """Locate an executable on PATH, remembering the answer for the process.
+
+    The CLI's runtime check and the sandbox capability detection both look
+    up docker and podman, so each PATH scan is done only once.
+    """
+    return shutil.which(name)
+
+
+def _run_launcher(cmd: List[str], **kwargs) -> subprocess.CompletedProcess:
+    """Run a sandbox launcher command (firejail, bwrap, docker or podman).
+
+    Giving subprocess the launcher's absolute path saves the child a PATH
+    search. On Python 3.13+ it also lets CPython start the launcher with
+    posix_spawn() rather than forking the whole defuse process first; older
+    versions rule posix_spawn out whenever close_fds is set, as it is here.
+    """
+    return subprocess.run(cmd, executable=find_executable(cmd[0]), **kwargs)
+
+
 class SandboxCapabilities:
     """Detected sandbox capabilities for current system"""
 
@@ -49,47 +212,51 @@ class SandboxCapabilities:
 
         # Check for Linux-specific sandboxing tools (highest security)
         if self.platform == "linux":
-            capabilities[SandboxBackend.FIREJAIL] = shutil.which("firejail") is not None
-            capabilities[SandboxBackend.BUBBLEWRAP] = shutil.which("bwrap") is not None
+            capabilities[SandboxBackend.FIREJAIL] = (
+                find_executable("firejail") is not None
+            )
+            capabilities[SandboxBackend.BUBBLEWRAP] = (
+                find_executable("bwrap") is not None
+            )
         else:
             capabilities[SandboxBackend.FIREJAIL] = False
             capabilities[SandboxBackend.BUBBLEWRAP] = False
 
-        # Check for container runtimes (cross-platform)
-        capabilities[SandboxBackend.DOCKER] = self._check_docker_available()
-        capabilities[SandboxBackend.PODMAN] = self._check_podman_available()
+        # Check for container runtimes (cross-platform). Each probe waits on
+        # its daemon, so ask both at once rather than one after the other
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            docker = executor.submit(self._check_docker_available)
+            podman = executor.submit(self._check_podman_available)
+            capabilities[SandboxBackend.DOCKER] = docker.result()
+            capabilities[SandboxBackend.PODMAN] = podman.result()
 
         return capabilities
 
     def _check_docker_available(self) -> bool:
         """Check if Docker is available and running"""
-        docker_path = shutil.which("docker")
-        if not docker_path:
-            return False
-
-        try:
-            result = subprocess.run(
-                [docker_path, "info"], capture_output=True, timeout=5
-            )
-            return result.returncode == 0
-        except (
-            subprocess.TimeoutExpired,
-            FileNotFoundError,
-            subprocess.CalledProcessError,
-        ):
-            return False
+        return self._check_runtime_available("docker")
 
     def _check_podman_available(self) -> bool:
         """Check if Podman is available and running"""
-        podman_path = shutil.which("podman")
-        if not podman_path:
+        return self._check_runtime_available("podman")
+
+    def _check_runtime_available(self, name: str) -> bool:
+        """Check that a container runtime's daemon answers.
+
+        `version` only asks the server for its version, where `info` also
+        enumerates storage, plugins and containers before replying.
+        """
+        runtime_path = find_executable(name)
+        if not runtime_path:
             return False
 
         try:
             result = subprocess.run(
-                [podman_path, "info"], capture_output=True, timeout=5
+                [runtime_path, "version", "--format", "{{.Server.Version}}"],
+                capture_output=True,
+                text=True,
+                timeout=5,
             )
-            return result.returncode == 0
         except (
             subprocess.TimeoutExpired,
             FileNotFoundError,
@@ -97,6 +264,8 @@ class SandboxCapabilities:
         ):
             return False
 
+        return result.returncode == 0 and bool(result.stdout.strip())
+
     def _get_recommended_backend(self) -> SandboxBackend:
         """Get recommended backend prioritizing security.
 
@@ -140,221 +309,145 @@ class SandboxCapabilities:
 class SandboxedDownloader:
     """Sandboxed downloader that uses various isolation strategies"""
 
-    def __init__(self, config: Config):
+    def __init__(
+        self, config: Config, capabilities: Optional[SandboxCapabilities] = None
+    ):
         self.config = config
-        self.capabilities = SandboxCapabilities()
+        self.capabilities = capabilities or get_sandbox_capabilities()
         isolation_str = getattr(config.sandbox, "isolation_level", "paranoid")
+        try:
+            self.isolation_level = IsolationLevel(isolation_str)
+        except ValueError:
+            self.isolation_level = IsolationLevel.PARANOID  # Default
 
-        # Find enum by value
-        self.isolation_level = IsolationLevel.PARANOID  # Default
-        for level in IsolationLevel:
-            if level.value == isolation_str:
-                self.isolation_level = level
-                break
         backend_str = getattr(config.sandbox, "sandbox_backend", "auto")
-
-        # Find enum by value
-        self.backend = SandboxBackend.AUTO  # Default
-        for backend in SandboxBackend:
-            if backend.value == backend_str:
-                self.backend = backend
-                break
+        try:
+            self.backend = SandboxBackend(backend_str)
+        except ValueError:
+            self.backend = SandboxBackend.AUTO  # Default
 
         # Auto-select best backend if set to auto
         if self.backend == SandboxBackend.AUTO:
             self.backend = self.capabilities.recommended_backend
 
-    def create_download_script(self, url: str, output_path: Path) -> Path:
-        """Create a temporary Python script for isolated download"""
-        script_content = f'''
-import sys
-import io
-import os
-import tempfile
-import urllib.parse
-import resource
-import signal
-from pathlib import Path
-import requests
-
-class ContainerDownloadError(Exception):
-    pass
-
-def setup_resource_limits():
-    """Set up resource limits for the download process"""
-    try:
-        # Limit virtual memory
-        max_memory = {self.config.sandbox.max_memory_mb} * 1024 * 1024
-        resource.setrlimit(resource.RLIMIT_AS, (max_memory, max_memory))
-
-        # Limit CPU time
-        max_cpu_time = {self.config.sandbox.max_cpu_seconds}
-        resource.setrlimit(resource.RLIMIT_CPU, (max_cpu_time, max_cpu_time))
-
-        # Limit file descriptors
-        resource.setrlimit(resource.RLIMIT_NOFILE, (64, 128))
-    except (OSError, ValueError):
-        # Resource limits may fail, continue without them
-        pass
-
-def validate_url(url):
-    """Basic URL validation"""
-    parsed = urllib.parse.urlparse(url)
-    if not parsed.scheme or not parsed.netloc:
-        return False
-    if parsed.scheme not in ['http', 'https']:
-        return False
-    # Add domain validation if needed
-    allowed_domains = {self.config.sandbox.allowed_domains}
-    if allowed_domains:
-        if not any(parsed.netloc.endswith(domain) for domain in allowed_domains):
-            return False
-    return True
-
-def download_to_memory(session, url, max_memory_size):
-    """Download to memory with automatic spillover to disk"""
-    response = session.get(
-        url, timeout={self.config.sandbox.download_timeout}, stream=True
-    )
-    response.raise_for_status()
-
-    # Check content length
-    content_length = int(response.headers.get('content-length', 0))
-    if content_length > {self.config.sandbox.max_file_size}:
-        raise ContainerDownloadError(f"File too large: {{content_length}} bytes")
-
-    # Use SpooledTemporaryFile for memory-first strategy
-    buffer = tempfile.SpooledTemporaryFile(max_size=max_memory_size, mode='w+b')
-    downloaded = 0
-
-    # Progress tracking
-    for chunk in response.iter_content(chunk_size=8192):
-        if chunk:
-            downloaded += len(chunk)
-            if downloaded > {self.config.sandbox.max_file_size}:
-                raise ContainerDownloadError("File size exceeded during download")
-            buffer.write(chunk)
-
-            # Basic progress output every MB
-            if downloaded % (1024*1024) == 0:
-                print(f"Downloaded: {{downloaded // (1024*1024)}}MB", file=sys.stderr)
-
-    buffer.seek(0)
-    return buffer
-
-def download_document(url, output_path):
-    """Main download function with full security features"""
-    try:
-        setup_resource_limits()
-
-        if not validate_url(url):
-            raise ContainerDownloadError(f"Invalid or restricted URL: {{url}}")
-
-        # Setup session with proper headers
-        session = requests.Session()
-        session.headers.update({{
-            'User-Agent': '{self.config.sandbox.user_agent}',
-            'Accept': '*/*',
-        }})
-
-        # Memory-first download strategy
-        max_memory_size = {self.config.sandbox.max_memory_buffer_mb} * 1024 * 1024
-        memory_buffer = download_to_memory(session, url, max_memory_size)
-
-        # Save buffer to output file
-        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-        with open(output_path, 'wb') as f:
-            while True:
-                chunk = memory_buffer.read(8192)
-                if not chunk:
-                    break
-                f.write(chunk)
-
-        memory_buffer.close()
-        print(f"SUCCESS: Downloaded to {{output_path}}")
-
-    except Exception as e:
-        print(f"ERROR: {{str(e)}}")
-        sys.exit(1)
+        # Whether the current thread's failed attempt is worth retrying with
+        # another backend, as opposed to the URL itself failing
+        self._attempt = threading.local()
+
+        # Warm containers kept for reuse, keyed by (runtime, output directory)
+        self._containers: Dict[Tuple[str, Path], str] = {}
+        self._containers_lock = threading.Lock()
+        self._containers_finalizer: Optional[weakref.finalize] = None
+
+        # Resource limits for the download script under Bubblewrap, which
+        # has no options of its own for them
+        sandbox = config.sandbox
+        self._script_env = {
+            "DEFUSE_MAX_MEMORY_MB": str(sandbox.max_memory_mb),
+            "DEFUSE_MAX_CPU_SECONDS": str(sandbox.max_cpu_seconds),
+        }
 
-if __name__ == "__main__":
-    download_document("{url}", "{output_path}")
-'''
+        # Bubblewrap bind-mounts the download script from a file, written
+        # once and removed by close()
+        self._download_script: Optional[Path] = None
+        self._download_script_lock = threading.Lock()
+
+        # Launcher options fixed by the configuration; each download adds its
+        # output mount and command
+        self._firejail_options = [
+            "--noprofile",  # Don't use application profiles
+            # Network access is needed for downloads
+            "--seccomp",  # Enable seccomp filtering
+            "--noroot",  # Don't allow root access
+            "--private-tmp",  # Private tmp directory
+            "--private-dev",  # Private /dev directory
+            f"--rlimit-fsize={sandbox.max_file_size}",
+            # File size limit
+            "--rlimit-nofile=64",  # File descriptor limit
+            "--rlimit-nproc=10",  # Process limit
+            "--timeout=00:02:00",  # Timeout after 2 minutes
+        ]
+        self._bubblewrap_options = [
+            "--new-session",
+            "--die-with-parent",
+            "--unshare-pid",
+            # Network access allowed for downloads
+            "--tmpfs",
+            "/tmp",
+            "--proc",
+            "/proc",
+            "--bind",
+            "/usr",
+            "/usr",
+            "--bind",
+            "/bin",
+            "/bin",
+            "--bind",
+            "/lib",
+            "/lib",
+            "--bind",
+            "/lib64",
+            "/lib64",
+            *[
+                arg
+                for name, value in self._script_env.items()
+                for arg in ("--setenv", name, value)
+            ],
+        ]
+        container_options = [
+            "--network",
+            "bridge",  # Network access for download
+            "--memory",
+            f"{sandbox.max_memory_mb}m",  # Memory limit
+        ]
+        container_security = [
+            "--security-opt",
+            "no-new-privileges:true",  # No privilege escalation
+            "--read-only",  # Read-only filesystem
+            "--tmpfs",
+            "/tmp:noexec,nosuid,size=100m",  # Temp space
+        ]
+        self._docker_options = [
+            *container_options,
+            "--cpu-shares",
+            "512",  # Limited CPU
+            *container_security,
+        ]
+        self._podman_options = [
+            *container_options,
+            "--cpus",
+            "0.5",  # Limited CPU
+            *container_security,
+        ]
 
-        # Create temporary script
-        script_fd, script_path = tempfile.mkstemp(suffix=".py", text=True)
-        try:
-            with os.fdopen(script_fd, "w") as f:
-                f.write(script_content)
-        except:
-            os.close(script_fd)
-            raise
+    def create_download_script(self) -> Path:
+        """Write the download script to a file for Bubblewrap, once.
 
-        return Path(script_path)
+        The script takes its URLs and output paths as arguments, so the same
+        file serves every download.
+        """
+        with self._download_script_lock:
+            if self._download_script is None:
+                script_fd, script_path = tempfile.mkstemp(suffix=".py")
+                try:
+                    os.write(script_fd, _INLINE_DOWNLOAD_SCRIPT.encode("utf-8"))
+                finally:
+                    os.close(script_fd)
+                self._download_script = Path(script_path)
+            return self._download_script
 
     def run_firejail_download(self, url: str, output_path: Path) -> bool:
         """Run download using Firejail sandbox"""
 
         try:
-            # Container output path - just the filename
-            container_output = f"/output/{output_path.name}"
-
-            # Build inline Python script for download
-            download_cmd = f"""
-import sys
-import urllib.request
-import urllib.error
-from pathlib import Path
-
-url = '{url}'
-output_path = '{container_output}'
-max_size = {self.config.sandbox.max_file_size}
-
-try:
-    # Download with size limit and proper User-Agent
-    timeout = {self.config.sandbox.download_timeout}
-    user_agent = '{self.config.sandbox.user_agent}'
-    req = urllib.request.Request(url, headers={{'User-Agent': user_agent}})
-    with urllib.request.urlopen(req, timeout=timeout) as response:
-        if (hasattr(response, 'length') and response.length and
-            response.length > max_size):
-            raise Exception(f'File too large: {{response.length}} bytes')
-
-        data = response.read(max_size + 1)
-        if len(data) > max_size:
-            raise Exception(f'File too large: {{len(data)}} bytes')
-
-        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-        with open(output_path, 'wb') as f:
-            f.write(data)
-
-        print(f'SUCCESS: Downloaded {{len(data)}} bytes to {{output_path}}')
-
-except Exception as e:
-    print(f'ERROR: {{str(e)}}')
-    sys.exit(1)
-"""
-
             cmd = [
                 "firejail",
-                "--noprofile",  # Don't use application profiles
-                # Network access is needed for downloads
-                "--seccomp",  # Enable seccomp filtering
-                "--noroot",  # Don't allow root access
-                "--private-tmp",  # Private tmp directory
-                "--private-dev",  # Private /dev directory
-                f"--rlimit-fsize={self.config.sandbox.max_file_size}",
-                # File size limit
-                "--rlimit-nofile=64",  # File descriptor limit
-                "--rlimit-nproc=10",  # Process limit
-                "--timeout=00:02:00",  # Timeout after 2 minutes
+                *self._firejail_options,
                 f"--bind={output_path.parent}:/output",  # Bind output directory
-                "python3",
-                "-c",
-                download_cmd,  # Run inline script
+                *self._inline_download_command([(url, output_path)]),
             ]
 
-            result = subprocess.run(
+            result = _run_launcher(
                 cmd,
                 capture_output=True,
                 text=True,
@@ -365,10 +458,13 @@ except Exception as e:
                 return True
             else:
                 print(f"Firejail download failed: {result.stderr}")
+                self._check_download_error(result.stdout)
                 return False
 
         except subprocess.TimeoutExpired:
             print("Firejail download timed out")
+            # A hung server would hang the next backend just the same
+            self._attempt.retriable = False
             return False
         except Exception as e:
             print(f"Firejail error: {str(e)}")
@@ -376,31 +472,11 @@ except Exception as e:
 
     def run_bubblewrap_download(self, url: str, output_path: Path) -> bool:
         """Run download using Bubblewrap sandbox"""
-        script_path = self.create_download_script(url, output_path)
-
         try:
+            script_path = self.create_download_script()
             cmd = [
                 "bwrap",
-                "--new-session",
-                "--die-with-parent",
-                "--unshare-pid",
-                # Network access allowed for downloads
-                "--tmpfs",
-                "/tmp",
-                "--proc",
-                "/proc",
-                "--bind",
-                "/usr",
-                "/usr",
-                "--bind",
-                "/bin",
-                "/bin",
-                "--bind",
-                "/lib",
-                "/lib",
-                "--bind",
-                "/lib64",
-                "/lib64",
+                *self._bubblewrap_options,
                 "--ro-bind",
                 str(script_path),
                 "/tmp/download_script.py",
@@ -409,13 +485,16 @@ except Exception as e:
                 "/output",
                 "python3",
                 "/tmp/download_script.py",
+                *self._download_script_args([(url, output_path)]),
             ]
 
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+            result = _run_launcher(cmd, capture_output=True, text=True, timeout=120)
 
             if result.returncode == 0 and output_path.exists():
                 return True
             else:
+                self._check_download_error(result.stdout)
+
                 # Check for specific CI/permission issues
                 error_msg = result.stderr.strip()
                 if "Operation not permitted" in error_msg and "namespace" in error_msg:
@@ -434,180 +513,212 @@ except Exception as e:
 
         except subprocess.TimeoutExpired:
             print("Bubblewrap download timed out")
+            # A hung server would hang the next backend just the same
+            self._attempt.retriable = False
             return False
         except Exception as e:
             print(f"Bubblewrap error: {str(e)}")
             return False
-        finally:
-            script_path.unlink(missing_ok=True)
 
     def run_docker_download(self, url: str, output_path: Path) -> bool:
         """Run download using Docker container"""
+        return self._run_docker_downloads([(url, output_path)]) == [True]
 
-        try:
-            # Container output path
-            container_output = f"/output/{output_path.name}"
+    def _run_docker_downloads(
+        self, downloads: List[Tuple[str, Path]]
+    ) -> List[Optional[bool]]:
+        """Run downloads into a single output directory in one Docker container.
 
-            # Build download command with inline Python script
-            download_cmd = f"""
-python3 -c "
-import sys
-import io
-import urllib.request
-import urllib.error
-from pathlib import Path
-
-url = '{url}'
-output_path = '{container_output}'
-max_size = {self.config.sandbox.max_file_size}
-
-try:
-    # Download with size limit and proper User-Agent
-    timeout = {self.config.sandbox.download_timeout}
-    user_agent = '{self.config.sandbox.user_agent}'
-    req = urllib.request.Request(url, headers={{'User-Agent': user_agent}})
-    with urllib.request.urlopen(req, timeout=timeout) as response:
-        if (hasattr(response, 'length') and response.length and
-            response.length > max_size):
-            raise Exception(f'File too large: {{response.length}} bytes')
-
-        data = response.read(max_size + 1)
-        if len(data) > max_size:
-            raise Exception(f'File too large: {{len(data)}} bytes')
-
-        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-        with open(output_path, 'wb') as f:
-            f.write(data)
-
-        print(f'SUCCESS: Downloaded {{len(data)}} bytes to {{output_path}}')
-
-except Exception as e:
-    print(f'ERROR: {{str(e)}}')
-    sys.exit(1)
-"
-"""
+        Returns each download's outcome as described in _download_outcomes().
+        """
+        output_dir = downloads[0][1].parent
 
-            cmd = [
-                "docker",
-                "run",
-                "--rm",  # Remove container when done
-                "--network",
-                "bridge",  # Network access for download
-                "--memory",
-                f"{self.config.sandbox.max_memory_mb}m",  # Memory limit
-                "--cpu-shares",
-                "512",  # Limited CPU
-                "--security-opt",
-                "no-new-privileges:true",  # No privilege escalation
-                "--read-only",  # Read-only filesystem
-                "--tmpfs",
-                "/tmp:noexec,nosuid,size=100m",  # Temp space
+        try:
+            options = [
+                *self._docker_options,
                 "--volume",
-                f"{output_path.parent}:/output:rw",  # Output directory
-                "python:3.11-slim",
-                "sh",
-                "-c",
-                download_cmd,
+                f"{output_dir}:/output:rw",  # Output directory
             ]
 
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=150)
+            result = self._run_in_container(
+                "docker",
+                options,
+                self._inline_download_command(downloads),
+                output_dir,
+                timeout=150 * len(downloads),
+            )
 
-            if result.returncode == 0 and output_path.exists():
-                return True
+            if result.returncode == 0 and all(
+                output_path.exists() for _, output_path in downloads
+            ):
+                return [True] * len(downloads)
             else:
                 print(f"Docker download failed: {result.stderr}")
-                return False
+                self._check_download_error(result.stdout)
+                return _download_outcomes(result.stdout, len(downloads))
 
         except subprocess.TimeoutExpired:
             print("Docker download timed out")
-            return False
+            # A hung server would hang the next backend just the same
+            self._attempt.retriable = False
+            return [None] * len(downloads)
         except Exception as e:
             print(f"Docker error: {str(e)}")
-            return False
+            return [None] * len(downloads)
 
     def run_podman_download(self, url: str, output_path: Path) -> bool:
         """Run download using Podman container"""
+        return self._run_podman_downloads([(url, output_path)]) == [True]
 
-        try:
-            # Container output path
-            container_output = f"/output/{output_path.name}"
-
-            # Build download command with inline Python script
-            download_cmd = f"""
-python3 -c "
-import sys
-import io
-import urllib.request
-import urllib.error
-from pathlib import Path
+    def _run_podman_downloads(
+        self, downloads: List[Tuple[str, Path]]
+    ) -> List[Optional[bool]]:
+        """Run downloads into a single output directory in one Podman container.
 
-url = '{url}'
-output_path = '{container_output}'
-max_size = {self.config.sandbox.max_file_size}
-
-try:
-    # Download with size limit and proper User-Agent
-    timeout = {self.config.sandbox.download_timeout}
-    user_agent = '{self.config.sandbox.user_agent}'
-    req = urllib.request.Request(url, headers={{'User-Agent': user_agent}})
-    with urllib.request.urlopen(req, timeout=timeout) as response:
-        if (hasattr(response, 'length') and response.length and
-            response.length > max_size):
-            raise Exception(f'File too large: {{response.length}} bytes')
-
-        data = response.read(max_size + 1)
-        if len(data) > max_size:
-            raise Exception(f'File too large: {{len(data)}} bytes')
-
-        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-        with open(output_path, 'wb') as f:
-            f.write(data)
-
-        print(f'SUCCESS: Downloaded {{len(data)}} bytes to {{output_path}}')
-
-except Exception as e:
-    print(f'ERROR: {{str(e)}}')
-    sys.exit(1)
-"
-"""
+        Returns each download's outcome as described in _download_outcomes().
+        """
+        output_dir = downloads[0][1].parent
 
-            cmd = [
-                "podman",
-                "run",
-                "--rm",  # Remove container when done
-                "--network",
-                "bridge",  # Network access for download
-                "--memory",
-                f"{self.config.sandbox.max_memory_mb}m",  # Memory limit
-                "--cpus",
-                "0.5",  # Limited CPU
-                "--security-opt",
-                "no-new-privileges:true",  # No privilege escalation
-                "--read-only",  # Read-only filesystem
-                "--tmpfs",
-                "/tmp:noexec,nosuid,size=100m",  # Temp space
+        try:
+            options = [
+                *self._podman_options,
                 "--volume",
-                f"{output_path.parent}:/output:rw",  # Output directory
-                "python:3.11-slim",
-                "sh",
-                "-c",
-                download_cmd,
+                f"{output_dir}:/output:rw",  # Output directory
             ]
 
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=150)
+            result = self._run_in_container(
+                "podman",
+                options,
+                self._inline_download_command(downloads),
+                output_dir,
+                timeout=150 * len(downloads),
+            )
 
-            if result.returncode == 0 and output_path.exists():
-                return True
+            if result.returncode == 0 and all(
+                output_path.exists() for _, output_path in downloads
+            ):
+                return [True] * len(downloads)
             else:
                 print(f"Podman download failed: {result.stderr}")
-                return False
+                self._check_download_error(result.stdout)
+                return _download_outcomes(result.stdout, len(downloads))
 
         except subprocess.TimeoutExpired:
             print("Podman download timed out")
-            return False
+            # A hung server would hang the next backend just the same
+            self._attempt.retriable = False
+            return [None] * len(downloads)
         except Exception as e:
             print(f"Podman error: {str(e)}")
-            return False
+            return [None] * len(downloads)
+
+    def _check_download_error(self, output: str):
+        """Stop the backend fallback if the server rejected the download.
+
+        An HTTP error, an oversized file, a timeout or a restricted URL is the
+        same from every backend, unlike a sandbox that failed to start.
+        """
+        if isinstance(output, str) and _FATAL_DOWNLOAD_ERROR.search(output):
+            self._attempt.retriable = False
+
+    def _inline_download_command(self, downloads: List[Tuple[str, Path]]) -> List[str]:
+        """Build the python3 command that runs the inline download script"""
+        return [
+            "python3",
+            "-c",
+            _INLINE_DOWNLOAD_SCRIPT,
+            *self._download_script_args(downloads),
+        ]
+
+    def _download_script_args(self, downloads: List[Tuple[str, Path]]) -> List[str]:
+        """Build the download script's arguments.
+
+        Output files are written under /output, where the sandbox mounts
+        their directory.
+        """
+        sandbox = self.config.sandbox
+        args = [
+            str(sandbox.max_file_size),
+            str(sandbox.download_timeout),
+            sandbox.user_agent,
+            ",".join(
+                domain.lower().lstrip(".") for domain in sandbox.allowed_domains or ()
+            ),
+        ]
+        for url, output_path in downloads:
+            args += [url, f"/output/{output_path.name}"]
+        return args
+
+    def _run_in_container(
+        self,
+        runtime: str,
+        options: List[str],
+        command: List[str],
+        output_dir: Path,
+        timeout: int = 150,
+    ) -> subprocess.CompletedProcess:
+        """Run a command in a fresh container, or a warm one if reused"""
+        if self.config.sandbox.reuse_container:
+            container_id = self._warm_container(runtime, options, output_dir)
+            cmd = [runtime, "exec", container_id, *command]
+        else:
+            cmd = [runtime, "run", "--rm", *options, _CONTAINER_IMAGE, *command]
+
+        return _run_launcher(cmd, capture_output=True, text=True, timeout=timeout)
+
+    def _warm_container(
+        self, runtime: str, options: List[str], output_dir: Path
+    ) -> str:
+        """Return a long-lived container mounting output_dir, starting it once.
+
+        Container startup dominates the cost of small downloads, so with
+        reuse enabled every download into the same directory execs into one
+        container until close() is called. Callers that never close the
+        downloader still have its containers killed when it is garbage
+        collected or the interpreter exits.
+        """
+        key = (runtime, output_dir)
+        with self._containers_lock:
+            if self._containers_finalizer is None:
+                self._containers_finalizer = weakref.finalize(
+                    self, _kill_containers, self._containers, self._containers_lock
+                )
+            if key not in self._containers:
+                result = _run_launcher(
+                    [
+                        runtime,
+                        "run",
+                        "--detach",
+                        "--rm",
+                        "--label",
+                        _WARM_CONTAINER_LABEL,
+                        *options,
+                        _CONTAINER_IMAGE,
+                        "sleep",
+                        "infinity",
+                    ],
+                    capture_output=True,
+                    text=True,
+                    timeout=150,
+                    check=True,
+                )
+                self._containers[key] = result.stdout.strip()
+            return self._containers[key]
+
+    def close(self):
+        """Stop any containers kept warm for reuse and remove the script file"""
+        with self._download_script_lock:
+            if self._download_script is not None:
+                self._download_script.unlink(missing_ok=True)
+                self._download_script = None
+
+        _kill_containers(self._containers, self._containers_lock)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def sandboxed_download(
         self, url: str, output_path: Optional[Path] = None
@@ -616,72 +727,84 @@ except Exception as e:
 
         # Prepare output path
         if output_path is None:
+            self.config.sandbox.temp_dir.mkdir(parents=True, exist_ok=True)
             temp_file = tempfile.NamedTemporaryFile(
                 dir=self.config.sandbox.temp_dir, suffix=".tmp", delete=False
             )
             output_path = Path(temp_file.name)
             temp_file.close()
 
-        # Try the selected backend first
-        if (
-            self.backend == SandboxBackend.FIREJAIL
-            and self.capabilities.available_backends[SandboxBackend.FIREJAIL]
-        ):
-            if self.run_firejail_download(url, output_path):
-                return output_path
-
-        elif (
-            self.backend == SandboxBackend.BUBBLEWRAP
-            and self.capabilities.available_backends[SandboxBackend.BUBBLEWRAP]
-        ):
-            if self.run_bubblewrap_download(url, output_path):
-                return output_path
-
-        elif (
-            self.backend == SandboxBackend.PODMAN
-            and self.capabilities.available_backends[SandboxBackend.PODMAN]
-        ):
-            if self.run_podman_download(url, output_path):
-                return output_path
-
-        elif (
-            self.backend == SandboxBackend.DOCKER
-            and self.capabilities.available_backends[SandboxBackend.DOCKER]
-        ):
-            if self.run_docker_download(url, output_path):
-                return output_path
+        runners = {
+            SandboxBackend.FIREJAIL: self.run_firejail_download,
+            SandboxBackend.BUBBLEWRAP: self.run_bubblewrap_download,
+            SandboxBackend.PODMAN: self.run_podman_download,
+            SandboxBackend.DOCKER: self.run_docker_download,
+        }
 
-        # Fallback: try other available backends in security priority order
-        fallback_order = [
-            SandboxBackend.FIREJAIL,
-            SandboxBackend.BUBBLEWRAP,
-            SandboxBackend.PODMAN,
-            SandboxBackend.DOCKER,
+        # Try the selected backend first, then the other available backends
+        # in security priority order
+        available = self.capabilities.available_backends
+        candidates = [
+            backend
+            for backend in dict.fromkeys([self.backend, *runners])
+            if backend in runners and available.get(backend, False)
         ]
 
-        for fallback_backend in fallback_order:
-            if (
-                fallback_backend != self.backend
-                and self.capabilities.available_backends.get(fallback_backend, False)
-            ):
-                if fallback_backend == SandboxBackend.FIREJAIL:
-                    if self.run_firejail_download(url, output_path):
-                        return output_path
-                elif fallback_backend == SandboxBackend.BUBBLEWRAP:
-                    if self.run_bubblewrap_download(url, output_path):
-                        return output_path
-                elif fallback_backend == SandboxBackend.PODMAN:
-                    if self.run_podman_download(url, output_path):
-                        return output_path
-                elif fallback_backend == SandboxBackend.DOCKER:
-                    if self.run_docker_download(url, output_path):
-                        return output_path
+        for backend in candidates:
+            self._attempt.retriable = True
+            if runners[backend](url, output_path):
+                return output_path
+            if not self._attempt.retriable:
+                # The download itself failed; other backends would fail too
+                break
 
         # All methods failed
         if output_path.exists():
             output_path.unlink(missing_ok=True)
         return None
 
+    def sandboxed_download_many(
+        self, downloads: List[Tuple[str, Path]]
+    ) -> List[Optional[Path]]:
+        """Download several (url, output_path) pairs, sharing sandbox start-up.
+
+        With a container backend selected, the downloads into each output
+        directory run in a single container. Only downloads the script
+        reports as written count as done; a file that was already at the
+        output path doesn't. Those that failed for a reason every backend
+        would share, such as an HTTP error, are given up on. The rest are
+        retried one at a time through sandboxed_download(), with its usual
+        fallback to the other backends.
+        """
+        runners = {
+            SandboxBackend.PODMAN: self._run_podman_downloads,
+            SandboxBackend.DOCKER: self._run_docker_downloads,
+        }
+        run_downloads = runners.get(self.backend)
+        outcomes: Dict[int, Optional[bool]] = {}
+        if run_downloads and self.capabilities.available_backends.get(
+            self.backend, False
+        ):
+            by_dir: Dict[Path, List[int]] = {}
+            for index, (_, output_path) in enumerate(downloads):
+                by_dir.setdefault(output_path.parent, []).append(index)
+            for indices in by_dir.values():
+                group = [downloads[index] for index in indices]
+                outcomes.update(zip(indices, run_downloads(group)))
+
+        results: List[Optional[Path]] = []
+        for index, (url, output_path) in enumerate(downloads):
+            outcome = outcomes.get(index)
+            if outcome:
+                results.append(output_path)
+            elif outcome is False:
+                # As sandboxed_download() does when every backend fails
+                output_path.unlink(missing_ok=True)
+                results.append(None)
+            else:
+                results.append(self.sandboxed_download(url, output_path))
+        return results
+
     def get_security_report(self) -> Dict[str, Any]:
         """Get a report of available security features"""
         return {
@@ -713,8 +836,13 @@ except Exception as e:
         }
 
 
+@functools.lru_cache(maxsize=1)
 def get_sandbox_capabilities() -> SandboxCapabilities:
-    """Get sandbox capabilities for current system"""
+    """Get sandbox capabilities for current system.
+
+    Detection probes the container runtimes, so the result is shared for the
+    life of the process.
+    """
     return SandboxCapabilities()
 
 
@@ -1,7 +1,9 @@
+import os
 import subprocess
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Set
 
 from .config import SanitizerConfig
 
@@ -12,6 +14,25 @@ class DocumentSanitizeError(Exception):
     pass
 
 
+# Dangerzone CLI paths already found to exist. Misses are not remembered,
+# so a CLI installed later in the process is still picked up.
+_FOUND_CLI_PATHS: Set[Path] = set()
+
+
+def _cli_exists(dangerzone_cli_path: Path) -> bool:
+    """Check that the Dangerzone CLI exists, statting each found path once.
+
+    Batch runs construct a sanitizer per document or worker, all with the
+    same CLI path.
+    """
+    if dangerzone_cli_path in _FOUND_CLI_PATHS:
+        return True
+    if not dangerzone_cli_path.exists():
+        return False
+    _FOUND_CLI_PATHS.add(dangerzone_cli_path)
+    return True
+
+
 class DocumentSanitizer:
     """Document sanitization using Dangerzone CLI"""
 
@@ -22,11 +43,19 @@ class DocumentSanitizer:
         if self.dangerzone_cli is None:
             raise DocumentSanitizeError("Dangerzone CLI path not provided")
 
-        if not self.dangerzone_cli.exists():
+        if not _cli_exists(self.dangerzone_cli):
             raise DocumentSanitizeError(
                 f"Dangerzone CLI not found at: {dangerzone_cli_path}"
             )
 
+        # Fixed for every document this sanitizer converts
+        self._cli_str = str(dangerzone_cli_path)
+        self._ocr_lang = getattr(config, "ocr_lang", None)
+        self._archive = bool(getattr(config, "archive_original", False))
+        self._version: Optional[str] = None
+        # Output directory already created, so sanitize() skips the mkdir
+        self._created_output_dir: Optional[Path] = None
+
     def is_available(self) -> bool:
         """Check if Dangerzone CLI is available"""
         return self.dangerzone_cli is not None and self.dangerzone_cli.exists()
@@ -45,77 +74,63 @@ class DocumentSanitizer:
         Raises:
             DocumentSanitizeError: If sanitization fails
         """
-        if not input_path.exists():
+        if not os.path.exists(input_path):
             raise DocumentSanitizeError(f"Input file does not exist: {input_path}")
 
         # Prepare output path
         if output_filename is None:
-            base_name = input_path.stem
-            output_filename = f"{base_name}_defused.pdf"
-
-        # Ensure output filename ends with .pdf (Dangerzone always outputs PDF)
-        if not output_filename.endswith(".pdf"):
-            output_filename = f"{output_filename}.pdf"
+            output_filename = input_path.stem + "_defused.pdf"
+        elif not output_filename.endswith(".pdf"):
+            # Ensure output filename ends with .pdf (Dangerzone always outputs PDF)
+            output_filename += ".pdf"
 
         output_path = self.config.output_dir / output_filename
 
-        # Ensure output directory exists
-        self.config.output_dir.mkdir(parents=True, exist_ok=True)
+        # Ensure output directory exists, once per directory
+        if self.config.output_dir != self._created_output_dir:
+            self.config.output_dir.mkdir(parents=True, exist_ok=True)
+            self._created_output_dir = self.config.output_dir
 
         try:
             # Build Dangerzone command
             cmd = [
-                str(self.dangerzone_cli),
+                self._cli_str,
                 str(input_path),
                 "--output-filename",
                 output_filename,  # Just the filename, not full path
             ]
 
             # Add OCR if specified
-            if hasattr(self.config, "ocr_lang") and self.config.ocr_lang:
-                cmd.extend(["--ocr-lang", self.config.ocr_lang])
+            if self._ocr_lang:
+                cmd += ("--ocr-lang", self._ocr_lang)
 
             # Add archive flag if specified
-            if getattr(self.config, "archive_original", False):
+            if self._archive:
                 cmd.append("--archive")
 
-            # Run Dangerzone
+            # Run Dangerzone, keeping its output as bytes: it is only read
+            # when the run fails
             result = subprocess.run(
                 cmd,
                 capture_output=True,
-                text=True,
                 timeout=600,  # 10 minute timeout
                 cwd=self.config.output_dir,
             )
 
             if result.returncode != 0:
-                error_msg = (
-                    result.stderr.strip() if result.stderr else result.stdout.strip()
-                )
+                error_output = result.stderr.strip() or result.stdout.strip()
+                error_msg = error_output.decode("utf-8", "replace")
                 raise DocumentSanitizeError(f"Dangerzone failed: {error_msg}")
 
-            # Dangerzone creates files with -safe suffix by default
-            # Check if our expected output exists, or find the actual output
-            if not output_path.exists():
-                # Look for files with -safe suffix
-                stem = output_path.stem
-                safe_file = output_path.parent / f"{stem}-safe.pdf"
-                if safe_file.exists():
-                    # Rename to requested filename
-                    safe_file.rename(output_path)
-                else:
-                    # Look for any new files in output directory
-                    # (Dangerzone outputs PDF)
-                    output_files = list(self.config.output_dir.glob("*"))
-                    if output_files:
-                        # Use the most recently created one
-                        newest_file = max(output_files, key=lambda p: p.stat().st_ctime)
-                        if newest_file != output_path and newest_file.is_file():
-                            newest_file.rename(output_path)
-                    else:
-                        raise DocumentSanitizeError(
-                            "Dangerzone did not create expected output file"
-                        )
+            # Dangerzone creates files with -safe suffix by default. Rename it
+            # to the requested filename; if there is none, check for our
+            # expected output or find this document's actual output
+            safe_file = output_path.with_name(f"{output_path.stem}-safe.pdf")
+            try:
+                os.replace(safe_file, output_path)
+            except FileNotFoundError:
+                if not output_path.exists():
+                    self._locate_dangerzone_output(input_path, output_path)
 
             if not self.validate_output(output_path):
                 raise DocumentSanitizeError("Output file failed validation")
@@ -131,22 +146,71 @@ class DocumentSanitizer:
                 f"Dangerzone CLI not found: {self.dangerzone_cli}"
             )
         except Exception as e:
-            if output_path.exists():
-                output_path.unlink(missing_ok=True)
+            output_path.unlink(missing_ok=True)
             raise DocumentSanitizeError(f"Sanitization error: {str(e)}")
 
+    def sanitize_many(
+        self, input_paths: List[Path], max_workers: Optional[int] = None
+    ) -> List[Path]:
+        """
+        Sanitize several documents with concurrent Dangerzone runs
+
+        Args:
+            input_paths: Paths to input documents
+            max_workers: Concurrent Dangerzone runs (default: half the CPUs)
+
+        Returns:
+            Paths to sanitized documents, in the order of input_paths
+
+        Raises:
+            DocumentSanitizeError: If any sanitization fails
+        """
+        # Each run waits on its own Dangerzone process, which starts a
+        # container of its own, so threads are enough
+        max_workers = max_workers or max((os.cpu_count() or 2) // 2, 1)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(self.sanitize, input_paths))
+
+    def _locate_dangerzone_output(self, input_path: Path, output_path: Path):
+        """Rename this document's Dangerzone output to output_path.
+
+        Only PDFs named after the input or the requested output are
+        considered, so concurrent runs sharing the output directory never
+        take each other's files.
+        """
+        prefixes = (f"{input_path.stem}-", f"{output_path.stem}-")
+        # Dangerzone outputs PDF, so use the most recently created match
+        newest_file = None
+        newest_ctime = -1.0
+        with os.scandir(self.config.output_dir) as entries:
+            for entry in entries:
+                if not (
+                    entry.name.startswith(prefixes) and entry.name.endswith(".pdf")
+                ):
+                    continue
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                ctime = entry.stat(follow_symlinks=False).st_ctime
+                if ctime > newest_ctime:
+                    newest_ctime, newest_file = ctime, entry.path
+
+        if newest_file is None:
+            raise DocumentSanitizeError(
+                "Dangerzone did not create expected output file"
+            )
+        os.rename(newest_file, output_path)
+
     def validate_output(self, output_path: Path) -> bool:
         """Validate that output file exists and has reasonable size"""
         try:
-            if not output_path.exists():
-                return False
-
-            # Check file size (Dangerzone always outputs PDF regardless of input)
+            # Check file size (Dangerzone always outputs PDF regardless of input);
+            # a missing file raises here
             if output_path.stat().st_size < 100:
                 return False
 
-            # Check PDF magic bytes (Dangerzone always converts to PDF)
-            with open(output_path, "rb") as f:
+            # Check PDF magic bytes (Dangerzone always converts to PDF), with a
+            # single unbuffered read
+            with open(output_path, "rb", buffering=0) as f:
                 header = f.read(4)
                 if header != b"%PDF":
                     return False
@@ -157,10 +221,16 @@ class DocumentSanitizer:
             return False
 
     def get_version(self) -> Optional[str]:
-        """Get Dangerzone version"""
+        """Get Dangerzone version, asking the CLI only until it answers"""
+        if self._version is None:
+            self._version = self._query_version()
+        return self._version
+
+    def _query_version(self) -> Optional[str]:
+        """Run the Dangerzone CLI's --version"""
         try:
             result = subprocess.run(
-                [str(self.dangerzone_cli), "--version"],
+                [self._cli_str, "--version"],
                 capture_output=True,
                 text=True,
                 timeout=10,
@@ -175,15 +245,20 @@ class DocumentSanitizer:
         """Clean up temporary files"""
         if not self.config.keep_temp_files:
             try:
-                for temp_file in self.config.output_dir.glob("temp_*"):
-                    temp_file.unlink(missing_ok=True)
+                with os.scandir(self.config.output_dir) as entries:
+                    for entry in entries:
+                        if entry.name.startswith("temp_") and entry.is_file(
+                            follow_symlinks=False
+                        ):
+                            try:
+                                os.unlink(entry.path)
+                            except FileNotFoundError:
+                                pass
 
                 # Clean up unsafe archived files if not keeping them
-                unsafe_dir = self.config.output_dir / "unsafe"
-                if unsafe_dir.exists() and not getattr(
-                    self.config, "keep_unsafe_files", False
-                ):
-                    shutil.rmtree(unsafe_dir, ignore_errors=True)
+                # (rmtree ignores a missing directory)
+                if not getattr(self.config, "keep_unsafe_files", False):
+                    shutil.rmtree(self.config.output_dir / "unsafe", ignore_errors=True)
 
             except Exception:
                 pass
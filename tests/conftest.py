@@ -2,6 +2,9 @@
 Shared pytest fixtures and test configuration.
 """
 
+import os
+import platform
+import shutil
 import tempfile
 from pathlib import Path
 from typing import Generator, Dict
@@ -12,12 +15,45 @@ from click.testing import CliRunner
 
 from defuse.config import Config, SandboxConfig, SanitizerConfig
 
+# Host platform, looked up once for the platform fixtures below
+_SYSTEM = platform.system()
+_IS_LINUX = _SYSTEM == "Linux"
+_IS_WINDOWS = _SYSTEM == "Windows"
+_IS_MACOS = _SYSTEM == "Darwin"
+
+# Sample documents, built once at import and shared by the fixtures below
+_SAMPLE_PDF = b"%PDF-1.7\n1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\n%%EOF"
+# Simplified ZIP structure that starts with ZIP magic bytes
+_SAMPLE_DOCX = b"PK\x03\x04\x14\x00\x00\x00\x08\x00[Content_Types].xml"
+_SAMPLE_PNG = b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x01\x00\x00\x00\x007n\xf9$"
+_SAMPLE_FORMATS: Dict[str, bytes] = {
+    "pdf": _SAMPLE_PDF,
+    "docx": _SAMPLE_DOCX,
+    "png": _SAMPLE_PNG,
+    "jpeg": b"\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x01\x00H\x00H\x00\x00\xff\xdb",
+    "gif": b"GIF89a\x01\x00\x01\x00\x00\x00\x00!\xf9\x04\x01\x00\x00\x00\x00,",
+    "rtf": b"{\\rtf1\\ansi\\deff0 {\\fonttbl {\\f0 Times New Roman;}}\\f0\\fs24 Hello World!}",
+    "epub": b"PK\x03\x04\x14\x00\x00\x00\x08\x00mimetypeapplication/epub+zip",
+}
+
 
 @pytest.fixture
 def temp_dir() -> Generator[Path, None, None]:
     """Provide a temporary directory for tests."""
-    with tempfile.TemporaryDirectory() as tmp_dir:
-        yield Path(tmp_dir)
+    tmp_dir = Path(tempfile.mkdtemp(prefix="defuse-test-"))
+    try:
+        yield tmp_dir
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def session_temp_dir(tmp_path_factory) -> Path:
+    """Provide a temporary directory shared by the whole test session.
+
+    Only for files the tests read but never change; use temp_dir otherwise.
+    """
+    return tmp_path_factory.mktemp("defuse-session")
 
 
 @pytest.fixture
@@ -57,7 +93,7 @@ def sanitizer_config_fixture(temp_dir: Path) -> SanitizerConfig:
     )
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def cli_runner() -> CliRunner:
     """Provide a Click CLI test runner."""
     return CliRunner()
@@ -79,22 +115,27 @@ def mock_docker():
         yield client
 
 
+@pytest.fixture(scope="session")
+def mock_dangerzone_path(session_temp_dir: Path) -> Path:
+    """Provide a placeholder dangerzone-cli, created once per session.
+
+    DocumentSanitizer only checks that the CLI exists, and mock_dangerzone
+    patches subprocess.run, so an empty file is enough.
+    """
+    dangerzone_path = session_temp_dir / "dangerzone-cli"
+    dangerzone_path.touch()
+    return dangerzone_path
+
+
 @pytest.fixture
-def mock_dangerzone(temp_dir: Path):
+def mock_dangerzone(mock_dangerzone_path: Path):
     """Mock dangerzone-cli for sanitizer tests."""
-    dangerzone_path = temp_dir / "dangerzone-cli"
-    dangerzone_path.write_text("#!/bin/bash\necho 'Mock Dangerzone CLI'\n")
-    dangerzone_path.chmod(0o755)
-
     with patch("subprocess.run") as mock_run:
         # Mock successful dangerzone run
-        mock_result = MagicMock()
-        mock_result.returncode = 0
-        mock_result.stdout = "Document converted successfully"
-        mock_result.stderr = ""
-        mock_run.return_value = mock_result
-
-        yield dangerzone_path
+        mock_run.return_value = MagicMock(
+            returncode=0, stdout="Document converted successfully", stderr=""
+        )
+        yield mock_dangerzone_path
 
 
 @pytest.fixture
@@ -119,37 +160,28 @@ def mock_sandbox_capabilities():
         yield mock_caps
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_pdf_data() -> bytes:
     """Provide sample PDF data for testing."""
-    return b"%PDF-1.7\n1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\n%%EOF"
+    return _SAMPLE_PDF
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_docx_data() -> bytes:
     """Provide sample DOCX data for testing."""
-    # Simplified ZIP structure that starts with ZIP magic bytes
-    return b"PK\x03\x04\x14\x00\x00\x00\x08\x00[Content_Types].xml"
+    return _SAMPLE_DOCX
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_png_data() -> bytes:
     """Provide sample PNG data for testing."""
-    return b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x01\x00\x00\x00\x007n\xf9$"
+    return _SAMPLE_PNG
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_formats_data() -> Dict[str, bytes]:
     """Provide sample data for various formats."""
-    return {
-        "pdf": b"%PDF-1.7\n1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\n%%EOF",
-        "docx": b"PK\x03\x04\x14\x00\x00\x00\x08\x00[Content_Types].xml",
-        "png": b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x01\x00\x00\x00\x007n\xf9$",
-        "jpeg": b"\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x01\x00H\x00H\x00\x00\xff\xdb",
-        "gif": b"GIF89a\x01\x00\x01\x00\x00\x00\x00!\xf9\x04\x01\x00\x00\x00\x00,",
-        "rtf": b"{\\rtf1\\ansi\\deff0 {\\fonttbl {\\f0 Times New Roman;}}\\f0\\fs24 Hello World!}",
-        "epub": b"PK\x03\x04\x14\x00\x00\x00\x08\x00mimetypeapplication/epub+zip",
-    }
+    return _SAMPLE_FORMATS
 
 
 # Platform-specific fixtures for cross-platform testing
@@ -158,13 +190,11 @@ def sample_formats_data() -> Dict[str, bytes]:
 @pytest.fixture
 def platform_info():
     """Provide current platform information for tests."""
-    import platform
-
     return {
-        "system": platform.system(),
-        "is_linux": platform.system() == "Linux",
-        "is_windows": platform.system() == "Windows",
-        "is_macos": platform.system() == "Darwin",
+        "system": _SYSTEM,
+        "is_linux": _IS_LINUX,
+        "is_windows": _IS_WINDOWS,
+        "is_macos": _IS_MACOS,
         "architecture": platform.machine(),
         "version": platform.release(),
     }
@@ -173,37 +203,30 @@ def platform_info():
 @pytest.fixture
 def skip_if_not_linux():
     """Skip test if not running on Linux."""
-    import platform
-
-    if platform.system() != "Linux":
+    if not _IS_LINUX:
         pytest.skip("Test requires Linux")
 
 
 @pytest.fixture
 def skip_if_not_windows():
     """Skip test if not running on Windows."""
-    import platform
-
-    if platform.system() != "Windows":
+    if not _IS_WINDOWS:
         pytest.skip("Test requires Windows")
 
 
 @pytest.fixture
 def skip_if_not_macos():
     """Skip test if not running on macOS."""
-    import platform
-
-    if platform.system() != "Darwin":
+    if not _IS_MACOS:
         pytest.skip("Test requires macOS")
 
 
 @pytest.fixture
 def platform_sandbox_capabilities():
     """Platform-specific mock sandbox capabilities."""
-    import platform
     from defuse.sandbox import SandboxBackend, IsolationLevel
 
-    system = platform.system()
+    system = _SYSTEM
 
     if system == "Linux":
         available_backends = {
@@ -258,10 +281,13 @@ def platform_sandbox_capabilities():
         yield mock_caps
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def docker_available():
-    """Check if Docker is available for testing."""
-    import shutil
+    """Check if Docker is available for testing.
+
+    Session-scoped, so the daemon is probed at most once per test run.
+    """
+    import os
     import subprocess
 
     # Check if docker command exists
@@ -269,6 +295,11 @@ def docker_available():
         pytest.skip("Docker not available")
         return False
 
+    # A local daemon socket is enough; otherwise ask the CLI, which also
+    # covers DOCKER_HOST and remote contexts
+    if os.path.exists("/var/run/docker.sock"):
+        return True
+
     # Check if Docker daemon is running
     try:
         result = subprocess.run(["docker", "info"], capture_output=True, timeout=5)
@@ -281,35 +312,25 @@ def docker_available():
         return False
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sandbox_tool_availability():
-    """Check availability of sandbox tools on current platform."""
-    import shutil
-    import platform
+    """Check availability of sandbox tools on current platform.
 
-    availability = {
+    Session-scoped: PATH is scanned for each tool once per test run.
+    """
+    # Firejail and Bubblewrap are Linux-only, so don't look for them elsewhere
+    return {
         "docker": shutil.which("docker") is not None,
         "podman": shutil.which("podman") is not None,
-        "firejail": shutil.which("firejail") is not None,
-        "bubblewrap": shutil.which("bwrap") is not None,
+        "firejail": _IS_LINUX and shutil.which("firejail") is not None,
+        "bubblewrap": _IS_LINUX and shutil.which("bwrap") is not None,
     }
 
-    # Platform-specific adjustments
-    system = platform.system()
-    if system != "Linux":
-        availability["firejail"] = False
-        availability["bubblewrap"] = False
-
-    return availability
-
 
 @pytest.fixture
 def platform_temp_dir():
     """Platform-appropriate temporary directory."""
-    import tempfile
-    import platform
-
-    if platform.system() == "Windows":
+    if _IS_WINDOWS:
         # Use Windows temp directory
         temp_dir = Path(tempfile.gettempdir())
     else:
@@ -321,7 +342,7 @@ def platform_temp_dir():
     return temp_dir
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mock_http_responses():
     """Mock HTTP responses for download tests."""
     responses_data = {
@@ -349,6 +370,67 @@ def temp_download_dir(temp_dir: Path) -> Path:
     return download_dir
 
 
+@pytest.fixture(autouse=True)
+def reset_lookup_caches():
+    """Clear process-wide lookup caches so each test sees its own mocks."""
+    from defuse.cli import (
+        check_container_runtime,
+        container_runtime_version,
+        find_container_runtime,
+        find_dangerzone_cli,
+    )
+    from defuse.sandbox import find_executable, get_sandbox_capabilities
+    from defuse.sanitizer import _FOUND_CLI_PATHS
+
+    find_dangerzone_cli.cache_clear()
+    check_container_runtime.cache_clear()
+    find_container_runtime.cache_clear()
+    container_runtime_version.cache_clear()
+    find_executable.cache_clear()
+    get_sandbox_capabilities.cache_clear()
+    _FOUND_CLI_PATHS.clear()
+    yield
+
+
+@pytest.fixture
+def dangerzone_install(temp_dir: Path, monkeypatch):
+    """Stage Dangerzone CLI installs for find_dangerzone_cli under temp_dir.
+
+    Call with a platform name and a predicate over the platform's search
+    locations. The locations are re-rooted under temp_dir and used as the
+    search list for the test; the ones matching the predicate are created.
+    Returns the list of paths find_dangerzone_cli probes, in order, recorded
+    as the original (not re-rooted) locations.
+    """
+    from defuse import cli
+
+    root = temp_dir / "install-root"
+    real_lexists = os.path.lexists
+
+    def _install(system: str, predicate=lambda path: False) -> list:
+        candidates = []
+        originals = {}
+        for original in cli._dangerzone_cli_candidates(system):
+            path = root / str(original).replace(":", "").lstrip("/")
+            if predicate(str(original)):
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.touch()
+            candidates.append(path)
+            originals[str(path)] = str(original)
+
+        probes = []
+
+        def recording_lexists(path):
+            probes.append(originals.get(str(path), str(path)))
+            return real_lexists(path)
+
+        monkeypatch.setattr(cli, "_DANGERZONE_CLI_CANDIDATES", candidates)
+        monkeypatch.setattr(cli.os.path, "lexists", recording_lexists)
+        return probes
+
+    return _install
+
+
 @pytest.fixture(autouse=True)
 def setup_test_environment(temp_dir: Path, monkeypatch):
     """Set up test environment variables and paths."""
@@ -361,8 +443,8 @@ def setup_test_environment(temp_dir: Path, monkeypatch):
     test_config_dir.mkdir(exist_ok=True)
 
     # Patch config directory functions to use test directory
-    with patch("defuse.cli.get_config_dir", return_value=test_config_dir):
-        yield
+    monkeypatch.setattr("defuse.cli.get_config_dir", lambda: test_config_dir)
+    yield
 
 
 # Test sample file generators
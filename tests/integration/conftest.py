@@ -6,18 +6,27 @@ integration of Defuse components with external dependencies like
 Docker, HTTP servers, and file systems.
 """
 
-import http.server
-import socketserver
+import functools
 import threading
 import time
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List
 
 import pytest
 import responses
 
 from defuse.config import Config, SandboxConfig, SanitizerConfig
 
+# Sample document contents, built once at import
+_SAMPLE_DOCUMENTS: Dict[str, bytes] = {
+    "pdf": b"%PDF-1.7\\n1 0 obj\\n<< /Type /Catalog /Pages 2 0 R >>\\nendobj\\n%%EOF",
+    "docx": b"PK\\x03\\x04\\x14\\x00\\x00\\x00\\x08\\x00[Content_Types].xml",
+    "png": b"\\x89PNG\\r\\n\\x1a\\n\\x00\\x00\\x00\\rIHDR\\x00\\x00\\x00\\x01\\x00\\x00\\x00\\x01\\x01\\x00\\x00\\x00\\x007n\\xf9$",
+    "jpeg": b"\\xff\\xd8\\xff\\xe0\\x00\\x10JFIF\\x00\\x01\\x01\\x01\\x00H\\x00H\\x00\\x00\\xff\\xdb",
+    "rtf": b"{\\\\rtf1\\\\ansi\\\\deff0 {\\\\fonttbl {\\\\f0 Times New Roman;}}\\\\f0\\\\fs24 Test Document}",
+    "large_pdf": b"%PDF-1.7\\n" + b"Large content " * 10000 + b"\\n%%EOF",
+}
+
 
 @pytest.fixture
 def integration_config(temp_dir: Path) -> Config:
@@ -43,143 +52,128 @@ def integration_config(temp_dir: Path) -> Config:
     return config
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_documents() -> Dict[str, bytes]:
     """Sample document contents for various formats."""
-    return {
-        "pdf": b"%PDF-1.7\\n1 0 obj\\n<< /Type /Catalog /Pages 2 0 R >>\\nendobj\\n%%EOF",
-        "docx": b"PK\\x03\\x04\\x14\\x00\\x00\\x00\\x08\\x00[Content_Types].xml",
-        "png": b"\\x89PNG\\r\\n\\x1a\\n\\x00\\x00\\x00\\rIHDR\\x00\\x00\\x00\\x01\\x00\\x00\\x00\\x01\\x01\\x00\\x00\\x00\\x007n\\xf9$",
-        "jpeg": b"\\xff\\xd8\\xff\\xe0\\x00\\x10JFIF\\x00\\x01\\x01\\x01\\x00H\\x00H\\x00\\x00\\xff\\xdb",
-        "rtf": b"{\\\\rtf1\\\\ansi\\\\deff0 {\\\\fonttbl {\\\\f0 Times New Roman;}}\\\\f0\\\\fs24 Test Document}",
-        "large_pdf": b"%PDF-1.7\\n" + b"Large content " * 10000 + b"\\n%%EOF",
-    }
+    return _SAMPLE_DOCUMENTS
 
 
-@pytest.fixture
-def mock_http_server():
-    """
-    Mock HTTP server fixture for controlled download testing.
+_MOCK_HTTP_BASE_URL = "http://mock"
 
-    Provides a simple HTTP server that can serve various response scenarios
-    for integration testing without relying on external services.
-    """
 
-    class MockHTTPHandler(http.server.BaseHTTPRequestHandler):
-        def log_message(self, format, *args):
-            # Suppress HTTP server logging during tests
-            pass
-
-        def do_GET(self):
-            # Default response
-            if self.path == "/test.pdf":
-                self.send_response(200)
-                self.send_header("Content-Type", "application/pdf")
-                self.send_header("Content-Length", "100")
-                self.end_headers()
-                self.wfile.write(b"%PDF-1.7\\nTest PDF content\\n%%EOF" + b"\\x00" * 50)
-            elif self.path == "/slow.pdf":
-                # Simulate slow response
-                time.sleep(2)
-                self.send_response(200)
-                self.send_header("Content-Type", "application/pdf")
-                self.end_headers()
-                self.wfile.write(b"%PDF-1.7\\nSlow PDF\\n%%EOF")
-            elif self.path == "/large.pdf":
-                # Large file for testing memory/size limits
-                content = b"%PDF-1.7\\n" + b"Large content block " * 1000 + b"\\n%%EOF"
-                self.send_response(200)
-                self.send_header("Content-Type", "application/pdf")
-                self.send_header("Content-Length", str(len(content)))
-                self.end_headers()
-                self.wfile.write(content)
-            elif self.path == "/redirect":
-                # Test redirect handling
-                self.send_response(302)
-                self.send_header("Location", "/test.pdf")
-                self.end_headers()
-            elif self.path == "/404":
-                self.send_response(404)
-                self.end_headers()
-                self.wfile.write(b"Not Found")
-            elif self.path == "/500":
-                self.send_response(500)
-                self.end_headers()
-                self.wfile.write(b"Internal Server Error")
-            else:
-                self.send_response(404)
-                self.end_headers()
-
-    # Find a free port
-    with socketserver.TCPServer(("localhost", 0), MockHTTPHandler) as httpd:
-        port = httpd.server_address[1]
-
-        # Start server in background thread
-        server_thread = threading.Thread(target=httpd.serve_forever, daemon=True)
-        server_thread.start()
-
-        # Give server time to start
-        time.sleep(0.1)
-
-        yield f"http://localhost:{port}"
-
-        httpd.shutdown()
+@pytest.fixture(scope="session")
+def mock_http_routes() -> List[Dict]:
+    """Routes served by mock_http_server, built once per test session."""
+    base_url = _MOCK_HTTP_BASE_URL
+    return [
+        dict(
+            url=f"{base_url}/test.pdf",
+            body=b"%PDF-1.7\\nTest PDF content\\n%%EOF" + b"\\x00" * 50,
+            status=200,
+            content_type="application/pdf",
+        ),
+        # Large file for testing memory/size limits
+        dict(
+            url=f"{base_url}/large.pdf",
+            body=b"%PDF-1.7\\n" + b"Large content block " * 1000 + b"\\n%%EOF",
+            status=200,
+            content_type="application/pdf",
+        ),
+        # Test redirect handling
+        dict(
+            url=f"{base_url}/redirect",
+            status=302,
+            headers={"Location": f"{base_url}/test.pdf"},
+        ),
+        dict(url=f"{base_url}/404", body=b"Not Found", status=404),
+        dict(url=f"{base_url}/500", body=b"Internal Server Error", status=500),
+    ]
 
 
 @pytest.fixture
-def mock_responses_server():
+def mock_http_server(request, mock_http_routes: List[Dict]):
     """
-    Alternative mock HTTP server using responses library.
+    Mock HTTP server fixture for controlled download testing.
 
-    This provides more control over HTTP responses and is easier to configure
-    for specific test scenarios.
+    Serves various response scenarios at http://mock through the responses
+    library, so no socket or server thread is involved. The routes are
+    shared by the session; each test gets its own mock, so routes a test
+    adds or calls it makes don't leak into the next. /slow.pdf only delays
+    its response for tests marked slow.
     """
-    with responses.RequestsMock() as rsps:
+    delay_slow = request.node.get_closest_marker("slow") is not None
+
+    def slow_response(_request):
+        # Simulate slow response
+        if delay_slow:
+            time.sleep(2)
+        return 200, {"Content-Type": "application/pdf"}, b"%PDF-1.7\\nSlow PDF\\n%%EOF"
+
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+        for route in mock_http_routes:
+            rsps.add(responses.GET, **route)
+        rsps.add_callback(
+            responses.GET, f"{_MOCK_HTTP_BASE_URL}/slow.pdf", callback=slow_response
+        )
+
+        yield _MOCK_HTTP_BASE_URL
+
+
+@pytest.fixture(scope="session")
+def mock_responses_routes() -> List[Dict]:
+    """Routes registered by mock_responses_server, built once per session."""
+    return [
         # Default successful responses
-        rsps.add(
-            responses.GET,
-            "http://example.com/test.pdf",
+        dict(
+            url="http://example.com/test.pdf",
             body=b"%PDF-1.7\\nTest PDF content\\n%%EOF",
             status=200,
             headers={"content-type": "application/pdf", "content-length": "100"},
-        )
-
-        rsps.add(
-            responses.GET,
-            "http://example.com/large.pdf",
+        ),
+        dict(
+            url="http://example.com/large.pdf",
             body=b"%PDF-1.7\\n" + b"Large content " * 1000 + b"\\n%%EOF",
             status=200,
             headers={"content-type": "application/pdf"},
-        )
-
-        rsps.add(
-            responses.GET,
-            "http://example.com/error.pdf",
+        ),
+        dict(
+            url="http://example.com/error.pdf",
             json={"error": "Not found"},
             status=404,
-        )
-
-        rsps.add(
-            responses.GET,
-            "http://slow-server.com/test.pdf",
+        ),
+        dict(
+            url="http://slow-server.com/test.pdf",
             body=b"%PDF-1.7\\nSlow server response\\n%%EOF",
             status=200,
-        )
-
+        ),
         # Malicious/test URLs
-        rsps.add(
-            responses.GET,
-            "http://malicious.com/test.pdf",
+        dict(
+            url="http://malicious.com/test.pdf",
             body=b"Potentially malicious content",
             status=200,
-        )
+        ),
+    ]
+
+
+@pytest.fixture
+def mock_responses_server(mock_responses_routes: List[Dict]):
+    """
+    Alternative mock HTTP server using responses library.
+
+    This provides more control over HTTP responses and is easier to configure
+    for specific test scenarios. The routes are shared by the session; each
+    test gets a fresh mock, so its call history starts empty.
+    """
+    with responses.RequestsMock() as rsps:
+        for route in mock_responses_routes:
+            rsps.add(responses.GET, **route)
 
         yield rsps
 
 
-@pytest.fixture
-def docker_available():
-    """Check if Docker is available for testing."""
+@functools.lru_cache(maxsize=None)
+def _docker_available() -> bool:
+    """Check once per process whether the Docker daemon answers a ping."""
     try:
         import docker
 
@@ -190,14 +184,26 @@ def docker_available():
         return False
 
 
-@pytest.fixture
-def podman_available():
-    """Check if Podman is available for testing."""
+@functools.lru_cache(maxsize=None)
+def _podman_available() -> bool:
+    """Check once per process whether Podman is on PATH."""
     import shutil
 
     return shutil.which("podman") is not None
 
 
+@pytest.fixture(scope="session")
+def docker_available():
+    """Check if Docker is available for testing."""
+    return _docker_available()
+
+
+@pytest.fixture(scope="session")
+def podman_available():
+    """Check if Podman is available for testing."""
+    return _podman_available()
+
+
 @pytest.fixture
 def container_runtime_available(docker_available, podman_available):
     """Skip test if no container runtime is available."""
@@ -206,10 +212,13 @@ def container_runtime_available(docker_available, podman_available):
     return docker_available or podman_available
 
 
-@pytest.fixture
-def mock_dangerzone_cli(temp_dir: Path):
-    """Mock dangerzone-cli for sanitization testing."""
-    dangerzone_path = temp_dir / "mock-dangerzone-cli"
+@pytest.fixture(scope="session")
+def mock_dangerzone_cli(session_temp_dir: Path):
+    """Mock dangerzone-cli for sanitization testing, written once per session.
+
+    The script is stateless, so every test can share the same executable.
+    """
+    dangerzone_path = session_temp_dir / "mock-dangerzone-cli"
 
     # Create a mock executable that simulates dangerzone behavior
     mock_script = """#!/bin/bash
@@ -281,28 +290,23 @@ http://example.com/final.pdf"""
     return urls_file
 
 
-@pytest.fixture(autouse=True)
-def integration_test_environment(temp_dir: Path, monkeypatch):
-    """Set up environment for integration tests."""
-    # Set test-specific environment variables
-    monkeypatch.setenv("DEFUSE_TEST_MODE", "integration")
-    monkeypatch.setenv("DEFUSE_TEMP_DIR", str(temp_dir))
-
-    # Ensure output directories exist
-    output_dir = temp_dir / "output"
-    output_dir.mkdir(exist_ok=True)
-
-    sandbox_temp = temp_dir / "sandbox"
-    sandbox_temp.mkdir(exist_ok=True)
-
-    yield
+@pytest.fixture
+def integration_test_environment(monkeypatch):
+    """Mark the environment as an integration run, for tests that opt in.
 
-    # Cleanup is handled by temp_dir fixture
+    Tests that need output or sandbox directories create them from
+    temp_dir themselves.
+    """
+    # DEFUSE_TEMP_DIR is already set by the top-level conftest
+    monkeypatch.setenv("DEFUSE_TEST_MODE", "integration")
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def large_file_content():
-    """Generate large file content for testing file size limits."""
+    """Generate large file content for testing file size limits.
+
+    Session-scoped, so the ~10MB is built at most once per test run.
+    """
     # Generate ~10MB of content
     chunk = b"This is a test chunk of data for file size limit testing. " * 1000
     return chunk * 200  # Approximately 10MB
@@ -310,27 +314,22 @@ def large_file_content():
 
 @pytest.fixture
 def network_timeout_simulation():
-    """Simulate various network timeout scenarios."""
+    """Simulate various network timeout scenarios.
 
-    def _simulate_timeout(timeout_type="slow"):
+    Waits are on an event rather than wall-clock sleeps: "slow" returns after
+    a short delay, and "hang" blocks until the fixture is torn down, which
+    releases any worker thread still waiting.
+    """
+    released = threading.Event()
+
+    def _simulate_timeout(timeout_type="slow", slow_seconds=0.05):
         if timeout_type == "slow":
-            time.sleep(5)  # Simulate slow response
+            released.wait(timeout=slow_seconds)  # Simulate slow response
         elif timeout_type == "hang":
-            time.sleep(300)  # Simulate hanging connection
+            released.wait()  # Simulate hanging connection
         elif timeout_type == "interrupt":
             raise ConnectionError("Simulated network interruption")
 
-    return _simulate_timeout
+    yield _simulate_timeout
 
-
-# Skip markers for integration tests
-def pytest_configure(config):
-    """Configure custom markers for integration tests."""
-    config.addinivalue_line(
-        "markers",
-        "integration: mark test as integration test requiring external resources",
-    )
-    config.addinivalue_line("markers", "docker: mark test as requiring Docker")
-    config.addinivalue_line("markers", "podman: mark test as requiring Podman")
-    config.addinivalue_line("markers", "slow: mark test as slow running")
-    config.addinivalue_line("markers", "network: mark test as requiring network access")
+    released.set()
@@ -202,9 +202,9 @@ class TestLinuxCLIIntegration:
                 mock_caps.recommended_backend = "bubblewrap"
                 mock_capabilities.return_value = mock_caps
 
-                with patch("defuse.cli.check_container_runtime") as mock_check:
+                with patch("defuse.cli.find_container_runtime") as mock_check:
                     # Mock container runtime check
-                    mock_check.return_value = ("docker", "/usr/bin/docker", "20.10.0")
+                    mock_check.return_value = ("docker", "/usr/bin/docker")
 
                     with patch("subprocess.run") as mock_run:
                         mock_run.return_value.returncode = 0
@@ -226,52 +226,38 @@ class TestLinuxCLIIntegration:
                                 len(mock_run.call_args_list) >= 2
                             )  # At least 2 downloads
 
-    def test_linux_cli_with_snap_dangerzone(self):
+    def test_linux_cli_with_snap_dangerzone(self, dangerzone_install):
         """Test CLI detection of Snap-installed Dangerzone on Linux."""
-        runner = CliRunner()
-
-        snap_path = Path("/snap/dangerzone/current/bin/dangerzone-cli")
-        with patch("platform.system", return_value="Linux"):
-            with patch("defuse.cli.shutil.which", return_value=None):
-                # Mock Path.exists to track what paths are checked
-                original_exists = Path.exists
-
-                def mock_exists(self, *, follow_symlinks=True):
-                    return "snap" in str(self)
-
-                Path.exists = mock_exists
-                try:
-                    result = find_dangerzone_cli()
-
-                    # Should have found it in snap
-                    assert result is not None
-                    assert "snap" in str(result)
-                finally:
-                    # Restore original method
-                    Path.exists = original_exists
+        probes = dangerzone_install("Linux", lambda path: "snap" in path)
+        with patch("defuse.cli.shutil.which", return_value=None):
+            result = find_dangerzone_cli()
+
+            # Should have found it in snap
+            assert result is not None
+            assert "snap" in str(result)
+
+        # Package manager and Flatpak locations are probed first
+        assert probes[-1] == "/snap/bin/dangerzone-cli"
+        assert probes[:3] == [
+            "/usr/bin/dangerzone-cli",
+            "/usr/local/bin/dangerzone-cli",
+            "/bin/dangerzone-cli",
+        ]
+        assert len(probes) == 6
 
-    def test_linux_cli_with_flatpak_dangerzone(self):
+    def test_linux_cli_with_flatpak_dangerzone(self, dangerzone_install):
         """Test CLI detection of Flatpak-installed Dangerzone on Linux."""
-        runner = CliRunner()
-
-        with patch("platform.system", return_value="Linux"):
-            with patch("defuse.cli.shutil.which", return_value=None):
-                # Mock Path.exists to track what paths are checked
-                original_exists = Path.exists
-
-                def mock_exists(self, *, follow_symlinks=True):
-                    return "flatpak" in str(self)
+        probes = dangerzone_install("Linux", lambda path: "flatpak" in path)
+        with patch("defuse.cli.shutil.which", return_value=None):
+            result = find_dangerzone_cli()
 
-                Path.exists = mock_exists
-                try:
-                    result = find_dangerzone_cli()
+            # Should have found it in flatpak
+            assert result is not None
+            assert "flatpak" in str(result)
 
-                    # Should have found it in flatpak
-                    assert result is not None
-                    assert "flatpak" in str(result)
-                finally:
-                    # Restore original method
-                    Path.exists = original_exists
+        # The system-wide Flatpak export wins over the per-user one
+        assert probes[-1] == "/var/lib/flatpak/exports/bin/dangerzone-cli"
+        assert len(probes) == 4
 
 
 @pytest.mark.windows
@@ -344,27 +330,23 @@ class TestWindowsCLIIntegration:
             # Should not fail due to path spaces
             # (Note: actual behavior depends on implementation)
 
-    def test_windows_cli_with_program_files_dangerzone(self):
+    def test_windows_cli_with_program_files_dangerzone(self, dangerzone_install):
         """Test CLI detection of Program Files Dangerzone on Windows."""
-        with patch("platform.system", return_value="Windows"):
-            with patch("defuse.cli.shutil.which", return_value=None):
-                # Mock Path.exists
-                original_exists = Path.exists
-
-                def mock_exists(self, *, follow_symlinks=True):
-                    return "Program Files" in str(self) and str(self).endswith(".exe")
-
-                Path.exists = mock_exists
-                try:
-                    result = find_dangerzone_cli()
-
-                    # Should have found it in Program Files
-                    assert result is not None
-                    assert "Program Files" in str(result)
-                    assert str(result).endswith(".exe")
-                finally:
-                    # Restore original method
-                    Path.exists = original_exists
+        probes = dangerzone_install(
+            "Windows", lambda path: "Program Files" in path and path.endswith(".exe")
+        )
+        with patch("defuse.cli.shutil.which", return_value=None):
+            result = find_dangerzone_cli()
+
+            # Should have found it in Program Files
+            assert result is not None
+            assert "Program Files" in str(result)
+            assert str(result).endswith(".exe")
+
+        # The first candidate matched, so nothing else was probed
+        assert [Path(probe) for probe in probes] == [
+            Path("C:/Program Files/Dangerzone/dangerzone-cli.exe")
+        ]
 
     def test_windows_cli_error_handling(self, temp_dir):
         """Test Windows-specific error handling in CLI."""
@@ -426,54 +408,43 @@ class TestMacOSCLIIntegration:
                             cmd_args = mock_run.call_args[0][0]
                             # May contain 'podman' depending on implementation
 
-    def test_macos_cli_app_bundle_detection(self):
+    def test_macos_cli_app_bundle_detection(self, dangerzone_install):
         """Test CLI detection of app bundle Dangerzone on macOS."""
+        probes = dangerzone_install(
+            "Darwin", lambda path: "Dangerzone.app" in path and "Contents/MacOS" in path
+        )
         with patch("defuse.cli.shutil.which", return_value=None):
-            # Mock Path.exists
-            original_exists = Path.exists
+            result = find_dangerzone_cli()
 
-            def mock_exists(self, *, follow_symlinks=True):
-                return "Dangerzone.app" in str(self) and "Contents/MacOS" in str(self)
+            # Should have found it in app bundle
+            assert result is not None
+            assert "Dangerzone.app" in str(result)
+            assert "Contents/MacOS" in str(result)
 
-            Path.exists = mock_exists
-            try:
-                result = find_dangerzone_cli()
+        assert probes == ["/Applications/Dangerzone.app/Contents/MacOS/dangerzone-cli"]
 
-                # Should have found it in app bundle
-                assert result is not None
-                assert "Dangerzone.app" in str(result)
-                assert "Contents/MacOS" in str(result)
-            finally:
-                # Restore original method
-                Path.exists = original_exists
-
-    def test_macos_cli_homebrew_detection(self):
+    def test_macos_cli_homebrew_detection(self, dangerzone_install):
         """Test CLI detection of Homebrew Dangerzone on macOS."""
+        probes = dangerzone_install(
+            "Darwin",
+            lambda path: (
+                ("homebrew" in path or "/usr/local" in path or "/opt/homebrew" in path)
+                and path.endswith("dangerzone-cli")
+            ),
+        )
         with patch("defuse.cli.shutil.which", return_value=None):
-            # Mock Path.exists
-            original_exists = Path.exists
-
-            def mock_exists(self, *, follow_symlinks=True):
-                path_str = str(self)
-                return (
-                    "homebrew" in path_str
-                    or "/usr/local" in path_str
-                    or "/opt/homebrew" in path_str
-                ) and path_str.endswith("dangerzone-cli")
-
-            Path.exists = mock_exists
-            try:
-                result = find_dangerzone_cli()
-
-                # Should have found it in Homebrew paths
-                assert result is not None
-                assert any(
-                    path in str(result)
-                    for path in ["homebrew", "/usr/local", "/opt/homebrew"]
-                )
-            finally:
-                # Restore original method
-                Path.exists = original_exists
+            result = find_dangerzone_cli()
+
+            # Should have found it in Homebrew paths
+            assert result is not None
+            assert any(
+                path in str(result)
+                for path in ["homebrew", "usr/local", "opt/homebrew"]
+            )
+
+        # Both app bundles are probed before Apple Silicon Homebrew matches
+        assert len(probes) == 3
+        assert probes[-1] == "/opt/homebrew/bin/dangerzone-cli"
 
     @responses.activate
     def test_macos_sanitize_command_full_workflow(self, temp_dir):
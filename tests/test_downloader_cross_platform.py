@@ -5,12 +5,17 @@ Simplified tests for HTTP/HTTPS download functionality across platforms.
 These tests focus on platform-specific behaviors and detection.
 """
 
+import io
+import sys
+import tempfile
+import zipfile
 from unittest.mock import patch, MagicMock
 
 import pytest
 
 from defuse.config import SandboxConfig
 from defuse.downloader import SecureDocumentDownloader, DocumentDownloadError
+from defuse.formats import SupportedFormat
 
 
 class TestCrossPlatformDownloader:
@@ -154,6 +159,126 @@ class TestDownloaderErrorHandling:
             with pytest.raises(DocumentDownloadError):
                 downloader.download("http://example.com/test.pdf")
 
+    def test_oversized_download_rejected_from_get_headers(self, temp_dir):
+        """Test that size limits are enforced from the GET response headers."""
+        config = SandboxConfig(temp_dir=temp_dir, max_file_size=1024)
+        downloader = SecureDocumentDownloader(config)
+
+        mock_response = MagicMock()
+        mock_response.headers = {
+            "content-length": "4096",
+            "content-type": "application/pdf",
+        }
+
+        with patch.object(downloader.session, "head") as mock_head:
+            with patch.object(downloader.session, "get", return_value=mock_response):
+                with pytest.raises(DocumentDownloadError, match="too large"):
+                    downloader.download("http://example.com/test.pdf")
+
+        mock_head.assert_not_called()
+        mock_response.iter_content.assert_not_called()
+        mock_response.__exit__.assert_called_once()
+
+    def test_small_download_is_kept_in_memory(self, temp_dir):
+        """Test that a small download of known size is buffered in memory."""
+        config = SandboxConfig(temp_dir=temp_dir)
+        downloader = SecureDocumentDownloader(config)
+
+        body = [b"%PDF-1.7\n", b"1 0 obj\n", b"%%EOF\n"]
+        mock_response = MagicMock()
+        mock_response.headers = {
+            "content-length": str(sum(map(len, body))),
+            "content-type": "application/pdf",
+        }
+        mock_response.iter_content.return_value = body
+
+        with patch.object(downloader.session, "get", return_value=mock_response):
+            buffer = downloader.download_to_memory("http://example.com/test.pdf")
+
+        assert isinstance(buffer, io.BytesIO)
+        assert buffer.read() == b"".join(body)
+
+    @pytest.mark.parametrize("prefer_memory", [True, False])
+    def test_download_to_temp_file(self, temp_dir, prefer_memory):
+        """Test that downloads without an output path land in a temp file."""
+        config = SandboxConfig(temp_dir=temp_dir)
+        downloader = SecureDocumentDownloader(config)
+
+        body = [b"%PDF-1.7\n", b"%%EOF\n"]
+        mock_response = MagicMock()
+        mock_response.headers = {"content-type": "application/pdf"}
+        mock_response.iter_content.return_value = body
+
+        with patch.object(downloader.session, "get", return_value=mock_response):
+            output_path = downloader.download(
+                "http://example.com/test.pdf", prefer_memory=prefer_memory
+            )
+
+        assert output_path.parent == temp_dir
+        assert output_path.suffix == ".tmp"
+        assert output_path.read_bytes() == b"".join(body)
+
+    def test_unsupported_header_aborts_download(self, temp_dir):
+        """Test that an unsupported format is rejected from the first chunk."""
+        config = SandboxConfig(temp_dir=temp_dir)
+        downloader = SecureDocumentDownloader(config)
+
+        consumed = []
+
+        def chunks():
+            for chunk in (b"MZ" + b"\x00" * 2046, b"\x00" * 2048, b"\x00" * 2048):
+                consumed.append(chunk)
+                yield chunk
+
+        mock_response = MagicMock()
+        mock_response.headers = {}
+        mock_response.iter_content.return_value = chunks()
+
+        with patch.object(downloader.session, "get", return_value=mock_response):
+            with pytest.raises(DocumentDownloadError, match="not a supported"):
+                downloader.download_to_memory("http://example.com/test.pdf")
+
+        assert len(consumed) == 1
+
+    @pytest.mark.parametrize("prefer_memory", [True, False])
+    def test_office_container_detected_from_complete_download(
+        self, temp_dir, prefer_memory
+    ):
+        """Test that a ZIP download is identified from its whole directory."""
+        config = SandboxConfig(temp_dir=temp_dir, download_chunk_size=64)
+        downloader = SecureDocumentDownloader(config)
+
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("[Content_Types].xml", "<Types/>")
+            zf.writestr("xl/workbook.xml", "<workbook/>")
+        body = archive.getvalue()
+
+        mock_response = MagicMock()
+        mock_response.headers = {}
+        mock_response.iter_content.return_value = [
+            body[i : i + 64] for i in range(0, len(body), 64)
+        ]
+
+        detected = []
+        detect_format = downloader.file_detector.detect_format
+
+        def record_detect_format(*args, **kwargs):
+            result = detect_format(*args, **kwargs)
+            detected.append(result[0])
+            return result
+
+        with patch.object(downloader.session, "get", return_value=mock_response):
+            with patch.object(
+                downloader.file_detector, "detect_format", record_detect_format
+            ):
+                output_path = downloader.download(
+                    "http://example.com/book", prefer_memory=prefer_memory
+                )
+
+        assert output_path.read_bytes() == body
+        assert detected[-1] == SupportedFormat.XLSX
+
     def test_invalid_url_handling(self, temp_dir):
         """Test invalid URL handling."""
         config = SandboxConfig(temp_dir=temp_dir)
@@ -233,3 +358,119 @@ class TestDownloaderConfiguration:
         user_agent = downloader.session.headers.get("User-Agent")
         assert user_agent
         assert len(user_agent) > 0
+
+    def test_chunk_size_configuration(self, temp_dir):
+        """Test that buffered saves use the configured chunk size."""
+        config = SandboxConfig(temp_dir=temp_dir, download_chunk_size=4)
+        downloader = SecureDocumentDownloader(config)
+
+        buffer = MagicMock()
+        buffer.read.side_effect = [b"%PDF", b" tes", b"t", b""]
+
+        output_path = downloader.save_buffer_to_file(buffer, temp_dir / "out.pdf")
+
+        assert output_path.read_bytes() == b"%PDF test"
+        buffer.read.assert_called_with(4)
+
+    @pytest.mark.parametrize("max_size", [1, 1 << 20])
+    def test_save_spooled_buffer(self, temp_dir, max_size):
+        """Test that both spilled and in-memory spools are saved intact."""
+        config = SandboxConfig(temp_dir=temp_dir)
+        downloader = SecureDocumentDownloader(config)
+
+        data = b"%PDF-1.7\n" + bytes(range(256)) * 1024
+        with tempfile.SpooledTemporaryFile(max_size=max_size) as buffer:
+            buffer.write(data)
+            output_path = downloader.save_buffer_to_file(buffer, temp_dir / "out.pdf")
+
+        assert output_path.read_bytes() == data
+
+    def test_save_bytesio_buffer(self, temp_dir):
+        """Test that an in-memory buffer is saved intact."""
+        config = SandboxConfig(temp_dir=temp_dir)
+        downloader = SecureDocumentDownloader(config)
+
+        buffer = io.BytesIO(b"%PDF-1.7\n%%EOF\n")
+        buffer.seek(5)
+
+        output_path = downloader.save_buffer_to_file(buffer, temp_dir / "out.pdf")
+
+        assert output_path.read_bytes() == b"%PDF-1.7\n%%EOF\n"
+
+    def test_save_bytesio_buffer_writes_without_copying(self, temp_dir):
+        """Test that a buffer built from bytes is written from those bytes."""
+        config = SandboxConfig(temp_dir=temp_dir)
+        downloader = SecureDocumentDownloader(config)
+
+        data = b"%PDF-1.7\n" + bytes(range(256)) * 1024
+        written = []
+
+        class RecordingFile(io.BytesIO):
+            def write(self, b):
+                written.append(b)
+                return super().write(b)
+
+        with patch("defuse.downloader.open", create=True) as mock_open:
+            mock_open.return_value = RecordingFile()
+            downloader.save_buffer_to_file(io.BytesIO(data), temp_dir / "out.pdf")
+
+        assert len(written) == 1
+        assert written[0] is data
+
+    def test_session_uses_pooled_retrying_adapter(self, temp_dir):
+        """Test that the session keeps a connection pool and retries gateways."""
+        config = SandboxConfig(temp_dir=temp_dir)
+        downloader = SecureDocumentDownloader(config)
+
+        adapter = downloader.session.get_adapter("https://example.com/test.pdf")
+        assert adapter is downloader.session.get_adapter("http://example.com/")
+        assert adapter._pool_maxsize == 64
+        assert adapter.max_retries.total == 2
+        assert 503 in adapter.max_retries.status_forcelist
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="No resource limits")
+    def test_unchanged_resource_limits_are_not_reset(self, temp_dir):
+        """Test that limits already in place are not set again."""
+        config = SandboxConfig(temp_dir=temp_dir)
+        limits = {}
+
+        with patch("resource.getrlimit", side_effect=limits.get):
+            with patch("resource.setrlimit", side_effect=limits.__setitem__) as mock:
+                SecureDocumentDownloader(config)
+                assert mock.call_count == 3
+
+                SecureDocumentDownloader(config)
+                assert mock.call_count == 3
+
+    def test_cleanup_temp_files(self, temp_dir):
+        """Test that cleanup removes leftover downloads and nothing else."""
+        download_dir = temp_dir / "downloads"
+        config = SandboxConfig(temp_dir=download_dir)
+        downloader = SecureDocumentDownloader(config)
+
+        removed = ["a.tmp", "b.pdf", "c.docx", "d.xlsm", "e.ppt", "f.odt"]
+        kept = ["notes.txt", "archive.zip", "pdf"]
+        for name in removed + kept:
+            (download_dir / name).write_bytes(b"x")
+        (download_dir / "subdir.pdf").mkdir()
+
+        downloader.cleanup_temp_files()
+
+        assert sorted(p.name for p in download_dir.iterdir()) == sorted(
+            kept + ["subdir.pdf"]
+        )
+
+    def test_allowed_domains(self, temp_dir):
+        """Test that allowed domains match the host and its subdomains."""
+        config = SandboxConfig(temp_dir=temp_dir, allowed_domains=["Example.com"])
+        downloader = SecureDocumentDownloader(config)
+
+        assert downloader.validate_url("https://example.com/a.pdf")
+        assert downloader.validate_url("https://docs.EXAMPLE.com:8443/a.pdf")
+        assert not downloader.validate_url("https://badexample.com/a.pdf")
+        assert not downloader.validate_url("https://example.com.evil.org/a.pdf")
+
+        # Changes to the config apply to later checks
+        config.allowed_domains = ["evil.org"]
+        assert not downloader.validate_url("https://example.com/a.pdf")
+        assert downloader.validate_url("https://example.com.evil.org/a.pdf")
@@ -77,43 +77,24 @@ class TestMacOSDangerzoneDetection:
     """Test Dangerzone CLI detection on macOS."""
 
     @pytest.mark.macos
-    def test_macos_app_bundle_detection(self):
+    def test_macos_app_bundle_detection(self, dangerzone_install):
         """Test macOS app bundle detection for Dangerzone."""
         # Test the detection logic without requiring actual installation
-        checked_paths = []
-
-        # Mock Path.exists to track what paths are checked
-        original_exists = Path.exists
-
-        def mock_exists(self, *, follow_symlinks=True):
-            path_str = str(self)
-            checked_paths.append(path_str)
-            # Simulate finding Dangerzone in Applications
-            return "Dangerzone.app" in path_str
+        probes = dangerzone_install("Darwin", lambda path: "Dangerzone.app" in path)
 
         with patch("defuse.cli.shutil.which", return_value=None):  # Not in PATH
-            # Replace the exists method on Path instances
-            Path.exists = mock_exists
-            try:
-                result = find_dangerzone_cli()
-
-                # Should have found it in Applications
-                assert result is not None
-                assert "Dangerzone.app" in str(result)
-
-                # Verify macOS paths were checked
-                app_bundle_paths = [p for p in checked_paths if "Dangerzone.app" in p]
-                homebrew_paths = [
-                    p for p in checked_paths if "homebrew" in p or "usr/local" in p
-                ]
-
-                assert len(app_bundle_paths) > 0, (
-                    f"Should check app bundle paths, but only checked: {checked_paths}"
-                )
-                # When app bundle is found first, it returns early (which is correct behavior)
-            finally:
-                # Restore original method
-                Path.exists = original_exists
+            result = find_dangerzone_cli()
+
+        # Should have found the system-wide bundle, the first location probed
+        assert result is not None
+        assert result.parts[-5:] == (
+            "Applications",
+            "Dangerzone.app",
+            "Contents",
+            "MacOS",
+            "dangerzone-cli",
+        )
+        assert probes == ["/Applications/Dangerzone.app/Contents/MacOS/dangerzone-cli"]
 
     @pytest.mark.macos
     def test_macos_homebrew_paths(self):
@@ -268,18 +249,13 @@ class TestMacOSErrorHandling:
         """Test handling of macOS permission errors."""
         downloader = SandboxedDownloader(macos_config)
 
-        with tempfile.TemporaryDirectory() as temp_dir:
-            output_path = Path(temp_dir) / "test.pdf"
-
-            # Mock permission error
-            with patch(
-                "tempfile.mkstemp",
-                side_effect=PermissionError("Operation not permitted"),
-            ):
-                with pytest.raises(PermissionError):
-                    downloader.create_download_script(
-                        "http://example.com/test.pdf", output_path
-                    )
+        # Mock permission error
+        with patch(
+            "tempfile.mkstemp",
+            side_effect=PermissionError("Operation not permitted"),
+        ):
+            with pytest.raises(PermissionError):
+                downloader.create_download_script()
 
     @pytest.mark.macos
     def test_macos_docker_errors(self, macos_config):
@@ -15,78 +15,35 @@ import pytest
 
 from defuse.config import SanitizerConfig
 from defuse.sanitizer import DocumentSanitizer, DocumentSanitizeError
-from defuse.cli import find_dangerzone_cli
+from defuse.cli import _dangerzone_cli_candidates, find_dangerzone_cli
 
 
 class TestCrossPlatformSanitizerDetection:
     """Test Dangerzone CLI detection across all platforms."""
 
-    def test_dangerzone_path_detection_logic(self):
-        """Test that Dangerzone detection checks appropriate paths for each platform."""
+    def test_dangerzone_path_detection_logic(self, dangerzone_install):
+        """Test that Dangerzone detection probes each platform's paths in order."""
+        system = platform.system()
+        probes = dangerzone_install(system)
         with patch("defuse.cli.shutil.which", return_value=None):  # Not in PATH
-            checked_paths = []
-            original_exists = Path.exists
-
-            def mock_exists(self, *, follow_symlinks=True):
-                checked_paths.append(str(self))
-                return False
-
-            Path.exists = mock_exists
-            try:
-                _ = find_dangerzone_cli()  # Just testing that it doesn't crash
-
-                # Should have checked platform-appropriate paths
-                calls = checked_paths
-
-                system = platform.system()
-                if system == "Linux":
-                    # Should check Linux paths
-                    linux_paths = [
-                        call
-                        for call in calls
-                        if any(
-                            path in call
-                            for path in [
-                                "/usr/bin",
-                                "/usr/local/bin",
-                                "/opt",
-                                "flatpak",
-                                "snap",
-                            ]
-                        )
-                    ]
-                    assert len(linux_paths) > 0, "Should check Linux-specific paths"
-
-                elif system == "Windows":
-                    # Should check Windows paths
-                    windows_paths = [
-                        call
-                        for call in calls
-                        if any(
-                            path in call
-                            for path in ["Program Files", "AppData", ".exe"]
-                        )
-                    ]
-                    assert len(windows_paths) > 0, "Should check Windows-specific paths"
-
-                elif system == "Darwin":
-                    # Should check macOS paths
-                    macos_paths = [
-                        call
-                        for call in calls
-                        if any(
-                            path in call
-                            for path in [
-                                "Applications",
-                                "Dangerzone.app",
-                                "homebrew",
-                                "usr/local",
-                            ]
-                        )
-                    ]
-                    assert len(macos_paths) > 0, "Should check macOS-specific paths"
-            finally:
-                Path.exists = original_exists
+            assert find_dangerzone_cli() is None
+
+        # Every location for the platform is probed once, in search order
+        assert probes == [str(path) for path in _dangerzone_cli_candidates(system)]
+
+        if system == "Linux":
+            assert probes[:2] == [
+                "/usr/bin/dangerzone-cli",
+                "/usr/local/bin/dangerzone-cli",
+            ]
+        elif system == "Windows":
+            assert Path(probes[0]) == Path(
+                "C:/Program Files/Dangerzone/dangerzone-cli.exe"
+            )
+        elif system == "Darwin":
+            assert Path(probes[0]) == Path(
+                "/Applications/Dangerzone.app/Contents/MacOS/dangerzone-cli"
+            )
 
     def test_dangerzone_cli_found_simulation(self):
         """Test behavior when Dangerzone CLI is found."""
@@ -96,67 +53,49 @@ class TestCrossPlatformSanitizerDetection:
             result = find_dangerzone_cli()
             assert result == mock_path
 
-    def test_dangerzone_cli_not_found(self):
+    def test_dangerzone_cli_not_found(self, dangerzone_install):
         """Test behavior when Dangerzone CLI is not found anywhere."""
+        probes = dangerzone_install(platform.system())
         with patch("defuse.cli.shutil.which", return_value=None):
-            with patch("defuse.cli.Path.exists", return_value=False):
-                result = find_dangerzone_cli()
-                assert result is None
+            result = find_dangerzone_cli()
+            assert result is None
+
+        assert len(probes) == len(_dangerzone_cli_candidates(platform.system()))
 
 
 @pytest.mark.linux
 class TestLinuxSanitizerIntegration:
     """Test sanitizer functionality specific to Linux."""
 
-    def test_linux_dangerzone_paths(self):
+    def test_linux_dangerzone_paths(self, dangerzone_install):
         """Test Linux-specific Dangerzone detection paths."""
-        expected_paths = [
+        home = Path.home()
+        probes = dangerzone_install("Linux")
+        with patch("defuse.cli.shutil.which", return_value=None):
+            assert find_dangerzone_cli() is None
+
+        assert probes == [
             "/usr/bin/dangerzone-cli",
             "/usr/local/bin/dangerzone-cli",
-            "/opt/dangerzone/dangerzone-cli",
-            "/snap/dangerzone/current/bin/dangerzone-cli",
+            "/bin/dangerzone-cli",
+            "/var/lib/flatpak/exports/bin/dangerzone-cli",
+            str(home / ".local/share/flatpak/exports/bin/dangerzone-cli"),
+            "/snap/bin/dangerzone-cli",
+            str(home / ".local/bin/dangerzone-cli"),
+            str(home / "bin/dangerzone-cli"),
         ]
 
-        with patch("platform.system", return_value="Linux"):
-            with patch("defuse.cli.shutil.which", return_value=None):
-                checked_paths = []
-                original_exists = Path.exists
+    def test_linux_dangerzone_search_stops_at_first_match(self, dangerzone_install):
+        """Test that Linux detection returns the first installed location."""
+        probes = dangerzone_install(
+            "Linux", lambda path: path.startswith(("/usr/local/", "/snap/"))
+        )
+        with patch("defuse.cli.shutil.which", return_value=None):
+            result = find_dangerzone_cli()
 
-                def mock_exists(self, *, follow_symlinks=True):
-                    checked_paths.append(str(self))
-                    return False
-
-                Path.exists = mock_exists
-                try:
-                    find_dangerzone_cli()
-
-                    # Verify Linux paths were checked
-                    calls = checked_paths
-
-                    # Update expected paths to match what the code actually checks
-                    # The code doesn't check /opt/dangerzone/dangerzone-cli
-                    actual_expected_paths = [
-                        "/usr/bin/dangerzone-cli",
-                        "/usr/local/bin/dangerzone-cli",
-                        "/bin/dangerzone-cli",
-                        "/snap/dangerzone/current/bin/dangerzone-cli",
-                        "/var/lib/flatpak/exports/bin/dangerzone-cli",
-                    ]
-
-                    for expected_path in actual_expected_paths:
-                        matching_calls = [
-                            call for call in calls if expected_path in call
-                        ]
-                        if expected_path in [
-                            "/usr/bin/dangerzone-cli",
-                            "/usr/local/bin/dangerzone-cli",
-                            "/bin/dangerzone-cli",
-                        ]:
-                            assert len(matching_calls) > 0, (
-                                f"Should check {expected_path}"
-                            )
-                finally:
-                    Path.exists = original_exists
+        assert result is not None
+        assert result.parts[-4:] == ("usr", "local", "bin", "dangerzone-cli")
+        assert probes == ["/usr/bin/dangerzone-cli", "/usr/local/bin/dangerzone-cli"]
 
     def test_linux_sanitizer_initialization(self, temp_dir):
         """Test sanitizer initialization on Linux."""
@@ -183,60 +122,31 @@ class TestLinuxSanitizerIntegration:
 class TestWindowsSanitizerIntegration:
     """Test sanitizer functionality specific to Windows."""
 
-    def test_windows_dangerzone_paths(self):
+    def test_windows_dangerzone_paths(self, dangerzone_install):
         """Test Windows-specific Dangerzone detection paths."""
-        expected_paths = [
-            "Program Files/Dangerzone/dangerzone-cli.exe",
-            "Program Files (x86)/Dangerzone/dangerzone-cli.exe",
-            "AppData/Local/Dangerzone/dangerzone-cli.exe",
-            "AppData/Roaming/Dangerzone/dangerzone-cli.exe",
-        ]
-
-        with patch("platform.system", return_value="Windows"):
-            with patch("defuse.cli.shutil.which", return_value=None):
-                checked_paths = []
-                original_exists = Path.exists
-
-                def mock_exists(self, *, follow_symlinks=True):
-                    checked_paths.append(str(self))
-                    return False
-
-                Path.exists = mock_exists
-                try:
-                    find_dangerzone_cli()
-
-                    # Verify Windows paths were checked
-                    calls = checked_paths
-                    for expected_path in expected_paths:
-                        matching_calls = [
-                            call for call in calls if expected_path in call
-                        ]
-                        assert len(matching_calls) > 0, (
-                            f"Should check path containing {expected_path}"
-                        )
-                finally:
-                    Path.exists = original_exists
-
-    def test_windows_exe_extension_handling(self):
-        """Test that Windows paths properly include .exe extension."""
-        with patch("platform.system", return_value="Windows"):
-            with patch("defuse.cli.shutil.which", return_value=None):
-                checked_paths = []
-                original_exists = Path.exists
+        home = Path.home()
+        probes = dangerzone_install("Windows")
+        with patch("defuse.cli.shutil.which", return_value=None):
+            assert find_dangerzone_cli() is None
 
-                def mock_exists(self, *, follow_symlinks=True):
-                    checked_paths.append(str(self))
-                    return False
+        assert [Path(probe) for probe in probes] == [
+            Path("C:/Program Files/Dangerzone/dangerzone-cli.exe"),
+            Path("C:/Program Files (x86)/Dangerzone/dangerzone-cli.exe"),
+            home / "AppData/Local/Dangerzone/dangerzone-cli.exe",
+            home / "AppData/Roaming/Dangerzone/dangerzone-cli.exe",
+        ]
 
-                Path.exists = mock_exists
-                try:
-                    find_dangerzone_cli()
+    def test_windows_exe_extension_handling(self, dangerzone_install):
+        """Test that Windows detection finds the .exe in a user install."""
+        probes = dangerzone_install("Windows", lambda path: "AppData/Roaming" in path)
+        with patch("defuse.cli.shutil.which", return_value=None):
+            result = find_dangerzone_cli()
 
-                    calls = checked_paths
-                    exe_calls = [call for call in calls if call.endswith(".exe")]
-                    assert len(exe_calls) > 0, "Should check .exe paths on Windows"
-                finally:
-                    Path.exists = original_exists
+        assert result is not None
+        assert result.name == "dangerzone-cli.exe"
+        assert "Roaming" in result.parts
+        assert len(probes) == 4
+        assert all(probe.endswith(".exe") for probe in probes)
 
     def test_windows_sanitizer_initialization(self, temp_dir):
         """Test sanitizer initialization on Windows."""
@@ -260,64 +170,32 @@ class TestWindowsSanitizerIntegration:
 class TestMacOSSanitizerIntegration:
     """Test sanitizer functionality specific to macOS."""
 
-    def test_macos_app_bundle_paths(self):
+    def test_macos_app_bundle_paths(self, dangerzone_install):
         """Test macOS app bundle detection paths."""
-        expected_paths = [
-            "/Applications/Dangerzone.app/Contents/MacOS/dangerzone-cli",
-            "~/Applications/Dangerzone.app/Contents/MacOS/dangerzone-cli",
-        ]
-
+        probes = dangerzone_install("Darwin")
         with patch("defuse.cli.shutil.which", return_value=None):
-            checked_paths = []
-            original_exists = Path.exists
+            assert find_dangerzone_cli() is None
 
-            def mock_exists(self, *, follow_symlinks=True):
-                checked_paths.append(str(self))
-                return False
-
-            Path.exists = mock_exists
-            try:
-                find_dangerzone_cli()
-
-                # Verify macOS app bundle paths were checked
-                calls = checked_paths
-                for expected_path in expected_paths:
-                    # Check for app bundle structure
-                    app_bundle_calls = [
-                        call
-                        for call in calls
-                        if "Dangerzone.app" in call and "Contents/MacOS" in call
-                    ]
-                    assert len(app_bundle_calls) > 0, "Should check app bundle paths"
-            finally:
-                Path.exists = original_exists
-
-    def test_macos_homebrew_paths(self):
-        """Test macOS Homebrew detection paths."""
-        expected_paths = [
-            "/opt/homebrew/bin/dangerzone-cli",  # Apple Silicon
-            "/usr/local/bin/dangerzone-cli",  # Intel
+        # App bundles are searched before any Homebrew location
+        assert probes[:2] == [
+            "/Applications/Dangerzone.app/Contents/MacOS/dangerzone-cli",
+            str(
+                Path.home()
+                / "Applications/Dangerzone.app/Contents/MacOS/dangerzone-cli"
+            ),
         ]
 
+    def test_macos_homebrew_paths(self, dangerzone_install):
+        """Test macOS Homebrew detection paths."""
+        probes = dangerzone_install("Darwin", lambda path: path.startswith("/opt/"))
         with patch("defuse.cli.shutil.which", return_value=None):
-            checked_paths = []
-            original_exists = Path.exists
+            result = find_dangerzone_cli()
 
-            def mock_exists(self, *, follow_symlinks=True):
-                checked_paths.append(str(self))
-                return False
-
-            Path.exists = mock_exists
-            try:
-                find_dangerzone_cli()
-
-                # Verify Homebrew paths were checked
-                calls = checked_paths
-                for expected_path in expected_paths:
-                    matching_calls = [call for call in calls if expected_path in call]
-                    assert len(matching_calls) > 0, f"Should check {expected_path}"
-            finally:
-                Path.exists = original_exists
+        assert result is not None
+        assert result.parts[-4:] == ("opt", "homebrew", "bin", "dangerzone-cli")
+        # Apple Silicon Homebrew is found before the Intel prefix is probed
+        assert probes[-1] == "/opt/homebrew/bin/dangerzone-cli"
+        assert "/usr/local/bin/dangerzone-cli" not in probes
 
     def test_macos_sanitizer_initialization(self, temp_dir):
         """Test sanitizer initialization on macOS."""
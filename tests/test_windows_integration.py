@@ -67,36 +67,23 @@ class TestWindowsDangerzoneDetection:
     """Test Dangerzone CLI detection on Windows."""
 
     @pytest.mark.windows
-    def test_windows_dangerzone_paths(self):
+    def test_windows_dangerzone_paths(self, dangerzone_install):
         """Test Windows-specific Dangerzone paths are checked."""
         # Test the detection logic without requiring actual installation
-        with patch("defuse.cli.shutil.which", return_value=None):  # Not in PATH
-            with patch("defuse.cli.Path.exists") as mock_exists:
-
-                def exists_side_effect():
-                    # Simulate finding Dangerzone in Program Files
-                    frame = mock_exists.call_args
-                    if frame and "Program Files" in str(frame[0][0]):
-                        return True
-                    return False
-
-                mock_exists.side_effect = exists_side_effect
+        probes = dangerzone_install("Windows")
 
-                result = find_dangerzone_cli()
-
-                # Should have checked Windows-specific paths
-                calls = [str(call[0][0]) for call in mock_exists.call_args_list]
+        with patch("defuse.cli.shutil.which", return_value=None):  # Not in PATH
+            result = find_dangerzone_cli()
 
-                # Verify Windows paths were checked
-                program_files_paths = [
-                    call for call in calls if "Program Files" in call
-                ]
-                appdata_paths = [call for call in calls if "AppData" in call]
-                exe_paths = [call for call in calls if call.endswith(".exe")]
+        assert result is None
 
-                assert len(program_files_paths) > 0, "Should check Program Files paths"
-                assert len(appdata_paths) > 0, "Should check AppData paths"
-                assert len(exe_paths) > 0, "Should check .exe extensions"
+        # Program Files installs are probed before per-user AppData ones
+        assert [Path(probe).parts[-3:] for probe in probes] == [
+            ("Program Files", "Dangerzone", "dangerzone-cli.exe"),
+            ("Program Files (x86)", "Dangerzone", "dangerzone-cli.exe"),
+            ("Local", "Dangerzone", "dangerzone-cli.exe"),
+            ("Roaming", "Dangerzone", "dangerzone-cli.exe"),
+        ]
 
     @pytest.mark.windows
     def test_windows_path_handling(self):
@@ -220,17 +207,10 @@ class TestWindowsErrorHandling:
         """Test handling of Windows permission errors."""
         downloader = SandboxedDownloader(windows_config)
 
-        with tempfile.TemporaryDirectory() as temp_dir:
-            output_path = Path(temp_dir) / "test.pdf"
-
-            # Mock permission error
-            with patch(
-                "tempfile.mkstemp", side_effect=PermissionError("Access denied")
-            ):
-                with pytest.raises(PermissionError):
-                    downloader.create_download_script(
-                        "http://example.com/test.pdf", output_path
-                    )
+        # Mock permission error
+        with patch("tempfile.mkstemp", side_effect=PermissionError("Access denied")):
+            with pytest.raises(PermissionError):
+                downloader.create_download_script()
 
 
 class TestWindowsConfiguration:
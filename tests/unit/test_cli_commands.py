@@ -5,11 +5,21 @@ These tests focus on CLI argument validation, error paths, and command behavior
 without requiring external dependencies like Docker or Dangerzone.
 """
 
+import json
+import subprocess
+import sys
+
 from click.testing import CliRunner
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 from pathlib import Path
 
-from defuse.cli import main
+from defuse import cli
+from defuse.cli import (
+    main,
+    check_container_runtime,
+    load_user_config,
+    save_user_config,
+)
 
 
 class TestCLIBasics:
@@ -62,8 +72,8 @@ class TestCLIErrorHandling:
         with patch("defuse.cli.find_dangerzone_cli") as mock_find_dz:
             mock_find_dz.return_value = Path("/usr/bin/dangerzone-cli")
 
-            with patch("defuse.cli.check_container_runtime") as mock_runtime:
-                mock_runtime.return_value = ("docker", "/usr/bin/docker", "20.10.0")
+            with patch("defuse.cli.find_container_runtime") as mock_runtime:
+                mock_runtime.return_value = ("docker", "/usr/bin/docker")
 
                 result = runner.invoke(main, ["download", "ftp://invalid.com/file.pdf"])
 
@@ -164,6 +174,19 @@ class TestDangerzoneDetection:
                 assert result.exit_code == 1
                 assert "Dangerzone CLI not found" in result.output
 
+    def test_env_var_path_is_used_only_when_present(self, temp_dir, monkeypatch):
+        """Test DANGERZONE_CLI_PATH is honoured only if the file exists."""
+        monkeypatch.setattr(cli, "_DANGERZONE_CLI_CANDIDATES", [])
+        cli_path = temp_dir / "dangerzone-cli"
+        monkeypatch.setenv("DANGERZONE_CLI_PATH", str(cli_path))
+
+        with patch("defuse.cli.shutil.which", return_value=None):
+            assert cli.find_dangerzone_cli() is None
+
+            cli_path.touch()
+            cli.find_dangerzone_cli.cache_clear()
+            assert cli.find_dangerzone_cli() == cli_path
+
 
 class TestContainerRuntimeDetection:
     """Test container runtime detection error paths."""
@@ -175,8 +198,8 @@ class TestContainerRuntimeDetection:
         with patch("defuse.cli.find_dangerzone_cli") as mock_find_dz:
             mock_find_dz.return_value = Path("/usr/bin/dangerzone-cli")
 
-            with patch("defuse.cli.check_container_runtime") as mock_runtime:
-                mock_runtime.return_value = (None, None, None)
+            with patch("defuse.cli.find_container_runtime") as mock_runtime:
+                mock_runtime.return_value = (None, None)
 
                 result = runner.invoke(
                     main, ["download", "http://example.com/test.pdf"]
@@ -193,8 +216,8 @@ class TestContainerRuntimeDetection:
         with patch("defuse.cli.find_dangerzone_cli") as mock_find_dz:
             mock_find_dz.return_value = Path("/usr/bin/dangerzone-cli")
 
-            with patch("defuse.cli.check_container_runtime") as mock_runtime:
-                mock_runtime.return_value = (None, None, None)
+            with patch("defuse.cli.find_container_runtime") as mock_runtime:
+                mock_runtime.return_value = (None, None)
 
                 with runner.isolated_filesystem():
                     urls_file = Path("urls.txt")
@@ -205,6 +228,44 @@ class TestContainerRuntimeDetection:
                     assert result.exit_code == 1
                     assert "Container runtime not available" in result.output
 
+    def test_container_runtime_probe_is_cached(self):
+        """Test that the runtime is only probed once per process."""
+        with patch("defuse.cli.shutil.which", return_value="/usr/bin/docker"):
+            with patch("defuse.cli.subprocess.run") as mock_run:
+                mock_run.return_value = MagicMock(returncode=0, stdout="24.0.7\n")
+
+                first = check_container_runtime()
+                second = check_container_runtime()
+
+                assert first == ("Docker", "/usr/bin/docker", "24.0.7")
+                assert second == first
+                assert mock_run.call_count == 1
+
+    def test_find_container_runtime_uses_daemon_socket(self, temp_dir, monkeypatch):
+        """Test that a present daemon socket avoids spawning the runtime."""
+        socket_path = temp_dir / "docker.sock"
+        socket_path.touch()
+        monkeypatch.setenv("DOCKER_HOST", f"unix://{socket_path}")
+
+        with patch("defuse.cli.shutil.which", return_value="/usr/bin/docker"):
+            with patch("defuse.cli.subprocess.run") as mock_run:
+                assert cli.find_container_runtime() == ("Docker", "/usr/bin/docker")
+                mock_run.assert_not_called()
+
+    def test_find_container_runtime_falls_back_to_version_probe(self, monkeypatch):
+        """Test that without a socket the runtime is asked for its version."""
+        monkeypatch.setattr(cli, "_runtime_sockets", lambda executable: [])
+
+        def which_side_effect(cmd):
+            return "/usr/bin/podman" if cmd == "podman" else None
+
+        with patch("defuse.cli.shutil.which", side_effect=which_side_effect):
+            with patch("defuse.cli.subprocess.run") as mock_run:
+                mock_run.return_value = MagicMock(returncode=0, stdout="4.9.3\n")
+
+                assert cli.find_container_runtime() == ("Podman", "/usr/bin/podman")
+                mock_run.assert_called_once()
+
 
 class TestConfigCommand:
     """Test config command edge cases."""
@@ -241,9 +302,127 @@ class TestConfigCommand:
         assert result.exit_code in [0, 1, 2]  # Allow success, failure, or invalid arg
 
 
+class TestStartupImports:
+    """Test that importing the CLI leaves per-command dependencies unloaded."""
+
+    def test_cli_import_defers_command_dependencies(self):
+        """Test heavy modules are only imported by the commands using them."""
+        deferred = [
+            "yaml",
+            "tqdm",
+            "requests",
+            "concurrent.futures",
+            "defuse.downloader",
+            "defuse.sandbox",
+            "defuse.sanitizer",
+        ]
+        code = (
+            "import sys, defuse.cli; "
+            f"print([m for m in {deferred!r} if m in sys.modules])"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+
+        assert result.stdout.strip() == "[]"
+
+
+class TestUserConfigCache:
+    """Test caching of the parsed user config file."""
+
+    def test_cached_config_is_not_shared(self, temp_dir):
+        """Test that mutating a loaded config does not leak into later loads."""
+        config = load_user_config()
+        config.sanitizer.output_dir = temp_dir / "saved"
+        config.sandbox.allowed_domains = ["example.com"]
+        save_user_config(config)
+
+        first = load_user_config()
+        first.sanitizer.output_dir = temp_dir / "mutated"
+        first.sandbox.allowed_domains.append("evil.example")
+
+        second = load_user_config()
+        assert second.sanitizer.output_dir == temp_dir / "saved"
+        assert second.sandbox.allowed_domains == ["example.com"]
+
+    def test_modified_config_file_is_reloaded(self, temp_dir):
+        """Test that edits to the config file invalidate the cache."""
+        config_file = cli.get_config_dir() / "config.json"
+        config_file.write_text(json.dumps({"output_dir": str(temp_dir / "a")}))
+        assert load_user_config().sanitizer.output_dir == temp_dir / "a"
+
+        config_file.write_text(json.dumps({"output_dir": str(temp_dir / "longer")}))
+        assert load_user_config().sanitizer.output_dir == temp_dir / "longer"
+
+    def test_config_is_saved_as_json(self, temp_dir):
+        """Test that the config is written as JSON and read back without YAML."""
+        config = load_user_config()
+        config.sanitizer.output_dir = temp_dir / "saved"
+        save_user_config(config)
+
+        config_file = cli.get_config_dir() / "config.json"
+        saved = json.loads(config_file.read_text())
+        assert saved["output_dir"] == str(temp_dir / "saved")
+
+        with patch("yaml.load") as mock_yaml_load:
+            assert load_user_config().sanitizer.output_dir == temp_dir / "saved"
+            mock_yaml_load.assert_not_called()
+
+    def test_legacy_yaml_config_is_read(self, temp_dir):
+        """Test that a config.yaml from older versions is still honoured."""
+        config_dir = cli.get_config_dir()
+        (config_dir / "config.yaml").write_text(f"output_dir: {temp_dir / 'old'}\n")
+
+        assert load_user_config().sanitizer.output_dir == temp_dir / "old"
+
+        # Once saved, the JSON file takes precedence over the legacy one
+        config = load_user_config()
+        config.sanitizer.output_dir = temp_dir / "new"
+        save_user_config(config)
+
+        assert load_user_config().sanitizer.output_dir == temp_dir / "new"
+
+
 class TestBatchCommandEdgeCases:
     """Test batch command edge cases and error handling."""
 
+    def test_iter_urls_skips_blank_and_comment_lines(self):
+        """Test URL parsing strips lines and skips blanks and comments."""
+        lines = ["\n", "  # indented comment\n", " http://example.com/a.pdf \n", "#x\n"]
+        assert list(cli._iter_urls(lines)) == ["http://example.com/a.pdf"]
+
+    def test_batch_output_filename_from_url(self):
+        """Test output filenames are derived from the URL's last path segment."""
+        assert (
+            cli._batch_output_filename("https://example.com/docs/report.v2.pdf?x=1")
+            == "report.v2_defused.pdf"
+        )
+        assert cli._batch_output_filename("https://example.com/docs/memo/") == (
+            "memo_defused.pdf"
+        )
+        assert cli._batch_output_filename("https://example.com") == (
+            "document_defused.pdf"
+        )
+
+    def test_batch_output_filename_unique_within_batch(self):
+        """Test URLs sharing a basename get distinct output filenames."""
+        used_names = set()
+        names = [
+            cli._batch_output_filename(url, used_names)
+            for url in [
+                "https://a.com/x/report.pdf",
+                "https://b.com/y/report.pdf",
+                "https://c.com/report_2.pdf",
+                "https://d.com/z/report.docx",
+            ]
+        ]
+        assert names == [
+            "report_defused.pdf",
+            "report_2_defused.pdf",
+            "report_2_2_defused.pdf",
+            "report_3_defused.pdf",
+        ]
+
     def test_batch_empty_urls_file(self):
         """Test batch command with empty URLs file."""
         runner = CliRunner()
@@ -251,11 +430,10 @@ class TestBatchCommandEdgeCases:
         with patch("defuse.cli.find_dangerzone_cli") as mock_find_dz:
             mock_find_dz.return_value = Path("/usr/bin/dangerzone-cli")
 
-            with patch("defuse.cli.check_container_runtime") as mock_check_runtime:
+            with patch("defuse.cli.find_container_runtime") as mock_check_runtime:
                 mock_check_runtime.return_value = (
                     "docker",
                     "/usr/bin/docker",
-                    "20.10.0",
                 )
 
                 with patch("defuse.sandbox.SandboxCapabilities") as mock_capabilities:
@@ -284,11 +462,10 @@ class TestBatchCommandEdgeCases:
         with patch("defuse.cli.find_dangerzone_cli") as mock_find_dz:
             mock_find_dz.return_value = Path("/usr/bin/dangerzone-cli")
 
-            with patch("defuse.cli.check_container_runtime") as mock_check_runtime:
+            with patch("defuse.cli.find_container_runtime") as mock_check_runtime:
                 mock_check_runtime.return_value = (
                     "docker",
                     "/usr/bin/docker",
-                    "20.10.0",
                 )
 
                 with patch("defuse.sandbox.SandboxCapabilities") as mock_capabilities:
@@ -319,8 +496,8 @@ class TestBatchCommandEdgeCases:
         with patch("defuse.cli.find_dangerzone_cli") as mock_find_dz:
             mock_find_dz.return_value = Path("/usr/bin/dangerzone-cli")
 
-            with patch("defuse.cli.check_container_runtime") as mock_runtime:
-                mock_runtime.return_value = ("docker", "/usr/bin/docker", "20.10.0")
+            with patch("defuse.cli.find_container_runtime") as mock_runtime:
+                mock_runtime.return_value = ("docker", "/usr/bin/docker")
 
                 with runner.isolated_filesystem():
                     mixed_file = Path("mixed.txt")
@@ -336,3 +513,103 @@ class TestBatchCommandEdgeCases:
                             # Should process the URLs and ignore comments
                             # Exact behavior depends on mocking, but shouldn't crash
                             assert result.exit_code in [0, 1]  # Allow various outcomes
+
+    def test_batch_parallel_jobs_report_all_results(self, temp_dir):
+        """Test batch with several jobs processes every URL and counts failures."""
+        runner = CliRunner()
+
+        def fake_download(url):
+            if "bad" in url:
+                return None
+            path = temp_dir / f"{abs(hash(url))}.tmp"
+            path.write_bytes(b"%PDF-1.7\n%%EOF")
+            return path
+
+        with patch("defuse.cli.find_dangerzone_cli") as mock_find_dz:
+            mock_find_dz.return_value = Path("/usr/bin/dangerzone-cli")
+
+            with patch("defuse.cli.find_container_runtime") as mock_runtime:
+                mock_runtime.return_value = ("docker", "/usr/bin/docker")
+
+                with patch("defuse.sandbox.SandboxedDownloader") as mock_downloader:
+                    mock_downloader.return_value.sandboxed_download.side_effect = (
+                        fake_download
+                    )
+                    with patch("defuse.sanitizer.DocumentSanitizer") as mock_sanitizer:
+                        with runner.isolated_filesystem():
+                            urls_file = Path("urls.txt")
+                            urls_file.write_text(
+                                "".join(
+                                    f"http://{host}/{name}\n"
+                                    for host, name in [
+                                        ("example.com", "a"),
+                                        ("example.com", "bad1"),
+                                        ("example.com", "b"),
+                                        ("other.com", "a"),
+                                        ("example.com", "bad2"),
+                                        ("example.com", "d"),
+                                    ]
+                                )
+                            )
+
+                            result = runner.invoke(
+                                main, ["batch", str(urls_file), "--jobs", "3"]
+                            )
+
+                            assert result.exit_code == 0
+                            assert "Successfully processed 4/6" in result.output
+                            sanitize = mock_sanitizer.return_value.sanitize
+                            assert sanitize.call_count == 4
+                            # Both "a" URLs get their own output file
+                            output_names = sorted(
+                                call.args[1] for call in sanitize.call_args_list
+                            )
+                            assert output_names == [
+                                "a_2_defused.pdf",
+                                "a_defused.pdf",
+                                "b_defused.pdf",
+                                "d_defused.pdf",
+                            ]
+
+
+class TestDownloaderCleanup:
+    """Test that commands close the sandboxed downloader they create."""
+
+    def test_download_closes_downloader(self, temp_dir):
+        """Test that download removes the sandbox script once it's done."""
+        runner = CliRunner()
+        downloaded = temp_dir / "document.tmp"
+        downloaded.write_bytes(b"%PDF-1.7\n%%EOF")
+
+        with patch("defuse.cli.find_dangerzone_cli") as mock_find_dz:
+            mock_find_dz.return_value = Path("/usr/bin/dangerzone-cli")
+
+            with patch("defuse.cli.find_container_runtime") as mock_runtime:
+                mock_runtime.return_value = ("docker", "/usr/bin/docker")
+
+                with patch("defuse.sandbox.SandboxedDownloader") as mock_downloader:
+                    downloader = mock_downloader.return_value
+                    downloader.__enter__.return_value = downloader
+                    downloader.sandboxed_download.return_value = downloaded
+
+                    with patch("defuse.sanitizer.DocumentSanitizer"):
+                        result = runner.invoke(
+                            main, ["download", "http://example.com/test.pdf"]
+                        )
+
+                    assert result.exit_code == 0
+                    downloader.sandboxed_download.assert_called_once()
+                    downloader.__exit__.assert_called_once()
+
+    def test_security_report_closes_downloader(self):
+        """Test that security-report doesn't leave the downloader open."""
+        runner = CliRunner()
+
+        with patch("defuse.sandbox.SandboxedDownloader") as mock_downloader:
+            downloader = mock_downloader.return_value
+            downloader.__enter__.return_value = downloader
+
+            runner.invoke(main, ["security-report"])
+
+            downloader.get_security_report.assert_called_once()
+            downloader.__exit__.assert_called_once()
@@ -3,6 +3,7 @@ Unit tests for configuration management.
 """
 
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 import yaml
@@ -124,14 +125,22 @@ class TestConfig:
         assert config.verbose is False
         assert config.dangerzone_path is None
 
-    def test_config_directory_creation(self, temp_dir: Path):
-        """Test that config creates necessary directories."""
-        # Use the default config which creates directories
+    def test_config_does_not_create_directories(self, temp_dir: Path):
+        """Test that building a config leaves the filesystem untouched."""
+        with patch("pathlib.Path.mkdir") as mock_mkdir:
+            get_default_config()
+
+        mock_mkdir.assert_not_called()
+
+    def test_downloader_creates_temp_dir(self, temp_dir: Path):
+        """Test that the temp directory is created once a downloader is used."""
+        from defuse.downloader import SecureDocumentDownloader
+
         config = get_default_config()
+        config.sandbox.temp_dir = temp_dir / "sandbox"
 
-        # Verify that default directories are created
-        assert config.sandbox.temp_dir.exists()
-        assert config.sanitizer.output_dir.exists()
+        SecureDocumentDownloader(config.sandbox)
+        assert config.sandbox.temp_dir.is_dir()
 
     def test_config_with_dangerzone_path(self, temp_dir: Path):
         """Test config with dangerzone_path set."""
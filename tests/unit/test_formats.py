@@ -3,7 +3,9 @@ Unit tests for file format detection functionality.
 """
 
 import io
-from typing import Dict
+import struct
+import zipfile
+from typing import Dict, Mapping
 
 import pytest
 
@@ -13,6 +15,7 @@ from defuse.formats import (
     FormatInfo,
     create_file_detector,
     is_supported_format,
+    normalize_mime_type,
 )
 
 
@@ -86,14 +89,27 @@ class TestFileTypeDetector:
         """Test detector initializes properly."""
         detector = FileTypeDetector()
 
-        assert isinstance(detector.format_registry, dict)
-        assert isinstance(detector.magic_to_format, dict)
-        assert isinstance(detector.mime_to_format, dict)
-        assert isinstance(detector.ext_to_format, dict)
+        assert isinstance(detector.format_registry, Mapping)
+        assert isinstance(detector.magic_to_format, Mapping)
+        assert isinstance(detector.mime_to_format, Mapping)
+        assert isinstance(detector.ext_to_format, Mapping)
 
         # Should have entries for all supported formats
         assert len(detector.format_registry) == len(SupportedFormat)
 
+    def test_detectors_share_format_tables(self):
+        """Test that the registry and indexes are built once and shared."""
+        first = FileTypeDetector()
+        second = FileTypeDetector()
+
+        assert second.format_registry is first.format_registry
+        assert second.magic_to_format is first.magic_to_format
+        assert second.ext_to_format is first.ext_to_format
+
+        # Shared tables are read-only
+        with pytest.raises(TypeError):
+            first.mime_to_format["application/x-new"] = (SupportedFormat.PDF,)
+
     def test_magic_byte_detection_pdf(self, sample_pdf_data: bytes):
         """Test magic byte detection for PDF."""
         detector = FileTypeDetector()
@@ -132,6 +148,14 @@ class TestFileTypeDetector:
         detected = detector.detect_from_header(buffer)
         assert detected is None
 
+    def test_every_magic_signature_is_detected(self):
+        """Test that each registered signature maps back to one of its formats."""
+        detector = FileTypeDetector()
+
+        for magic, formats in detector.magic_to_format.items():
+            detected = detector.detect_from_header(io.BytesIO(magic + b"\x00" * 16))
+            assert detected in formats, magic
+
     def test_magic_byte_detection_empty_buffer(self):
         """Test magic byte detection with empty buffer."""
         detector = FileTypeDetector()
@@ -155,6 +179,21 @@ class TestFileTypeDetector:
         unknown_formats = detector.detect_from_mime_type("application/unknown")
         assert len(unknown_formats) == 0
 
+    def test_content_type_parameters_are_ignored(self):
+        """Test that Content-Type values are normalized before lookup."""
+        detector = FileTypeDetector()
+
+        assert normalize_mime_type(" Application/PDF; charset=binary") == (
+            "application/pdf"
+        )
+        assert "application/pdf" in detector.supported_mime_types
+
+        detected, confidence = detector.detect_format(
+            mime_type="Application/PDF; charset=binary"
+        )
+        assert detected == SupportedFormat.PDF
+        assert confidence == 0.7
+
     def test_extension_detection(self):
         """Test file extension detection."""
         detector = FileTypeDetector()
@@ -336,6 +375,130 @@ class TestFileTypeDetector:
             SupportedFormat.PPT,
         ]
 
+    @pytest.mark.parametrize(
+        "members, expected",
+        [
+            ({"word/document.xml": "<w/>"}, SupportedFormat.DOCX),
+            ({"xl/workbook.xml": "<x/>"}, SupportedFormat.XLSX),
+            ({"ppt/presentation.xml": "<p/>"}, SupportedFormat.PPTX),
+            (
+                {"mimetype": "application/vnd.oasis.opendocument.spreadsheet"},
+                SupportedFormat.ODS,
+            ),
+            ({"mimetype": "application/epub+zip"}, SupportedFormat.EPUB),
+        ],
+    )
+    def test_zip_container_contents_identify_format(self, members, expected):
+        """Test that ZIP-based formats are told apart by their members."""
+        detector = FileTypeDetector()
+
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            for name, content in members.items():
+                archive.writestr(name, content)
+
+        assert detector.detect_from_header(buffer) == expected
+
+    def test_zip_encrypted_member_falls_back(self):
+        """Test that an encrypted mimetype member doesn't escape detection."""
+        detector = FileTypeDetector()
+
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            archive.writestr("mimetype", "application/epub+zip")
+
+        # Set the "encrypted" flag in both the local and central headers
+        data = bytearray(buffer.getvalue())
+        data[6] |= 0x1
+        data[data.index(b"PK\x01\x02") + 8] |= 0x1
+
+        buffer = io.BytesIO(bytes(data))
+        assert detector.detect_from_header(buffer) == SupportedFormat.DOCX
+        assert is_supported_format(buffer)
+
+    def test_zip_corrupt_deflate_member_falls_back(self):
+        """Test that a corrupt deflate stream doesn't escape detection."""
+        detector = FileTypeDetector()
+
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("mimetype", "application/epub+zip")
+
+        # Overwrite the start of the compressed data with an invalid block
+        data = bytearray(buffer.getvalue())
+        start = 30 + len("mimetype")
+        data[start : start + 4] = b"\xff\xff\xff\xff"
+
+        buffer = io.BytesIO(bytes(data))
+        assert detector.detect_from_header(buffer) == SupportedFormat.DOCX
+        assert is_supported_format(buffer)
+
+    @pytest.mark.parametrize(
+        "stream, expected",
+        [
+            ("WordDocument", SupportedFormat.DOC),
+            ("Workbook", SupportedFormat.XLS),
+            ("PowerPoint Document", SupportedFormat.PPT),
+        ],
+    )
+    def test_ole_directory_identifies_format(self, stream, expected):
+        """Test that OLE-based formats are told apart by their stream names."""
+        detector = FileTypeDetector()
+
+        def directory_entry(name: str) -> bytes:
+            encoded = (name + "\x00").encode("utf-16-le")
+            entry = encoded.ljust(64, b"\x00") + struct.pack("<H", len(encoded))
+            return entry.ljust(128, b"\x00")
+
+        header = bytearray(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1".ljust(512, b"\x00"))
+        struct.pack_into("<H", header, 30, 9)  # 512-byte sectors
+        struct.pack_into("<II", header, 44, 1, 1)  # One FAT sector, directory at 1
+        struct.pack_into("<109I", header, 76, 0, *[0xFFFFFFFF] * 108)
+
+        fat = struct.pack("<128I", 0xFFFFFFFD, 0xFFFFFFFE, *[0xFFFFFFFF] * 126)
+        directory = (directory_entry("Root Entry") + directory_entry(stream)).ljust(
+            512, b"\x00"
+        )
+
+        buffer = io.BytesIO(bytes(header) + fat + directory)
+        assert detector.detect_from_header(buffer) == expected
+
+    @pytest.mark.parametrize("sector_shift", [0, 8, 64, 0xFFFF])
+    def test_ole_invalid_sector_shift_falls_back(self, sector_shift):
+        """Test that a hostile OLE sector shift is rejected, not evaluated."""
+        detector = FileTypeDetector()
+
+        header = bytearray(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1".ljust(512, b"\x00"))
+        struct.pack_into("<H", header, 30, sector_shift)
+        struct.pack_into("<II", header, 44, 1, 1)
+
+        buffer = io.BytesIO(bytes(header) + b"\x00" * 1024)
+        assert detector.detect_from_header(buffer) == SupportedFormat.DOC
+        assert detector.is_supported(buffer=buffer)
+
+    def test_ole_directory_chain_loop_terminates(self):
+        """Test that a directory chain pointing back at itself is walked once."""
+        detector = FileTypeDetector()
+
+        header = bytearray(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1".ljust(512, b"\x00"))
+        struct.pack_into("<H", header, 30, 9)
+        struct.pack_into("<II", header, 44, 1, 1)
+        struct.pack_into("<109I", header, 76, 0, *[0xFFFFFFFF] * 108)
+
+        # Directory sector 1 chains to itself
+        fat = struct.pack("<128I", 0xFFFFFFFD, 1, *[0xFFFFFFFF] * 126)
+
+        class CountingBuffer(io.BytesIO):
+            reads = 0
+
+            def read(self, size=-1):
+                self.reads += 1
+                return super().read(size)
+
+        buffer = CountingBuffer(bytes(header) + fat + b"\x00" * 512)
+        assert detector.detect_from_header(buffer) == SupportedFormat.DOC
+        assert buffer.reads < 10
+
 
 @pytest.mark.unit
 class TestModuleFunctions:
@@ -2,9 +2,12 @@
 Unit tests for sandbox capabilities and backend management.
 """
 
+import gc
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 import subprocess
+import sys
+import threading
 
 import pytest
 
@@ -16,6 +19,7 @@ from defuse.sandbox import (
     SandboxedDownloader,
     get_sandbox_capabilities,
     create_sandboxed_downloader,
+    find_executable,
 )
 
 
@@ -178,6 +182,16 @@ class TestSandboxCapabilities:
         assert caps.available_backends[SandboxBackend.FIREJAIL] is True
         assert caps.available_backends[SandboxBackend.BUBBLEWRAP] is True
 
+    @patch("shutil.which")
+    def test_executable_lookups_are_cached(self, mock_which):
+        """Test that each executable is looked up on PATH only once."""
+        mock_which.return_value = "/usr/bin/docker"
+
+        assert find_executable("docker") == "/usr/bin/docker"
+        assert find_executable("docker") == "/usr/bin/docker"
+
+        mock_which.assert_called_once_with("docker")
+
     @patch("platform.system")
     @patch("shutil.which")
     @patch("subprocess.run")
@@ -204,6 +218,43 @@ class TestSandboxCapabilities:
         assert caps.available_backends[SandboxBackend.BUBBLEWRAP] is False
         assert caps.available_backends[SandboxBackend.DOCKER] is True
 
+    @patch("shutil.which")
+    @patch("subprocess.run")
+    def test_runtime_probe_asks_for_server_version(self, mock_run, mock_which):
+        """Test that runtimes are probed with `version`, not the slower `info`."""
+        mock_which.side_effect = lambda cmd: f"/usr/bin/{cmd}"
+        mock_run.side_effect = lambda args, **kwargs: subprocess.CompletedProcess(
+            args, 0, stdout="27.1.1\n" if "docker" in args[0] else "\n"
+        )
+
+        caps = SandboxCapabilities()
+
+        assert caps.available_backends[SandboxBackend.DOCKER] is True
+        assert caps.available_backends[SandboxBackend.PODMAN] is False
+        mock_run.assert_any_call(
+            ["/usr/bin/docker", "version", "--format", "{{.Server.Version}}"],
+            capture_output=True,
+            text=True,
+            timeout=5,
+        )
+
+    def test_runtime_probes_run_concurrently(self):
+        """Test that the Docker and Podman probes wait on their daemons together."""
+        # Each probe blocks until the other has started, so a serial
+        # detection would break the barrier instead of returning
+        barrier = threading.Barrier(2, timeout=5)
+
+        def probe(self):
+            barrier.wait()
+            return True
+
+        with patch.object(SandboxCapabilities, "_check_docker_available", probe):
+            with patch.object(SandboxCapabilities, "_check_podman_available", probe):
+                caps = SandboxCapabilities()
+
+        assert caps.available_backends[SandboxBackend.DOCKER] is True
+        assert caps.available_backends[SandboxBackend.PODMAN] is True
+
     def test_auto_backend_always_available(self):
         """Test that AUTO backend is always available."""
         with patch(
@@ -301,6 +352,9 @@ class TestSandboxCapabilities:
         mock_result.returncode = 0
         mock_run.return_value = mock_result
 
+        # PATH lookups are cached per process, so forget the first system's
+        find_executable.cache_clear()
+
         caps = SandboxCapabilities()
         assert caps.get_max_isolation_level() == IsolationLevel.STRICT
 
@@ -347,26 +401,54 @@ class TestSandboxedDownloader:
     def test_create_download_script(
         self, config_fixture: Config, temp_dir: Path, mock_sandbox_capabilities
     ):
-        """Test download script creation."""
+        """Test that the download script file is written once and reused."""
         config_fixture.sandbox.temp_dir = temp_dir
 
         downloader = SandboxedDownloader(config_fixture)
 
-        test_url = "https://example.com/test.pdf"
-        output_path = temp_dir / "output.pdf"
-
-        script_path = downloader.create_download_script(test_url, output_path)
+        script_path = downloader.create_download_script()
 
         assert script_path.exists()
         assert script_path.suffix == ".py"
+        assert "sys.argv" in script_path.read_text()
+        assert downloader.create_download_script() == script_path
+
+        downloader.close()
+        assert not script_path.exists()
+
+    @patch("subprocess.run")
+    def test_bubblewrap_passes_url_and_limits_outside_script(
+        self,
+        mock_run,
+        config_fixture: Config,
+        temp_dir: Path,
+        mock_sandbox_capabilities,
+    ):
+        """Test that bwrap passes the URL as an argument and limits with --setenv."""
+        config_fixture.sandbox.temp_dir = temp_dir
+        config_fixture.sandbox.user_agent = "Agent'); import os; ('"
+        downloader = SandboxedDownloader(config_fixture)
+        output_path = temp_dir / "output.pdf"
+        url = 'https://example.com/a.pdf"); import os; ("'
 
-        script_content = script_path.read_text()
-        assert test_url in script_content
-        assert str(output_path) in script_content
-        assert "download_document" in script_content
+        mock_run.return_value = subprocess.CompletedProcess([], 0, stdout="")
+        output_path.write_bytes(b"PDF content")
+        with downloader:
+            assert downloader.run_bubblewrap_download(url, output_path)
 
-        # Clean up
-        script_path.unlink()
+            script = downloader.create_download_script().read_text()
+            assert url not in script
+            assert config_fixture.sandbox.user_agent not in script
+
+        args = mock_run.call_args[0][0]
+        assert args[-2:] == [url, "/output/output.pdf"]
+        assert config_fixture.sandbox.user_agent in args
+        idx = args.index("DEFUSE_MAX_MEMORY_MB")
+        assert args[idx - 1 : idx + 2] == [
+            "--setenv",
+            "DEFUSE_MAX_MEMORY_MB",
+            str(config_fixture.sandbox.max_memory_mb),
+        ]
 
     @patch("subprocess.run")
     def test_docker_download_success(
@@ -429,6 +511,265 @@ class TestSandboxedDownloader:
         )
         assert result is False
 
+    @patch("subprocess.run")
+    def test_docker_download_reuses_container(
+        self,
+        mock_run,
+        config_fixture: Config,
+        temp_dir: Path,
+        mock_sandbox_capabilities,
+    ):
+        """Test that reuse starts one container and execs each download in it."""
+        config_fixture.sandbox.temp_dir = temp_dir
+        config_fixture.sandbox.reuse_container = True
+        mock_run.return_value = subprocess.CompletedProcess([], 0, stdout="abc123\n")
+
+        with SandboxedDownloader(config_fixture) as downloader:
+            for name in ("a.pdf", "b.pdf"):
+                output_path = temp_dir / name
+                output_path.write_bytes(b"PDF content")
+                assert downloader.run_docker_download(
+                    f"https://example.com/{name}", output_path
+                )
+
+        commands = [call.args[0] for call in mock_run.call_args_list]
+        assert [cmd[:3] for cmd in commands] == [
+            ["docker", "run", "--detach"],
+            ["docker", "exec", "abc123"],
+            ["docker", "exec", "abc123"],
+            ["docker", "kill", "abc123"],
+        ]
+        assert "--read-only" in commands[0]
+        assert "defuse.warm-container" in commands[0]
+
+    @patch("subprocess.run")
+    def test_unclosed_downloader_kills_warm_containers(
+        self,
+        mock_run,
+        config_fixture: Config,
+        temp_dir: Path,
+        mock_sandbox_capabilities,
+    ):
+        """Test that warm containers are killed even if close() is never called."""
+        config_fixture.sandbox.temp_dir = temp_dir
+        config_fixture.sandbox.reuse_container = True
+        mock_run.return_value = subprocess.CompletedProcess([], 0, stdout="abc123\n")
+        output_path = temp_dir / "a.pdf"
+        output_path.write_bytes(b"PDF content")
+
+        downloader = SandboxedDownloader(config_fixture)
+        assert downloader.run_docker_download("https://example.com/a.pdf", output_path)
+        del downloader
+        gc.collect()
+
+        commands = [call.args[0] for call in mock_run.call_args_list]
+        assert commands[-1][:3] == ["docker", "kill", "abc123"]
+
+    @patch("subprocess.run")
+    def test_download_many_shares_one_container(
+        self,
+        mock_run,
+        config_fixture: Config,
+        temp_dir: Path,
+        mock_sandbox_capabilities,
+    ):
+        """Test that downloads into one directory run in a single container."""
+        config_fixture.sandbox.temp_dir = temp_dir
+        downloads = [
+            (f"https://example.com/{n}", temp_dir / n) for n in ("a.pdf", "b.pdf")
+        ]
+        for _, output_path in downloads:
+            output_path.write_bytes(b"PDF content")
+        mock_run.return_value = subprocess.CompletedProcess([], 0, stdout="")
+
+        downloader = SandboxedDownloader(config_fixture)
+        downloader.backend = SandboxBackend.DOCKER
+        results = downloader.sandboxed_download_many(downloads)
+
+        assert results == [output_path for _, output_path in downloads]
+        mock_run.assert_called_once()
+        args = mock_run.call_args[0][0]
+        assert args[-4:] == [
+            "https://example.com/a.pdf",
+            "/output/a.pdf",
+            "https://example.com/b.pdf",
+            "/output/b.pdf",
+        ]
+
+    @patch("subprocess.run")
+    def test_download_many_ignores_existing_outputs_when_container_fails(
+        self,
+        mock_run,
+        config_fixture: Config,
+        temp_dir: Path,
+        mock_sandbox_capabilities,
+    ):
+        """Test that a placeholder at the output path isn't taken as a download."""
+        config_fixture.sandbox.temp_dir = temp_dir
+        output_path = temp_dir / "a.pdf"
+        output_path.touch()
+        mock_run.return_value = subprocess.CompletedProcess(
+            [], 125, stdout="", stderr="container failed to start"
+        )
+
+        downloader = SandboxedDownloader(config_fixture)
+        downloader.backend = SandboxBackend.DOCKER
+        with patch.object(
+            downloader, "sandboxed_download", return_value=None
+        ) as mock_single:
+            results = downloader.sandboxed_download_many(
+                [("https://example.com/a.pdf", output_path)]
+            )
+
+        assert results == [None]
+        mock_single.assert_called_once_with("https://example.com/a.pdf", output_path)
+
+    @patch("subprocess.run")
+    def test_download_many_retries_only_retriable_failures(
+        self,
+        mock_run,
+        config_fixture: Config,
+        temp_dir: Path,
+        mock_sandbox_capabilities,
+    ):
+        """Test that each download's status line decides whether it's retried."""
+        config_fixture.sandbox.temp_dir = temp_dir
+        downloads = [
+            (f"https://example.com/{n}", temp_dir / n)
+            for n in ("ok.pdf", "missing.pdf", "reset.pdf")
+        ]
+        for _, output_path in downloads:
+            output_path.touch()
+        mock_run.return_value = subprocess.CompletedProcess(
+            [],
+            1,
+            stdout=(
+                "SUCCESS: Downloaded 11 bytes to /output/ok.pdf\n"
+                "ERROR: HTTP Error 404: Not Found\n"
+                "ERROR: [Errno 104] Connection reset by peer\n"
+            ),
+            stderr="",
+        )
+
+        downloader = SandboxedDownloader(config_fixture)
+        downloader.backend = SandboxBackend.DOCKER
+        with patch.object(
+            downloader, "sandboxed_download", return_value=None
+        ) as mock_single:
+            results = downloader.sandboxed_download_many(downloads)
+
+        assert results == [downloads[0][1], None, None]
+        # The 404 isn't downloaded again, and its placeholder is removed
+        mock_single.assert_called_once_with(*downloads[2])
+        assert not downloads[1][1].exists()
+
+    def test_download_script_matches_allowed_domains_by_label(
+        self, config_fixture: Config, temp_dir: Path, mock_sandbox_capabilities
+    ):
+        """Test that the sandbox script checks hosts like the downloader does."""
+        downloader = SandboxedDownloader(config_fixture)
+        # Changes after construction still reach the script
+        config_fixture.sandbox.allowed_domains = ["Example.com"]
+        rejected = [
+            "http://evilexample.com/a.pdf",
+            "http://user@evil.org:80/example.com",
+            "http://example.com.evil.org/a.pdf",
+            "ftp://example.com/a.pdf",
+        ]
+        cmd = downloader._inline_download_command(
+            [(url, temp_dir / "never-written.pdf") for url in rejected]
+        )
+
+        result = subprocess.run(
+            [sys.executable, *cmd[1:]], capture_output=True, text=True, timeout=30
+        )
+
+        assert result.returncode == 1
+        assert result.stdout.count("ERROR: Invalid or restricted URL") == len(rejected)
+
+    @pytest.mark.parametrize(
+        "stdout, tries_podman",
+        [
+            ("ERROR: HTTP Error 404: Not Found\n", False),
+            ("ERROR: File too large: 209715200 bytes\n", False),
+            ("ERROR: <urlopen error timed out>\n", False),
+            ("ERROR: The read operation timed out\n", False),
+            ("ERROR: Invalid or restricted URL: http://evil.org/a.pdf\n", False),
+            ("ERROR: [Errno 104] Connection reset by peer\n", True),
+            ("", True),  # The container itself failed to start
+        ],
+    )
+    @patch("subprocess.run")
+    def test_fallback_skipped_when_download_fails(
+        self,
+        mock_run,
+        stdout,
+        tries_podman,
+        config_fixture: Config,
+        temp_dir: Path,
+        mock_sandbox_capabilities,
+    ):
+        """Test that only sandbox failures fall back to the next backend."""
+        config_fixture.sandbox.temp_dir = temp_dir
+        mock_sandbox_capabilities.available_backends[SandboxBackend.PODMAN] = True
+        mock_run.return_value = subprocess.CompletedProcess(
+            [], 1, stdout=stdout, stderr=""
+        )
+
+        downloader = SandboxedDownloader(config_fixture)
+        result = downloader.sandboxed_download(
+            "https://example.com/test.pdf", temp_dir / "test.pdf"
+        )
+
+        assert result is None
+        runtimes = [call.args[0][0] for call in mock_run.call_args_list]
+        assert runtimes == (["docker", "podman"] if tries_podman else ["docker"])
+
+    @patch("subprocess.run")
+    def test_container_download_passes_url_as_argument(
+        self,
+        mock_run,
+        config_fixture: Config,
+        temp_dir: Path,
+        mock_sandbox_capabilities,
+    ):
+        """Test that the URL is an argument to a fixed script, not part of it."""
+        config_fixture.sandbox.temp_dir = temp_dir
+        output_path = temp_dir / "test.pdf"
+        output_path.write_bytes(b"PDF content")
+        mock_run.return_value = subprocess.CompletedProcess([], 0)
+        url = "https://example.com/a'b\".pdf"
+
+        downloader = SandboxedDownloader(config_fixture)
+        assert downloader.run_docker_download(url, output_path)
+
+        args = mock_run.call_args[0][0]
+        script_idx = args.index("-c") + 1
+        assert url not in args[script_idx]
+        assert args[-2:] == [url, "/output/test.pdf"]
+
+    @patch("shutil.which", return_value="/usr/bin/docker")
+    @patch("subprocess.run")
+    def test_launcher_started_by_absolute_path(
+        self,
+        mock_run,
+        mock_which,
+        config_fixture: Config,
+        temp_dir: Path,
+        mock_sandbox_capabilities,
+    ):
+        """Test that launchers are run by their full path."""
+        config_fixture.sandbox.temp_dir = temp_dir
+        output_path = temp_dir / "test.pdf"
+        output_path.write_bytes(b"PDF content")
+        mock_run.return_value = subprocess.CompletedProcess([], 0)
+
+        downloader = SandboxedDownloader(config_fixture)
+        assert downloader.run_docker_download("https://example.com/a.pdf", output_path)
+
+        assert mock_run.call_args[0][0][0] == "docker"
+        assert mock_run.call_args[1]["executable"] == "/usr/bin/docker"
+
     @patch("subprocess.run")
     def test_podman_download_success(
         self,
@@ -600,6 +941,34 @@ class TestModuleFunctions:
         # With mocking, this returns the mock instance, not a real SandboxCapabilities
         assert caps is mock_sandbox_capabilities
 
+    def test_sandbox_capabilities_are_detected_once(
+        self, config_fixture: Config, mock_sandbox_capabilities
+    ):
+        """Test that capability detection is shared across downloaders."""
+        first = SandboxedDownloader(config_fixture)
+        second = SandboxedDownloader(config_fixture)
+
+        assert first.capabilities is second.capabilities
+        assert get_sandbox_capabilities() is first.capabilities
+
+        from defuse import sandbox
+
+        assert sandbox.SandboxCapabilities.call_count == 1
+
+    def test_sandboxed_downloader_accepts_capabilities(
+        self, config_fixture: Config, mock_sandbox_capabilities
+    ):
+        """Test that explicitly passed capabilities skip detection."""
+        capabilities = MagicMock()
+        capabilities.recommended_backend = SandboxBackend.DOCKER
+
+        downloader = SandboxedDownloader(config_fixture, capabilities)
+
+        assert downloader.capabilities is capabilities
+        from defuse import sandbox
+
+        assert sandbox.SandboxCapabilities.call_count == 0
+
     def test_create_sandboxed_downloader(
         self, config_fixture: Config, mock_sandbox_capabilities
     ):
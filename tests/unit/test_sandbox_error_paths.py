@@ -230,9 +230,7 @@ class TestSandboxedDownloaderErrorPaths:
                 mock_mkstemp.side_effect = PermissionError("Permission denied")
 
                 with pytest.raises(PermissionError):
-                    downloader.create_download_script(
-                        "http://example.com/test.pdf", Path("/tmp/test.pdf")
-                    )
+                    downloader.create_download_script()
 
     def test_sandboxed_download_cleanup_on_failure(self):
         """Test that temporary files are cleaned up on download failure."""
@@ -363,29 +361,29 @@ class TestContainerRuntimeChecking:
     """Test container runtime checking edge cases."""
 
     def test_script_creation_with_special_characters(self):
-        """Test download script creation with URLs containing special characters."""
+        """Test that URLs with special characters stay out of the script."""
         config = Config()
         config.sandbox = SandboxConfig()
 
         with patch("defuse.sandbox.SandboxCapabilities"):
             downloader = SandboxedDownloader(config)
 
-            # URL with special characters that might break script generation
-            special_url = "http://example.com/file%20with%20spaces&params=test"
+            # URL with characters that would break out of a string literal
+            special_url = 'http://example.com/file%20with%20spaces&p=")\nimport os#'
 
             with patch("tempfile.mkstemp") as mock_mkstemp:
-                with patch("os.fdopen") as mock_fdopen:
-                    mock_fd = MagicMock()
-                    mock_fdopen.return_value.__enter__ = lambda x: mock_fd
-                    mock_fdopen.return_value.__exit__ = lambda x, y, z, w: None
+                with patch("os.write") as mock_write, patch("os.close"):
                     mock_mkstemp.return_value = (1, "/tmp/script.py")
 
-                    script_path = downloader.create_download_script(
-                        special_url, Path("/tmp/output.pdf")
-                    )
+                    with patch("defuse.sandbox.subprocess.run") as mock_run:
+                        mock_run.return_value = subprocess.CompletedProcess([], 1)
+                        downloader.run_bubblewrap_download(
+                            special_url, Path("/tmp/output.pdf")
+                        )
 
-                    # Should succeed without throwing exceptions
-                    assert script_path == Path("/tmp/script.py")
+                    script_body = mock_write.call_args[0][1]
+                    assert special_url.encode() not in script_body
+                    assert special_url in mock_run.call_args[0][0]
 
     def test_firejail_download_script_cleanup_on_error(self):
         """Test that firejail download handles errors properly."""
@@ -406,26 +404,23 @@ class TestContainerRuntimeChecking:
                 # No script cleanup needed with inline scripts
 
     def test_bubblewrap_download_script_cleanup_on_error(self):
-        """Test that bubblewrap download cleans up scripts on error."""
+        """Test that the bubblewrap script outlives errors until close()."""
         config = Config()
         config.sandbox = SandboxConfig()
 
         with patch("defuse.sandbox.SandboxCapabilities"):
             downloader = SandboxedDownloader(config)
 
-            mock_script_path = Path("/tmp/script.py")
-
-            with patch.object(downloader, "create_download_script") as mock_create:
-                mock_create.return_value = mock_script_path
-
-                with patch("defuse.sandbox.subprocess.run") as mock_run:
-                    mock_run.side_effect = subprocess.TimeoutExpired("bwrap", 120)
+            with patch("defuse.sandbox.subprocess.run") as mock_run:
+                mock_run.side_effect = subprocess.TimeoutExpired("bwrap", 120)
 
-                    with patch("pathlib.Path.unlink") as mock_unlink:
-                        result = downloader.run_bubblewrap_download(
-                            "http://example.com/test.pdf", Path("/tmp/output.pdf")
-                        )
+                result = downloader.run_bubblewrap_download(
+                    "http://example.com/test.pdf", Path("/tmp/output.pdf")
+                )
 
-                        assert result is False
-                        # Should clean up script even on timeout
-                        mock_unlink.assert_called()
+            assert result is False
+            # The script is kept for the next download, then removed
+            script_path = downloader.create_download_script()
+            assert script_path.exists()
+            downloader.close()
+            assert not script_path.exists()
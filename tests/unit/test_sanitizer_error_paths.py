@@ -36,6 +36,35 @@ class TestDocumentSanitizerInitialization:
         with pytest.raises(DocumentSanitizeError, match="Dangerzone CLI not found"):
             DocumentSanitizer(config, nonexistent_path)
 
+    def test_cli_existence_checked_once_per_path(self):
+        """Test that constructing more sanitizers doesn't stat the CLI again."""
+        config = SanitizerConfig()
+
+        with tempfile.NamedTemporaryFile(delete=False) as tmp:
+            dangerzone_path = Path(tmp.name)
+
+        try:
+            with patch.object(Path, "exists", return_value=True) as mock_exists:
+                DocumentSanitizer(config, dangerzone_path)
+                DocumentSanitizer(config, dangerzone_path)
+
+            mock_exists.assert_called_once()
+        finally:
+            dangerzone_path.unlink(missing_ok=True)
+
+    def test_missing_cli_is_found_once_created(self):
+        """Test that a failed CLI lookup is not remembered."""
+        config = SanitizerConfig()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            dangerzone_path = Path(tmp_dir) / "dangerzone-cli"
+
+            with pytest.raises(DocumentSanitizeError, match="not found"):
+                DocumentSanitizer(config, dangerzone_path)
+
+            dangerzone_path.touch()
+            assert DocumentSanitizer(config, dangerzone_path).is_available()
+
     def test_is_available_with_none_path(self):
         """Test is_available method with None path."""
         config = SanitizerConfig()
@@ -108,11 +137,14 @@ class TestSanitizeMethodErrorPaths:
                 # Mock failed Dangerzone process
                 mock_result = MagicMock()
                 mock_result.returncode = 1
-                mock_result.stderr = "Dangerzone processing failed"
-                mock_result.stdout = ""
+                mock_result.stderr = b"Dangerzone processing failed\n"
+                mock_result.stdout = b""
                 mock_run.return_value = mock_result
 
-                with pytest.raises(DocumentSanitizeError, match="Dangerzone failed"):
+                with pytest.raises(
+                    DocumentSanitizeError,
+                    match="Dangerzone failed: Dangerzone processing failed$",
+                ):
                     sanitizer.sanitize(input_file)
         finally:
             dangerzone_path.unlink(missing_ok=True)
@@ -192,7 +224,7 @@ class TestSanitizeMethodErrorPaths:
 
                 with patch.object(sanitizer, "validate_output", return_value=False):
                     # Create invalid output file (will fail validation)
-                    output_path = config.output_dir / "test_defused.pdf"
+                    output_path = config.output_dir / f"{input_file.stem}_defused.pdf"
                     output_path.write_text("Invalid PDF content")
 
                     with pytest.raises(
@@ -235,6 +267,71 @@ class TestSanitizeMethodErrorPaths:
             input_file.unlink(missing_ok=True)
             shutil.rmtree(config.output_dir, ignore_errors=True)
 
+    def test_sanitize_renames_output_named_after_input(self):
+        """Test that an unexpectedly named output is renamed to the requested one."""
+        config = SanitizerConfig()
+        config.output_dir = Path(tempfile.mkdtemp())
+
+        with tempfile.NamedTemporaryFile(delete=False) as tmp:
+            dangerzone_path = Path(tmp.name)
+            input_file = Path(tmp.name + ".input.pdf")
+            input_file.write_bytes(b"%PDF-1.7\nTest content\n%%EOF")
+
+        try:
+            sanitizer = DocumentSanitizer(config, dangerzone_path)
+            (config.output_dir / "unsafe").mkdir()
+
+            def fake_dangerzone(cmd, **kwargs):
+                pdf = b"%PDF-1.7\n" + b"x" * 200
+                safe_name = f"{input_file.stem}-safe.pdf"
+                (config.output_dir / safe_name).write_bytes(pdf)
+                # Another document's output, written later to the same directory
+                (config.output_dir / "other_defused.pdf").write_bytes(pdf)
+                return MagicMock(returncode=0, stderr="", stdout="")
+
+            with patch("subprocess.run", side_effect=fake_dangerzone):
+                result = sanitizer.sanitize(input_file, "doc.pdf")
+
+            assert result == config.output_dir / "doc.pdf"
+            assert sorted(p.name for p in config.output_dir.iterdir()) == [
+                "doc.pdf",
+                "other_defused.pdf",
+                "unsafe",
+            ]
+        finally:
+            dangerzone_path.unlink(missing_ok=True)
+            input_file.unlink(missing_ok=True)
+            shutil.rmtree(config.output_dir, ignore_errors=True)
+
+    def test_sanitize_many_keeps_input_order(self):
+        """Test that batch sanitization returns outputs in input order."""
+        config = SanitizerConfig()
+        config.output_dir = Path(tempfile.mkdtemp())
+
+        with tempfile.NamedTemporaryFile(delete=False) as tmp:
+            dangerzone_path = Path(tmp.name)
+
+        input_files = [config.output_dir / f"in{i}.pdf" for i in range(4)]
+        for input_file in input_files:
+            input_file.write_bytes(b"%PDF-1.7\nTest content\n%%EOF")
+        try:
+            sanitizer = DocumentSanitizer(config, dangerzone_path)
+
+            def fake_dangerzone(cmd, **kwargs):
+                output = config.output_dir / cmd[cmd.index("--output-filename") + 1]
+                output.write_bytes(b"%PDF-1.7\n" + b"x" * 200)
+                return MagicMock(returncode=0, stderr="", stdout="")
+
+            with patch("subprocess.run", side_effect=fake_dangerzone):
+                results = sanitizer.sanitize_many(input_files, max_workers=2)
+
+            assert results == [
+                config.output_dir / f"in{i}_defused.pdf" for i in range(4)
+            ]
+        finally:
+            dangerzone_path.unlink(missing_ok=True)
+            shutil.rmtree(config.output_dir, ignore_errors=True)
+
     def test_sanitize_cleanup_on_error(self):
         """Test that output files are cleaned up when errors occur."""
         config = SanitizerConfig()
@@ -435,6 +532,25 @@ class TestUtilityMethods:
         finally:
             dangerzone_path.unlink(missing_ok=True)
 
+    def test_get_version_is_cached(self):
+        """Test that the CLI is asked for its version only once."""
+        config = SanitizerConfig()
+
+        with tempfile.NamedTemporaryFile(delete=False) as tmp:
+            dangerzone_path = Path(tmp.name)
+
+        try:
+            sanitizer = DocumentSanitizer(config, dangerzone_path)
+
+            with patch("subprocess.run") as mock_run:
+                mock_run.return_value = MagicMock(returncode=0, stdout="4.0.0\n")
+
+                assert sanitizer.get_version() == "4.0.0"
+                assert sanitizer.get_version() == "4.0.0"
+                mock_run.assert_called_once()
+        finally:
+            dangerzone_path.unlink(missing_ok=True)
+
     def test_cleanup_temp_files_permission_error(self):
         """Test cleanup when permission errors occur."""
         config = SanitizerConfig()
@@ -447,13 +563,41 @@ class TestUtilityMethods:
         try:
             sanitizer = DocumentSanitizer(config, dangerzone_path)
 
-            with patch("pathlib.Path.glob") as mock_glob:
-                mock_temp_file = MagicMock()
-                mock_temp_file.unlink.side_effect = PermissionError("Permission denied")
-                mock_glob.return_value = [mock_temp_file]
+            (config.output_dir / "temp_1.pdf").write_bytes(b"temp")
+
+            with patch("os.unlink") as mock_unlink:
+                mock_unlink.side_effect = PermissionError("Permission denied")
 
                 # Should not raise exception, should handle gracefully
                 sanitizer.cleanup_temp_files()
+                mock_unlink.assert_called_once()
+        finally:
+            dangerzone_path.unlink(missing_ok=True)
+            shutil.rmtree(config.output_dir, ignore_errors=True)
+
+    def test_cleanup_temp_files_removes_temp_files_and_unsafe_dir(self):
+        """Test that cleanup removes temp_* files and unsafe/, and nothing else."""
+        config = SanitizerConfig()
+        config.output_dir = Path(tempfile.mkdtemp())
+        config.keep_temp_files = False
+
+        with tempfile.NamedTemporaryFile(delete=False) as tmp:
+            dangerzone_path = Path(tmp.name)
+
+        try:
+            sanitizer = DocumentSanitizer(config, dangerzone_path)
+            for name in ("temp_1.pdf", "temp_2", "doc_defused.pdf"):
+                (config.output_dir / name).write_bytes(b"x")
+            (config.output_dir / "temp_dir").mkdir()
+            (config.output_dir / "unsafe").mkdir()
+            (config.output_dir / "unsafe" / "doc.pdf").write_bytes(b"x")
+
+            sanitizer.cleanup_temp_files()
+
+            assert sorted(p.name for p in config.output_dir.iterdir()) == [
+                "doc_defused.pdf",
+                "temp_dir",
+            ]
         finally:
             dangerzone_path.unlink(missing_ok=True)
             shutil.rmtree(config.output_dir, ignore_errors=True)
@@ -470,10 +614,10 @@ class TestUtilityMethods:
         try:
             sanitizer = DocumentSanitizer(config, dangerzone_path)
 
-            with patch("pathlib.Path.glob") as mock_glob:
+            with patch("os.scandir") as mock_scandir:
                 # Should not be called when keep_temp_files is True
                 sanitizer.cleanup_temp_files()
-                mock_glob.assert_not_called()
+                mock_scandir.assert_not_called()
         finally:
             dangerzone_path.unlink(missing_ok=True)
             shutil.rmtree(config.output_dir, ignore_errors=True)